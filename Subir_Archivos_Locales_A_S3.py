@@ -5,7 +5,7 @@
 
 
 import os
-import boto3
+from src.s3_utils import obtener_cliente_s3
 
 def upload_folder_to_s3(ruta_folder_local, ruta_folder_s3):
     """
@@ -26,7 +26,7 @@ def upload_folder_to_s3(ruta_folder_local, ruta_folder_s3):
     s3_folder = s3_path_parts[1] if len(s3_path_parts) > 1 else ""
 
     # Crear cliente de S3
-    s3 = boto3.client('s3')
+    s3 = obtener_cliente_s3()
 
     for root, dirs, files in os.walk(ruta_folder_local):
         for filename in files:
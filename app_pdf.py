@@ -1,5 +1,4 @@
 import streamlit as st
-import boto3
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -8,24 +7,20 @@ from email import encoders
 import os
 from datetime import datetime
 import yaml
+from src.almacenamiento_utils import crear_almacenamiento
 
 # Cargamos configuracion
 with open('config/config.yaml', 'r') as f:
     config = yaml.safe_load(f)
 
 
-S3_BUCKET = config['s3']['bucket_name']
 S3_PREFIX = config['s3']['prefix_pdf']
 SMTP_SERVER = config['email']['smtp_server']
 SMTP_PORT = config['email']['smtp_port']
 EMAIL_ADDRESS = config['email']['sender_address']
 EMAIL_PASSWORD = config['email']['sender_password']
 
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=config['aws']['access_key_id'],
-    aws_secret_access_key=config['aws']['secret_access_key']
-)
+almacenamiento = crear_almacenamiento(config)
 
 
 # Usuarios autorizados (usuario: contraseña)
@@ -65,17 +60,15 @@ def get_pdf_list():
     
     """
     try:
-        response = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix=S3_PREFIX)
         pdfs = []
         
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                if obj['Key'].endswith('.pdf'):
-                    pdfs.append({
-                        'name': obj['Key'].split('/')[-1],
-                        'key': obj['Key'],
-                        'size': obj['Size'] / (1024 * 1024)  # Convertir a MB
-                    })
+        # El listado se recorre por páginas y sólo se conservan los PDFs
+        for obj in almacenamiento.iterar(S3_PREFIX, '.pdf'):
+            pdfs.append({
+                'name': obj['ruta'].split('/')[-1],
+                'key': obj['ruta'],
+                'size': obj['tamanio'] / (1024 * 1024)  # Convertir a MB
+            })
         return pdfs
     except Exception as e:
         st.error(f"Error al conectar con S3: {str(e)}")
@@ -93,8 +86,7 @@ def download_pdf(s3_key):
         bytes: Contenido del PDF descargado, o None si hubo un error
     """
     try:
-        response = s3.get_object(Bucket=S3_BUCKET, Key=s3_key)
-        return response['Body'].read()
+        return almacenamiento.leer(s3_key)
     except Exception as e:
         st.error(f"Error al descargar: {str(e)}")
         return None
@@ -183,15 +175,18 @@ else:
     pdf_list = get_pdf_list()
     
     if pdf_list:
+        # Índice por nombre para no recorrer la lista por cada opción
+        pdfs_por_nombre = {pdf['name']: pdf for pdf in pdf_list}
+        
         # Seleccionar PDF
         selected_pdf = st.selectbox(
             "Selecciona un archivo de cotización:",
-            options=[pdf['name'] for pdf in pdf_list],
-            format_func=lambda x: f"{x} ({next(p['size'] for p in pdf_list if p['name'] == x):.1f} MB)"
+            options=list(pdfs_por_nombre),
+            format_func=lambda x: f"{x} ({pdfs_por_nombre[x]['size']:.1f} MB)"
         )
         
         # Obtener datos del PDF seleccionado
-        pdf_info = next(p for p in pdf_list if p['name'] == selected_pdf)
+        pdf_info = pdfs_por_nombre[selected_pdf]
         
         st.divider()
         
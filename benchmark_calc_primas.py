@@ -0,0 +1,152 @@
+"""
+Benchmark del motor de cotización (src/calc_primas_utils.py) sobre una cartera sintética.
+
+Mide, para cada forma de cotizar, el tiempo, el rendimiento (asegurados/s y cotizaciones/s) y el
+pico de memoria, para que las regresiones de desempeño sean visibles. Ejemplos:
+
+    python benchmark_calc_primas.py --contratantes 1000 --asegurados 500000
+    python benchmark_calc_primas.py --contratantes 10000 --asegurados 5000000 --procesos 4 --salida benchmark.json
+    python benchmark_calc_primas.py --contratantes 200 --asegurados 50000 --guardar data/sinteticos/
+"""
+import os
+import json
+import time
+import argparse
+import resource
+import tracemalloc
+import pandas as pd
+from src.calc_primas_utils import (
+    TablaCuotas,
+    CensoCompacto,
+    indexar_parametros,
+    indexar_siniestralidad,
+    cotizar_contratante,
+    cotizar_lote,
+    cotizar_lote_paralelo,
+    cotizar_por_bloques
+)
+from src.sinteticos_utils import generar_cartera, guardar_cartera
+
+
+def medir(nombre, funcion, asegurados, cotizaciones, repeticiones=1, medir_memoria=True):
+    """Ejecuta `funcion` y regresa su tiempo (el mejor de las repeticiones), rendimiento y pico de memoria."""
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempo = min(tiempos)
+
+    # El pico de memoria se mide en una corrida aparte para no afectar los tiempos
+    pico_mb = None
+    if medir_memoria:
+        tracemalloc.start()
+        funcion()
+        pico_mb = tracemalloc.get_traced_memory()[1]/1024**2
+        tracemalloc.stop()
+
+    resultado = {
+        "caso": nombre,
+        "segundos": round(tiempo, 4),
+        "asegurados": int(asegurados),
+        "cotizaciones": int(cotizaciones),
+        "asegurados_por_segundo": round(asegurados/tiempo, 1) if tiempo else None,
+        "cotizaciones_por_segundo": round(cotizaciones/tiempo, 1) if tiempo else None,
+        "pico_memoria_mb": round(pico_mb, 1) if pico_mb is not None else None
+    }
+    print(f"{nombre:<22} {tiempo:>9.3f} s {resultado['asegurados_por_segundo'] or 0:>14,.0f} aseg/s "
+          f"{resultado['cotizaciones_por_segundo'] or 0:>11,.1f} cot/s "
+          f"{'' if pico_mb is None else f'{pico_mb:>9.1f} MB'}")
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del motor de cotización sobre una cartera sintética")
+    parser.add_argument("--contratantes", type=int, default=1000)
+    parser.add_argument("--asegurados", type=int, default=200000)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=1, help="Se reporta el mejor tiempo")
+    parser.add_argument("--muestra-secuencial", type=int, default=200,
+                        help="Contratantes que se cotizan uno por uno (el cálculo individual es lento)")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count(), help="Procesos para el lote paralelo")
+    parser.add_argument("--tamanio-bloque", type=int, default=50000, help="Filas por bloque en la cotización por bloques")
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir el pico de memoria (corre cada caso una vez menos)")
+    parser.add_argument("--cuotas", default="modelo/experiencia_global.xlsx")
+    parser.add_argument("--salida", help="Ruta del reporte JSON")
+    parser.add_argument("--guardar", help="Directorio donde guardar la cartera sintética como archivos .xlsx y terminar")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    cartera = generar_cartera(args.contratantes, args.asegurados, args.semilla)
+    print(f"Cartera sintética: {args.contratantes:,} contratantes, {args.asegurados:,} asegurados "
+          f"({time.perf_counter() - inicio:.1f} s)")
+
+    if args.guardar:
+        rutas = guardar_cartera(cartera, args.guardar)
+        print(f"Se escribieron {len(rutas)} archivos en {args.guardar}")
+        raise SystemExit(0)
+
+    df_parametros = cartera["parametros"]
+    df_calculo = cartera["calculo"]
+    tabla_cuotas = TablaCuotas(pd.read_excel(args.cuotas))
+    indice_parametros = indexar_parametros(df_parametros)
+    indice_siniestralidad = indexar_siniestralidad(cartera["emisiones"])
+    n_asegurados = len(df_calculo)
+    n_contratantes = len(df_parametros)
+    memoria = not args.sin_memoria
+    resultados = []
+
+    # Cálculo contratante por contratante sobre una muestra
+    muestra = df_parametros["Contratante"].iloc[:args.muestra_secuencial].tolist()
+    grupos = dict(list(df_calculo[df_calculo["Contratante"].isin(muestra)].groupby("Contratante", sort=False)))
+    asegurados_muestra = sum(len(grupo) for grupo in grupos.values())
+
+    def secuencial():
+        for i, contratante in enumerate(muestra):
+            cotizar_contratante(indice_parametros, contratante, i, grupos.get(contratante, df_calculo.iloc[0:0]),
+                                indice_siniestralidad, tabla_cuotas)
+
+    print(f"\n{'caso':<22} {'tiempo':>11} {'rendimiento':>21} {'':>17} {'pico':>11}")
+    resultados.append(medir("secuencial (muestra)", secuencial, asegurados_muestra, len(muestra), args.repeticiones, memoria))
+    resultados.append(medir("lote con memorias", lambda: cotizar_lote(df_parametros, df_calculo, indice_siniestralidad,
+                                                                        tabla_cuotas, 1, True),
+                            n_asegurados, n_contratantes, args.repeticiones, memoria))
+    resultados.append(medir("lote histograma", lambda: cotizar_lote(df_parametros, df_calculo, indice_siniestralidad,
+                                                                      tabla_cuotas, 1, False),
+                            n_asegurados, n_contratantes, args.repeticiones, memoria))
+
+    censo = CensoCompacto(df_calculo, indice_parametros)
+    resultados.append(medir("censo compacto", lambda: CensoCompacto(df_calculo, indice_parametros),
+                            n_asegurados, 0, 1, memoria))
+    resultados.append(medir("lote compacto", lambda: cotizar_lote(df_parametros, censo, indice_siniestralidad,
+                                                                    tabla_cuotas, 1, False),
+                            n_asegurados, n_contratantes, args.repeticiones, memoria))
+
+    def por_bloques():
+        bloques = (df_calculo.iloc[i:i + args.tamanio_bloque] for i in range(0, n_asegurados, args.tamanio_bloque))
+        cotizar_por_bloques(df_parametros, bloques, indice_siniestralidad, tabla_cuotas, 1)
+
+    resultados.append(medir("por bloques", por_bloques, n_asegurados, n_contratantes, args.repeticiones, memoria))
+
+    if args.procesos and args.procesos > 1:
+        # tracemalloc no ve la memoria de los procesos hijos: se reporta su RSS máximo
+        resultados.append(medir(f"paralelo ({args.procesos} proc.)",
+                                lambda: cotizar_lote_paralelo(df_parametros, censo, indice_siniestralidad, tabla_cuotas,
+                                                              1, n_procesos=args.procesos, generar_memorias=False),
+                                n_asegurados, n_contratantes, args.repeticiones, False))
+        resultados[-1]["rss_max_hijos_mb"] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss/1024, 1)
+
+    reporte = {
+        "contratantes": n_contratantes,
+        "asegurados": n_asegurados,
+        "semilla": args.semilla,
+        "rss_max_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024, 1),
+        "resultados": resultados
+    }
+    print(f"\nRSS máximo del proceso: {reporte['rss_max_mb']:,.1f} MB")
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"Reporte guardado en {args.salida}")
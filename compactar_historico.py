@@ -0,0 +1,46 @@
+"""
+Compactación del histórico particionado de cotizaciones (src/historico_utils.py).
+
+Junta los archivos de cada partición cerrada (`fecha=` anterior a hoy) en uno solo y, opcionalmente,
+exporta el histórico completo (base de `historico_path` más las particiones) como un CSV. Ejemplos:
+
+    python compactar_historico.py
+    python compactar_historico.py --hasta 2025-05-31 --exportar
+"""
+import yaml
+import argparse
+import pandas as pd
+from src.almacenamiento_utils import crear_almacenamiento
+from src.calc_primas_utils import obtener_base_historico
+from src.historico_utils import compactar_historico, leer_historico, exportar_historico_csv
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compacta el histórico particionado de cotizaciones")
+    parser.add_argument("--hasta", help="Última fecha (YYYY-MM-DD) que se compacta (por defecto, ayer)")
+    parser.add_argument("--exportar", action="store_true",
+                        help="Escribe el histórico completo en paths.historico_export_path")
+    args = parser.parse_args()
+
+    with open('config/config.yaml', 'r') as f:
+        config = yaml.safe_load(f)
+
+    almacenamiento = crear_almacenamiento(config)
+    ruta_historico_particiones = config['paths'].get('historico_particiones_path')
+    if not ruta_historico_particiones:
+        raise SystemExit("Configura paths.historico_particiones_path para usar el histórico particionado")
+
+    compactadas = compactar_historico(ruta_historico_particiones, almacenamiento, args.hasta)
+    for fecha, n_archivos in compactadas.items():
+        print(f"fecha={fecha}: {n_archivos} archivos compactados")
+    print(f"Particiones compactadas: {len(compactadas)}")
+
+    if args.exportar:
+        ruta_export = config['paths'].get('historico_export_path')
+        if not ruta_export:
+            raise SystemExit("Configura paths.historico_export_path para exportar el histórico")
+        df_base = obtener_base_historico(config['paths']['historico_path'], almacenamiento)
+        df_particiones = leer_historico(ruta_historico_particiones, almacenamiento).drop(columns="fecha", errors="ignore")
+        df_historico = pd.concat([df_base, df_particiones], ignore_index=True)
+        exportar_historico_csv(df_historico, ruta_export, almacenamiento)
+        print(f"Histórico exportado a {ruta_export}: {len(df_historico)} registros")
@@ -1,25 +1,20 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import boto3
 import io
 from io import BytesIO
 import yaml
+from src.almacenamiento_utils import crear_almacenamiento
 
 # Cargar configuración
 with open('config/config.yaml', 'r') as f:
     config = yaml.safe_load(f)
 
 
-# Configurar S3
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=config['aws']['access_key_id'],
-    aws_secret_access_key=config['aws']['secret_access_key']
-)
+# Configurar almacenamiento (S3 o directorio local)
+almacenamiento = crear_almacenamiento(config)
 
 # Variables de configuración
-bucket_name = config['s3']['bucket_name']
 ruta_dashboard = config['paths']['dashborad_path']
 
 # Configurar Streamlit
@@ -43,8 +38,7 @@ def load_data():
     #s3 = boto3.client('s3')
 
     #Descargar archivo a memoria (usando BytesIO)
-    response = s3.get_object(Bucket=bucket_name, Key=ruta_dashboard)
-    df = pd.read_csv(io.BytesIO(response['Body'].read()))
+    df = pd.read_csv(io.BytesIO(almacenamiento.leer(ruta_dashboard)))
     df['Fecha de Inicio'] = pd.to_datetime(df['Fecha de Inicio'], errors='coerce')
     if 'Fecha de Fin' in df.columns:
         df['Fecha de Fin'] = pd.to_datetime(df['Fecha de Fin'], errors='coerce')
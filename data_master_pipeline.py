@@ -1,146 +1,397 @@
-import boto3
+import os
 import yaml
-import json
+import shutil
+import tempfile
 import pandas as pd
 import numpy as np
-from io import BytesIO
 from src.calc_primas_utils import (
-    obtener_lista_nombre_bases,
+    obtener_etags_bases,
+    obtener_bases_calculo,
+    iterar_bases_calculo,
+    descargar_bases_calculo,
+    leer_base_por_bloques,
+    contratantes_en_base,
     obtener_base_parametros,
     obtener_base_cuotas,
     obtener_base_emisiones,
     obtener_base_historico,
-    creacion_cotizacion_dict,
-    generar_memoria_calculo
+    TablaCuotas,
+    CensoCompacto,
+    indexar_parametros,
+    indexar_siniestralidad,
+    cotizar_lote_paralelo,
+    cotizar_por_bloques,
+    memorias_por_contratante
+)
+from src.almacenamiento_utils import crear_almacenamiento, AlmacenamientoConCache
+from src.cache_utils import CacheCotizaciones
+from src.cotizacion_utils import cotizaciones_desde_tabla
+from src.parquet_utils import convertir_bases_a_parquet
+from src.historico_utils import agregar_historico, contar_historico
+from src.tickets_utils import AsignadorTickets
+from src.lote_cotizaciones_utils import LoteCotizaciones, guardar_lote
+from src.subidas_utils import ColaSubidas, Subida
+from src.instrumentacion_utils import Instrumentacion, etapa, contar, medir_iterador
+from src.incremental_utils import (
+    manifiesto_vacio,
+    cargar_manifiesto,
+    guardar_manifiesto,
+    huella_registro,
+    siniestralidades_contratantes,
+    archivos_modificados,
+    contratantes_por_archivo,
+    contratantes_pendientes,
+    archivos_de_contratantes,
+    actualizar_manifiesto
 )
 
 # Cargar configuración
 with open('config/config.yaml', 'r') as f:
     config = yaml.safe_load(f)
 
-# Configurar S3
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=config['aws']['access_key_id'],
-    aws_secret_access_key=config['aws']['secret_access_key']
-)
+# Configurar almacenamiento (S3 o directorio local)
+almacenamiento = crear_almacenamiento(config)
 
 # Variables de configuración
-bucket_name = config['s3']['bucket_name']
 ruta_calculo = config['paths']['calculo_path']
 ruta_parametros = config['paths']['parametros_path']
 ruta_cuotas = config['paths']['cuotas_path']
 ruta_emisiones = config['paths']['emisiones_path']
 ruta_historico_cotizaciones = config['paths']['historico_path']
+ruta_historico_particiones = config['paths'].get('historico_particiones_path')
+ruta_tickets = config['paths'].get('tickets_path')
+ruta_lotes = config['paths'].get('lote_cotizaciones_path')
 ruta_dict = config['paths']['dict_output_path']
 ruta_memoria_calculo = config['paths']['memoria_calculo_output_path']
+ruta_manifiesto = config['paths'].get('manifiesto_path') or 'coco/data/master_data/manifiesto/manifiesto_cotizaciones.json'
+
+# Opciones del pipeline
+generar_memorias = config.get('pipeline', {}).get('generar_memorias', True)
+# Sin almacén consolidado las cotizaciones siempre se escriben como un JSON por contratante
+json_por_contratante = config.get('pipeline', {}).get('json_por_contratante', True) or not ruta_lotes
+procesos = config.get('pipeline', {}).get('procesos', 1)
+contratantes_por_fragmento = config.get('pipeline', {}).get('contratantes_por_fragmento')
+incremental = config.get('pipeline', {}).get('incremental', False)
+cache_directorio = config.get('pipeline', {}).get('cache_directorio')
+cache_prefijo = config.get('pipeline', {}).get('cache_prefijo')
+cache_max_mb = config.get('pipeline', {}).get('cache_max_mb', 256)
+streaming = config.get('pipeline', {}).get('streaming', False)
+tamanio_bloque = config.get('pipeline', {}).get('tamanio_bloque', 50000)
+censo_compacto = config.get('pipeline', {}).get('censo_compacto', False)
+descargas_concurrentes = config.get('pipeline', {}).get('descargas_concurrentes', 1)
+procesos_lectura = config.get('pipeline', {}).get('procesos_lectura')
+max_mb_en_vuelo = config.get('pipeline', {}).get('max_mb_en_vuelo', 512)
+hilos_subida = config.get('pipeline', {}).get('hilos_subida', 16)
+max_subidas_pendientes = config.get('pipeline', {}).get('max_subidas_pendientes', 256)
+reintentos_subida = config.get('pipeline', {}).get('reintentos_subida', 5)
+parquet_prefijo = config.get('pipeline', {}).get('parquet_prefijo')
+procesos_conversion = config.get('pipeline', {}).get('procesos_conversion')
+instrumentacion = config.get('pipeline', {}).get('instrumentacion', False)
+instrumentacion_detallada = config.get('pipeline', {}).get('instrumentacion_detallada', False)
+reporte_directorio = config.get('pipeline', {}).get('reporte_directorio') or 'reportes'
+ruta_reporte = config['paths'].get('reporte_path')
+
+# Columnas que usa el cálculo; sin memorias de cálculo sólo se leen éstas de las bases de asegurados
+columnas_censo = None if generar_memorias else ["Fecha de Nacimiento", "Contratante"]
+columnas_cuotas = ["Edad", "Fallecimiento", "MA", "BPAI"]
+columnas_emisiones = ["Poliza", "Siniestralidad"]
+
+# Ruta que se lee de cada entrada (su copia Parquet si se convirtió); se llena al iniciar la ejecución
+rutas_lectura = {}
+
+
+def cargar_bases(rutas, directorio_bases):
+    """
+    Descarga las bases de asegurados: a disco si se leen por bloques, a memoria si no. Se lee la copia
+    Parquet de cada base si existe, pero el resultado queda con las rutas originales (las del manifiesto).
+    """
+    originales = {rutas_lectura.get(ruta, ruta): ruta for ruta in rutas}
+    lectura = list(originales)
+    if streaming:
+        bases = descargar_bases_calculo(lectura, almacenamiento, directorio_bases, descargas_concurrentes)
+    elif descargas_concurrentes > 1:
+        # Descargas en hilos y lectura en procesos; se reordenan como en `rutas` para que el lote no dependa
+        # del orden de llegada
+        bases = dict(iterar_bases_calculo(lectura, almacenamiento, descargas_concurrentes, procesos_lectura,
+                                          max_mb_en_vuelo*1024**2, columnas=columnas_censo))
+        bases = {ruta: bases[ruta] for ruta in lectura if ruta in bases}
+    else:
+        bases = obtener_bases_calculo(lectura, almacenamiento, columnas_censo)
+    return {originales[ruta]: base for ruta, base in bases.items()}
+
+
+def listar_contratantes(bases_calculo):
+    """Contratantes de cada base de asegurados cargada con `cargar_bases`."""
+    if streaming:
+        return {ruta: contratantes_en_base(ruta_local, tamanio_bloque) for ruta, ruta_local in bases_calculo.items()}
+    return contratantes_por_archivo(bases_calculo)
+
+
+def primer_ticket_historico(df_hist_cotizaciones=None):
+    """Ticket que sigue al histórico (la base más las particiones); se usa si no hay contador de tickets."""
+    if df_hist_cotizaciones is None:
+        df_hist_cotizaciones = obtener_base_historico(rutas_lectura[ruta_historico_cotizaciones], almacenamiento)
+    ticket = len(df_hist_cotizaciones) + 1
+    if ruta_historico_particiones:
+        # Las cotizaciones de ejecuciones anteriores están en las particiones (se cuentan desde el listado)
+        ticket += contar_historico(ruta_historico_particiones, almacenamiento)
+    return ticket
+
+
+def registrar_subida(contratantes_cotizados, contratante, n_bytes):
+    """Regresa la función que registra al contratante como cotizado cuando terminan de subirse sus salidas."""
+    def al_terminar(error):
+        if error is not None:
+            print(f"Error con {contratante}: {error}")
+            return
+        contratantes_cotizados.add(contratante)
+        contar("bytes_escritos", n_bytes, contratante)
+    return al_terminar
+
+
+def contar_bytes_leidos(bases_calculo):
+    """Atribuye los bytes de cada base en memoria a sus contratantes, en proporción a sus asegurados."""
+    for df in bases_calculo.values():
+        if df.empty or "Contratante" not in df.columns:
+            continue
+        bytes_por_fila = df.attrs.get("bytes", 0)/len(df)
+        for contratante, filas in df["Contratante"].value_counts().items():
+            contar("bytes_leidos_estimados", filas*bytes_por_fila, contratante)
+
 
 if __name__ == "__main__":
+    instrumentos = None
+    if instrumentacion or instrumentacion_detallada:
+        instrumentos = Instrumentacion(detallada=instrumentacion_detallada).activar()
+    
     try:
         
         # 1. Cargar bases de datos        
-        lista_archivos_base_datos = obtener_lista_nombre_bases(ruta_calculo, bucket_name)
-        df_parametros = obtener_base_parametros(ruta_parametros, bucket_name)
-        df_cuotas = obtener_base_cuotas(ruta_cuotas, bucket_name)
-        df_emisiones = obtener_base_emisiones(ruta_emisiones, bucket_name)
-        df_hist_cotizaciones = obtener_base_historico(ruta_historico_cotizaciones, bucket_name)
+        with etapa("listado"):
+            etags_bases = obtener_etags_bases(ruta_calculo, almacenamiento)
+        rutas_entrada = [ruta_parametros, ruta_cuotas, ruta_emisiones, ruta_historico_cotizaciones]
+        rutas_lectura.update({ruta: ruta for ruta in [*etags_bases, *rutas_entrada]})
+        if parquet_prefijo:
+            # Ingesta: cada Excel se convierte a Parquet una sola vez por ETag; después se lee la copia
+            with etapa("conversion"):
+                rutas_lectura.update(convertir_bases_a_parquet(
+                    {**etags_bases, **{ruta: None for ruta in rutas_entrada}}, almacenamiento, parquet_prefijo,
+                    procesos_conversion
+                ))
+        df_parametros = obtener_base_parametros(rutas_lectura[ruta_parametros], almacenamiento)
+        df_cuotas = obtener_base_cuotas(rutas_lectura[ruta_cuotas], almacenamiento, columnas_cuotas)
+        tabla_cuotas = TablaCuotas(df_cuotas)
+        df_emisiones = obtener_base_emisiones(rutas_lectura[ruta_emisiones], almacenamiento, columnas_emisiones)
+        # El histórico completo sólo hace falta para reescribirlo (sin particiones) o para numerar sin contador
+        df_hist_cotizaciones = None
+        if not ruta_historico_particiones or not ruta_tickets:
+            df_hist_cotizaciones = obtener_base_historico(rutas_lectura[ruta_historico_cotizaciones], almacenamiento)
+        
+        cache = None
+        if cache_prefijo:
+            cache = CacheCotizaciones(nombre_bucket=almacenamiento, prefijo=cache_prefijo, max_bytes=cache_max_mb*1024**2)
+        elif cache_directorio:
+            cache = CacheCotizaciones(directorio=cache_directorio, max_bytes=cache_max_mb*1024**2)
                 
-        # 2. Cargar y concatenar bases de cálculo
-        dfs_calculos = {}
-        for ruta in lista_archivos_base_datos:
-            response = s3.get_object(Bucket=bucket_name, Key=ruta)
-            content = response['Body'].read()
-            df_calculo = pd.read_excel(BytesIO(content), engine='openpyxl')
-            dfs_calculos[ruta] = df_calculo
+        # 2. Cargar bases de cálculo (en modo streaming se descargan a disco y se leen por bloques)
+        directorio_trabajo = tempfile.mkdtemp() if streaming else None
+        directorio_bases = os.path.join(directorio_trabajo, 'bases') if streaming else None
+        registros_parametros = indexar_parametros(df_parametros)
+        huellas_parametros = {contratante: huella_registro(registro)
+                              for contratante, registro in registros_parametros.items()}
+        # Las renovaciones dependen además de la siniestralidad de su póliza en emisiones
+        siniestralidades = siniestralidades_contratantes(registros_parametros, indexar_siniestralidad(df_emisiones))
         
-        df_calculo = pd.concat(dfs_calculos.values(), ignore_index=True)
+        if incremental:
+            # Sólo se descargan las bases que cambiaron y las de los contratantes que hay que recotizar
+            manifiesto = cargar_manifiesto(ruta_manifiesto, almacenamiento)
+            bases_calculo = cargar_bases(archivos_modificados(manifiesto, etags_bases), directorio_bases)
+            archivos_contratantes = listar_contratantes(bases_calculo)
+            pendientes = contratantes_pendientes(
+                manifiesto, etags_bases, huellas_parametros, tabla_cuotas.version, archivos_contratantes,
+                siniestralidades
+            )
+            faltantes = archivos_de_contratantes(manifiesto, pendientes, etags_bases) - set(bases_calculo)
+            bases_faltantes = cargar_bases(sorted(faltantes), directorio_bases)
+            archivos_contratantes.update(listar_contratantes(bases_faltantes))
+            bases_calculo.update(bases_faltantes)
+        else:
+            manifiesto = manifiesto_vacio()
+            bases_calculo = cargar_bases(list(etags_bases), directorio_bases)
+            archivos_contratantes = {}
+            pendientes = set(huellas_parametros)
         
-        # 3. Procesar cada contratante        
-        dicts_contratantes = {}
-        ticket = len(df_hist_cotizaciones) + 1
-        contratantes = df_parametros['Contratante'].unique()
+        df_parametros_pendientes = df_parametros[df_parametros["Contratante"].isin(pendientes)]
+        if instrumentos is not None and instrumentos.detallada and not streaming:
+            contar_bytes_leidos(bases_calculo)
+        print(f"Contratantes por cotizar: {len(pendientes)} de {len(huellas_parametros)}")
         
-        for i, contratante in enumerate(contratantes, 1):
-            try:
-                
-                # Filtrar datos del contratante
-                df_calculo_contratante = df_calculo[df_calculo['Contratante'] == contratante].copy()
-                
-                # Crear diccionario de cotización
-                dict_contratante = creacion_cotizacion_dict(
-                    df_parametros, contratante, ticket, 
-                    df_calculo_contratante, df_emisiones, df_cuotas
+        # 3. Cotizar todos los contratantes
+        if ruta_tickets:
+            # Con contador, los tickets se reservan al terminar, sólo para las cotizaciones obtenidas
+            ticket = 1
+        else:
+            ticket = primer_ticket_historico(df_hist_cotizaciones)
+        if streaming:
+            # Una pasada por bloques; las memorias de cálculo se escriben a disco conforme se calculan
+            bloques = (bloque for ruta_local in bases_calculo.values()
+                       for bloque in leer_base_por_bloques(ruta_local, tamanio_bloque, columnas_censo))
+            with etapa("cotizacion"):
+                df_cotizaciones, memorias_calculo = cotizar_por_bloques(
+                    df_parametros_pendientes, medir_iterador(bloques, "lectura"), df_emisiones, tabla_cuotas, ticket,
+                    os.path.join(directorio_trabajo, 'memorias') if generar_memorias else None
                 )
-                
-                df_dict_contratante = pd.DataFrame(dict_contratante)
-                dicts_contratantes[contratante] = df_dict_contratante
-                ticket += 1
-                
-                # Guardar diccionario como JSON
-                ruta_dict_contratante = f'{ruta_dict}{contratante}.json'
-                s3.put_object(
-                    Bucket=bucket_name, 
-                    Key=ruta_dict_contratante, 
-                    Body=json.dumps(dict_contratante, indent=2, ensure_ascii=False, default=str).encode('utf-8'),
-                    ContentType='application/json'
-                )
-                
-                # Generar memoria de cálculo
-                fecha_corte = dict_contratante['Inicio'][0]
-                descuento = dict_contratante['Descuento'][0]
-                rpf = dict_contratante['RPF'][0]
-                
-                memoria_calculo = generar_memoria_calculo(
-                    contratante, fecha_corte, df_parametros, 
-                    df_calculo_contratante, df_cuotas, descuento, rpf
-                )
-                
-                # Subir memoria de cálculo
-                ruta_memoria_calculo_completa = f'{ruta_memoria_calculo}{contratante}.csv'
-                memoria_csv = memoria_calculo.to_csv(index=False)
-                
-                s3.put_object(
-                    Bucket=bucket_name,
-                    Key=ruta_memoria_calculo_completa,
-                    Body=memoria_csv.encode('utf-8'),
-                    ContentType='text/csv'
+        else:
+            # Una sola pasada vectorizada (en paralelo si procesos > 1)
+            df_calculo = pd.concat(bases_calculo.values(), ignore_index=True) if bases_calculo else pd.DataFrame(
+                columns=["Nombre", "Fecha de Nacimiento", "Contratante"]
+            )
+            if censo_compacto:
+                # Arreglos contiguos en lugar del DataFrame; el resto de las columnas sólo si hay memorias
+                with etapa("censo_compacto"):
+                    df_calculo = CensoCompacto(df_calculo, df_parametros_pendientes,
+                                               columnas_extra=list(df_calculo.columns) if generar_memorias else ())
+                bases_calculo.clear()
+            with etapa("cotizacion"):
+                df_cotizaciones, df_memorias = cotizar_lote_paralelo(
+                    df_parametros_pendientes, df_calculo, df_emisiones, tabla_cuotas, ticket,
+                    n_procesos=procesos,
+                    contratantes_por_fragmento=contratantes_por_fragmento,
+                    generar_memorias=generar_memorias,
+                    cache=cache
                 )
-                
+                memorias_calculo = memorias_por_contratante(df_cotizaciones, df_memorias) if generar_memorias else {}
+        
+        if ruta_tickets and not df_cotizaciones.empty:
+            # Rango contiguo reservado en el contador (compare-and-swap) sólo para los contratantes cotizados:
+            # los registros repetidos y los contratantes que no se pudieron cotizar no dejan huecos. El
+            # histórico sólo se lee la primera vez
+            asignador = AsignadorTickets(almacenamiento, ruta_tickets,
+                                         inicio=lambda: primer_ticket_historico(df_hist_cotizaciones))
+            df_cotizaciones["Ticket"] = asignador.reservar(len(df_cotizaciones)) + np.arange(len(df_cotizaciones))
+        
+        cotizaciones = cotizaciones_desde_tabla(df_cotizaciones)
+        contratantes_cotizados = set()
+        lote = LoteCotizaciones()
+        
+        # Las salidas de cada contratante se encolan como un lote; los hilos de la cola las suben mientras
+        # se serializan las siguientes
+        with ColaSubidas(almacenamiento, hilos_subida, max_subidas_pendientes, reintentos_subida) as cola:
+            for cotizacion in cotizaciones:
+                contratante = cotizacion.contratante
+                contar("asegurados", cotizacion.asegurados, contratante)
+                try:
+                    
+                    # Diccionario como JSON (compatibilidad) y como línea del lote consolidado
+                    subidas, n_bytes = [], 0
+                    if json_por_contratante:
+                        subidas.append(Subida(f'{ruta_dict}{contratante}.json', cotizacion.a_json().encode('utf-8'),
+                                              tipo_contenido='application/json', etapa="subida_json"))
+                        n_bytes += len(subidas[0].contenido)
+                    if ruta_lotes:
+                        lote.agregar(cotizacion)
+                    
+                    # Memoria de cálculo
+                    if generar_memorias:
+                        memoria_calculo = memorias_calculo[contratante]
+                        ruta_memoria_calculo_completa = f'{ruta_memoria_calculo}{contratante}.csv'
+                        
+                        if streaming:
+                            # La memoria ya está en disco: se sube sin cargarla
+                            subidas.append(Subida(ruta_memoria_calculo_completa, ruta_local=memoria_calculo,
+                                                  tipo_contenido='text/csv', etapa="subida_memoria"))
+                            n_bytes += os.path.getsize(memoria_calculo)
+                        else:
+                            memoria_csv = memoria_calculo.to_csv(index=False).encode('utf-8')
+                            subidas.append(Subida(ruta_memoria_calculo_completa, memoria_csv,
+                                                  tipo_contenido='text/csv', etapa="subida_memoria"))
+                            n_bytes += len(memoria_csv)
+                    
+                    cola.enviar(subidas, registrar_subida(contratantes_cotizados, contratante, n_bytes))
+                    
+                except Exception as e:
+                    print(f"Error con {contratante}: {e}")
+                    continue
+            
+            # Barrera: el histórico y el manifiesto sólo se escriben cuando terminaron todas las subidas
+            cola.esperar()
+        
+        if ruta_lotes and len(lote):
+            # Un solo objeto con las cotizaciones de la ejecución y su índice por contratante y ticket
+            try:
+                with etapa("subida_lote"):
+                    guardar_lote(lote, ruta_lotes, almacenamiento)
+                contar("bytes_escritos", len(lote.contenido()))
             except Exception as e:
-                print(f"Error con {contratante}: {e}")
-                continue
+                print(f"Error al guardar el lote de cotizaciones: {e}")
+                if not json_por_contratante:
+                    contratantes_cotizados.clear()
         
-        # 4. Actualizar historial de cotizaciones        
-        df_dict_contratantes = pd.concat(dicts_contratantes.values(), ignore_index=True)
-        df_dict_contratantes['Tipo'] = np.where(
-            df_dict_contratantes['Renovacion'] == 'Si', 'renovación', 'nuevo'
-        )
-        df_dict_contratantes['Fecha de Inicio'] = df_dict_contratantes['Inicio']
+        if streaming:
+            shutil.rmtree(directorio_trabajo, ignore_errors=True)
         
+        # 4. Actualizar historial de cotizaciones        
         cols = ['Ticket', 'Fecha de Inicio', 'Mes', "Oficina", "Contratante", 
                 "Agente", "Prima", "Evento", "Tipo"]
-        df_dict_contratantes = df_dict_contratantes[cols]
-        
-        df_hist_cotizaciones_actualizado = pd.concat([df_hist_cotizaciones, df_dict_contratantes], ignore_index=True)
+        if df_cotizaciones.empty:
+            # Sin cotizaciones (ningún contratante pendiente o todos fallaron) no hay registros que agregar
+            df_dict_contratantes = pd.DataFrame(columns=cols)
+        else:
+            df_dict_contratantes = df_cotizaciones.copy()
+            df_dict_contratantes['Tipo'] = np.where(
+                df_dict_contratantes['Renovacion'] == 'Si', 'renovación', 'nuevo'
+            )
+            df_dict_contratantes['Fecha de Inicio'] = df_dict_contratantes['Inicio']
+            df_dict_contratantes = df_dict_contratantes[cols]
         
-        # Subir historial actualizado
-        ruta_hist_actualizado = 'coco/data/master_data/historico/historial_cotizaciones_actualizado.csv'
-        hist_csv = df_hist_cotizaciones_actualizado.to_csv(index=False)
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=ruta_hist_actualizado,
-            Body=hist_csv.encode('utf-8'),
-            ContentType='text/csv'
-        )
+        if ruta_historico_particiones:
+            # Sólo se agregan las cotizaciones de esta ejecución, como un archivo en la partición de hoy
+            with etapa("historico"):
+                agregar_historico(df_dict_contratantes, ruta_historico_particiones, almacenamiento)
+        elif not df_dict_contratantes.empty:
+            df_hist_cotizaciones_actualizado = pd.concat([df_hist_cotizaciones, df_dict_contratantes], ignore_index=True)
+            
+            # Subir historial actualizado
+            ruta_hist_actualizado = 'coco/data/master_data/historico/historial_cotizaciones_actualizado.csv'
+            with etapa("historico"):
+                hist_csv = df_hist_cotizaciones_actualizado.to_csv(index=False).encode('utf-8')
+                almacenamiento.escribir(ruta_hist_actualizado, hist_csv, 'text/csv')
+            contar("bytes_escritos", len(hist_csv))
         
+        # 5. Registrar las entradas cotizadas para la siguiente ejecución incremental
+        if incremental:
+            manifiesto_actualizado = actualizar_manifiesto(
+                manifiesto, etags_bases, archivos_contratantes, df_cotizaciones,
+                pendientes, contratantes_cotizados, huellas_parametros, tabla_cuotas.version,
+                siniestralidades
+            )
+            guardar_manifiesto(manifiesto_actualizado, ruta_manifiesto, almacenamiento)
         
         # Reporte final
         print("\n=== PIPELINE COMPLETADO ===")
-        print(f"Contratantes procesados: {len(dicts_contratantes)}")
-        print(f"Diccionarios generados: {len(dicts_contratantes)}")
-        print(f"Memorias de cálculo generadas: {len(dicts_contratantes)}")
+        print(f"Contratantes procesados: {len(cotizaciones)}")
+        print(f"Diccionarios generados: {len(contratantes_cotizados)}")
+        print(f"Memorias de cálculo generadas: {len(memorias_calculo)}")
         print(f"Historial actualizado con {len(df_dict_contratantes)} nuevos registros")
+        if cache is not None:
+            estadisticas_cache = cache.estadisticas()
+            print(f"Caché de cotizaciones: {estadisticas_cache['aciertos']} aciertos, {estadisticas_cache['fallos']} fallos "
+                  f"({estadisticas_cache['tasa_aciertos']:.1%})")
+        if isinstance(almacenamiento, AlmacenamientoConCache):
+            estadisticas_lecturas = almacenamiento.estadisticas()
+            contar("bytes_no_descargados", estadisticas_lecturas['bytes_evitados'])
+            print(f"Caché de lecturas: {estadisticas_lecturas['aciertos']} aciertos, {estadisticas_lecturas['fallos']} fallos "
+                  f"({estadisticas_lecturas['bytes_evitados']/1024**2:.2f} MB sin descargar)")
         
     except Exception as e:
         print(f"Error en el pipeline: {e}")
-        raise
\ No newline at end of file
+        raise
+    
+    finally:
+        # Reporte de tiempos y contadores de la ejecución (también si falló)
+        if instrumentos is not None:
+            instrumentos.desactivar()
+            ruta_reporte_local = instrumentos.guardar_reporte(reporte_directorio, almacenamiento if ruta_reporte else None,
+                                                              ruta_reporte)
+            print(f"Tiempos por etapa:\n{instrumentos.resumen()}")
+            print(f"Reporte de ejecución: {ruta_reporte_local}")
\ No newline at end of file
@@ -1,5 +1,6 @@
-import boto3
 import yaml
+from src.almacenamiento_utils import crear_almacenamiento, AlmacenamientoConCache
+from src.lote_cotizaciones_utils import cargar_indice, leer_cotizaciones
 from src.pdf_utils import (
     cargar_dict_cotizacion,
     convertir_campo_a_float, 
@@ -12,23 +13,24 @@ from src.pdf_utils import (
 with open('config/config.yaml', 'r') as f:
     config = yaml.safe_load(f)
 
-# Configurar S3
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=config['aws']['access_key_id'],
-    aws_secret_access_key=config['aws']['secret_access_key']
-)
+# Configurar almacenamiento (S3 o directorio local)
+almacenamiento = crear_almacenamiento(config)
 
 # Variables de configuración
-bucket_name = config['s3']['bucket_name']
 ruta_dict = config['paths']['dict_path']
 ruta_output = config['paths']['pdf_output_path']
+ruta_lotes = config['paths'].get('lote_cotizaciones_path')
 campos_float = config['processing']['campos_float']
 campos_fecha = config['processing']['campos_fecha']
 
 if __name__ == "__main__":
-    # Obtener empresas
-    nombres_empresas = obtener_nombres_empresas(bucket_name, ruta_dict)
+    # Obtener empresas: del almacén consolidado (una lectura por lote) o del listado de JSON por contratante
+    dicts_empresas = None
+    if ruta_lotes:
+        dicts_empresas = leer_cotizaciones(cargar_indice(ruta_lotes, almacenamiento), almacenamiento)
+        nombres_empresas = list(dicts_empresas)
+    else:
+        nombres_empresas = obtener_nombres_empresas(almacenamiento, ruta_dict)
     
     # Procesar cada empresa
     for empresa in nombres_empresas:
@@ -36,7 +38,10 @@ if __name__ == "__main__":
             print(f"Procesando: {empresa}")
             
             # Cargar y formatear datos
-            dict_empresa = cargar_dict_cotizacion(empresa, bucket_name)
+            if dicts_empresas is not None:
+                dict_empresa = dicts_empresas.pop(empresa)
+            else:
+                dict_empresa = cargar_dict_cotizacion(empresa, almacenamiento)
             
             for campo in campos_float:
                 dict_empresa = convertir_campo_a_float(dict_empresa, campo)
@@ -45,13 +50,16 @@ if __name__ == "__main__":
                 dict_empresa = convertir_campo_a_fecha(dict_empresa, campo)
             
             # Generar y subir PDF
-            pdf_empresa = generar_pdf_cotizacion(bucket_name, dict_empresa)
+            pdf_empresa = generar_pdf_cotizacion(almacenamiento, dict_empresa)
             pdf_key = f"{ruta_output}{empresa}.pdf"
-            s3.upload_fileobj(pdf_empresa, bucket_name, pdf_key)
+            almacenamiento.escribir(pdf_key, pdf_empresa.getvalue(), 'application/pdf')
             
             print(f"PDF generado: {empresa}")
             
         except Exception as e:
             print(f"Error con {empresa}: {e}")
     
-    print("Pipeline completado!")
\ No newline at end of file
+    print("Pipeline completado!")
+    if isinstance(almacenamiento, AlmacenamientoConCache):
+        estadisticas_lecturas = almacenamiento.estadisticas()
+        print(f"Caché de lecturas: {estadisticas_lecturas['aciertos']} aciertos, {estadisticas_lecturas['fallos']} fallos")
\ No newline at end of file
@@ -16,6 +16,14 @@ Funciones
 ===========
 """
 
+# Columnas de cuotas que aplican a cada código de cobertura
+COBERTURAS_COLUMNAS = {
+    "F": ["Fallecimiento"],
+    "FMA": ["Fallecimiento", "MA"],
+    "FBPAI": ["Fallecimiento", "BPAI"],
+    "FMABPAI": ["Fallecimiento", "MA", "BPAI"]
+}
+
 
 def calcular_edad(fecha_nac, fecha_ref):
     """
@@ -47,6 +55,64 @@ def calcular_edad(fecha_nac, fecha_ref):
         return 0
 
 
+def calcular_edades(fechas_nac, fecha_ref) -> np.ndarray:
+    """
+    *Calcula en una sola pasada la edad de todas las personas de una columna de fechas de nacimiento.*
+
+    Aplica la misma regla que `calcular_edad`: regresa -1 si la fecha de referencia es anterior
+    al nacimiento y resta un año si aún no se llega al cumpleaños. Las fechas vacías producen NaN
+    y las fechas que no se pueden interpretar en bloque se resuelven con `calcular_edad`.
+
+    **Parameters**:
+
+        fechas_nac (Series): Columna "Fecha de Nacimiento" de la base de asegurados.
+
+        fecha_ref (datetime.date | np.datetime64 | array-like): Fecha de corte, única o una por persona.
+
+    **Returns**:
+
+        np.ndarray: Arreglo de edades enteras (float con NaN si hay fechas de nacimiento vacías).
+    """
+
+    fechas = pd.Series(fechas_nac).reset_index(drop=True)
+    es_escalar = np.ndim(fecha_ref) == 0
+
+    try:
+        fecha_ref_conv = pd.to_datetime(fecha_ref)
+        fechas_conv = pd.to_datetime(fechas, errors='coerce')
+
+        anio_ref = np.asarray(fecha_ref_conv.year)
+        mes_ref = np.asarray(fecha_ref_conv.month)
+        dia_ref = np.asarray(fecha_ref_conv.day)
+
+        anio_nac = fechas_conv.dt.year.to_numpy(dtype='float64', na_value=np.nan)
+        mes_nac = fechas_conv.dt.month.to_numpy(dtype='float64', na_value=np.nan)
+        dia_nac = fechas_conv.dt.day.to_numpy(dtype='float64', na_value=np.nan)
+
+        # Se resta un año a quienes aún no cumplen años en la fecha de corte
+        sin_cumpleanios = (mes_ref < mes_nac) | ((mes_ref == mes_nac) & (dia_ref < dia_nac))
+        edades = anio_ref - anio_nac - sin_cumpleanios
+
+        # Fechas de nacimiento posteriores a la fecha de corte
+        futuras = (fechas_conv > (fecha_ref_conv if es_escalar else pd.Series(fecha_ref_conv))).to_numpy()
+        edades = np.where(futuras, -1, edades)
+
+        # Las fechas no vacías que no se pudieron convertir se calculan una por una
+        pendientes = np.flatnonzero(fechas_conv.isna().to_numpy() & fechas.notna().to_numpy())
+
+    except Exception as e:
+        print(f"Error calculando edades en bloque, se calcularán una por una: {e}")
+        edades = np.full(len(fechas), np.nan)
+        pendientes = np.arange(len(fechas))
+
+    for i in pendientes:
+        edades[i] = calcular_edad(fechas.iat[i], fecha_ref if es_escalar else np.asarray(fecha_ref)[i])
+
+    if np.isnan(edades).any():
+        return edades
+    return edades.astype(np.int64)
+
+
 def obtener_nombre_mes(fecha):
     """
     *Función que convierte fecha a nombre del mes en español*
@@ -181,7 +247,7 @@ def generar_memoria_calculo(contratante:str, fecha_corte:np.datetime64, df_param
 
         df_contratante = df_parametros[df_parametros['Contratante'] == contratante]
         df_calculo_copy = df_calculo.copy()
-        df_calculo_copy["Edad"] = df_calculo_copy["Fecha de Nacimiento"].apply(lambda x: calcular_edad(x, fecha_corte))
+        df_calculo_copy["Edad"] = calcular_edades(df_calculo_copy["Fecha de Nacimiento"], fecha_corte)
 
 
 
@@ -242,7 +308,7 @@ def creacion_cotizacion_dict(df_parametros: pd.DataFrame, contratante:str, ticke
 
         # Para crear la edad promedio de los asegurados
         fecha_corte = df_contratante["Inicio"].values[0]
-        df_calculo_copy["Edad"] = df_calculo_copy["Fecha de Nacimiento"].apply(lambda x: calcular_edad(x, fecha_corte))
+        df_calculo_copy["Edad"] = calcular_edades(df_calculo_copy["Fecha de Nacimiento"], fecha_corte)
 
         # Recargo por pago fraccionado y número de recibos
         forma_pago = df_contratante["FormaPago"].values[0]
@@ -311,6 +377,203 @@ def creacion_cotizacion_dict(df_parametros: pd.DataFrame, contratante:str, ticke
     except Exception as e:
         print(f"Error al crear el diccionario de cotización: {e}")
         return {}
+
+
+def cotizar_lote(df_parametros: pd.DataFrame, df_calculo: pd.DataFrame, df_emisiones: pd.DataFrame,
+                 df_cuotas: pd.DataFrame, ticket_inicial: int) -> tuple:
+    """
+    *Función que cotiza a todos los contratantes en una sola pasada vectorizada*
+
+    Agrupa la base de asegurados por contratante una sola vez, une los parámetros de cada
+    contratante a sus asegurados, calcula edades y cuotas para todos los asegurados a la vez y
+    agrega las primas por contratante. Los tickets se asignan en el orden de `df_parametros`,
+    igual que en el cálculo contratante por contratante.
+
+    **Parameters**:
+
+        df_parametros (DataFrame): DataFrame con los parámetros de las cotizaciones
+
+        df_calculo (DataFrame): DataFrame consolidado con los asegurados de todos los contratantes
+
+        df_emisiones (DataFrame): DataFrame con datos de emisiones
+
+        df_cuotas (DataFrame): DataFrame con datos de cuotas
+
+        ticket_inicial (int): Número de ticket de la primera cotización
+
+    **Returns**:
+
+        tuple: (df_cotizaciones, df_memorias) con una fila por cotización y la memoria de cálculo
+        de todos los asegurados, identificada por la columna "Contratante".
+    """
+    try:
+
+        # Un registro por contratante (el cálculo individual toma el primero)
+        df_param = df_parametros[df_parametros["Contratante"].notna()]
+        df_param = df_param.drop_duplicates(subset="Contratante", keep="first").reset_index(drop=True)
+        n_contratantes = len(df_param)
+
+        # Recargo, recibos y descuento por contratante
+        formas_pago = [obtener_parametros_forma_pago(forma_pago) for forma_pago in df_param["FormaPago"]]
+        rpf = np.array([forma_pago["rpf"] for forma_pago in formas_pago], dtype=float)
+        num_recibos = np.array([forma_pago["num_recibos"] for forma_pago in formas_pago])
+        descuentos = {comision: obtener_descuento_comision(comision*100) for comision in df_param["Comision"].unique()}
+        descuento = df_param["Comision"].map(descuentos).to_numpy(dtype=float)
+        factor = (1-descuento)*(1+rpf)*df_param["SumaAsegurada"].to_numpy(dtype=float)/1000
+
+        # Índice del contratante de cada asegurado (un solo join contra los parámetros)
+        codigos = pd.Categorical(df_calculo["Contratante"], categories=df_param["Contratante"]).codes
+        df_memorias = df_calculo[codigos >= 0].reset_index(drop=True)
+        codigos = codigos[codigos >= 0]
+
+        df_memorias["Edad"] = calcular_edades(df_memorias["Fecha de Nacimiento"], df_param["Inicio"].to_numpy()[codigos])
+
+        # Cuotas por edad para todos los asegurados, escaladas según su contratante
+        columnas_cuotas = [col for col in ["Fallecimiento", "MA", "BPAI"] if col in df_cuotas.columns]
+        df_memorias = df_memorias.merge(df_cuotas[["Edad"] + columnas_cuotas], on="Edad", how="left")
+
+        for col in columnas_cuotas:
+            cubre = df_param["Coberturas"].map(lambda cobertura: col in COBERTURAS_COLUMNAS.get(cobertura, [])).to_numpy(dtype=bool)
+            df_memorias[col] = np.where(cubre[codigos], df_memorias[col].to_numpy(dtype=float)*factor[codigos], np.nan)
+
+        # Agregados por contratante
+        prima_asegurado = df_memorias[columnas_cuotas].sum(axis=1).to_numpy()
+        primas = np.bincount(codigos, weights=prima_asegurado, minlength=n_contratantes)
+
+        edades = df_memorias["Edad"].to_numpy(dtype=float)
+        con_edad = ~np.isnan(edades)
+        asegurados = np.bincount(codigos[con_edad], minlength=n_contratantes)
+        suma_edades = np.bincount(codigos[con_edad], weights=edades[con_edad], minlength=n_contratantes)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            edad_promedio = suma_edades/asegurados
+
+        # Política de siniestralidad para renovaciones
+        siniestralidad = df_emisiones.drop_duplicates(subset="Poliza").set_index("Poliza")["Siniestralidad"]
+        renovacion = (df_param["Renovacion"] == True).to_numpy()
+        con_emision = df_param["Poliza"].isin(siniestralidad.index).to_numpy()
+        fuera_politica = renovacion & con_emision & ~(df_param["Poliza"].map(siniestralidad) < 0.50).to_numpy()
+
+        # Misma prima que `creacion_cotizacion_dict` (suma de memoria.columns[3:]: edad y cuotas)
+        primas = primas + suma_edades
+
+        mensaje = "La siniestralidad está desviada, consulte a un suscriptor"
+        prima = np.where(fuera_politica, mensaje, primas.astype(object))
+
+        df_cotizaciones = pd.DataFrame({
+            "Contratante": df_param["Contratante"],
+            "Coberturas": df_param["Coberturas"],
+            "SumaAsegurada": df_param["SumaAsegurada"],
+            "Administracion": df_param["Administracion"],
+            "Agente": df_param["Agente"],
+            "Comision": df_param["Comision"]*100,
+            "FormaPago": df_param["FormaPago"],
+            "Inicio": df_param["Inicio"],
+            "Fin": df_param["Fin"],
+            "Renovacion": df_param["Renovacion"],
+            "Poliza": df_param["Poliza"],
+            "Ticket": ticket_inicial + np.arange(n_contratantes),
+            "Oficina": df_param["Oficina"],
+            "RPF": rpf,
+            "NumRecibos": num_recibos,
+            "Descuento": descuento,
+            "Prima": prima,
+            "EdadPromedio": edad_promedio,
+            "SAMI": df_param["SumaAsegurada"],
+            "Asegurados": asegurados,
+            "Mes": [obtener_nombre_mes(inicio) for inicio in df_param["Inicio"]],
+            "Evento": np.where(fuera_politica, "Fuera de política", "na")
+        })
+
+        # Las renovaciones sin emisión no se pueden cotizar (conservan su ticket, como en el cálculo individual)
+        sin_emision = renovacion & ~con_emision
+        for contratante, poliza in zip(df_param.loc[sin_emision, "Contratante"], df_param.loc[sin_emision, "Poliza"]):
+            print(f"Error con {contratante}: no se encontró la póliza {poliza} en emisiones")
+
+        df_cotizaciones = df_cotizaciones[~sin_emision].reset_index(drop=True)
+        df_memorias = df_memorias[~sin_emision[codigos]].reset_index(drop=True)
+
+        return df_cotizaciones, df_memorias
+
+    except Exception as e:
+        print(f"Error al cotizar el lote de contratantes: {e}")
+        return pd.DataFrame(), pd.DataFrame()
+
+
+def cotizaciones_a_dicts(df_cotizaciones: pd.DataFrame) -> dict:
+    """
+    *Función que convierte la tabla de cotizaciones al diccionario de cotización de cada contratante*
+
+    **Parameters**:
+
+        df_cotizaciones (DataFrame): Tabla de cotizaciones generada por `cotizar_lote`
+
+    **Returns**:
+
+        dict: Diccionario {contratante: diccionario de cotización} con el mismo formato que `creacion_cotizacion_dict`
+    """
+
+    return {registro["Contratante"]: {campo: [valor] for campo, valor in registro.items()}
+            for registro in df_cotizaciones.to_dict("records")}
+
+
+def memorias_por_contratante(df_cotizaciones: pd.DataFrame, df_memorias: pd.DataFrame) -> dict:
+    """
+    *Función que separa la memoria de cálculo del lote en una memoria por contratante*
+
+    Cada memoria conserva sólo las columnas de las coberturas contratadas, como en `generar_memoria_calculo`.
+
+    **Parameters**:
+
+        df_cotizaciones (DataFrame): Tabla de cotizaciones generada por `cotizar_lote`
+
+        df_memorias (DataFrame): Memoria de cálculo del lote generada por `cotizar_lote`
+
+    **Returns**:
+
+        dict: Diccionario {contratante: DataFrame con su memoria de cálculo}, en el orden de `df_cotizaciones`
+    """
+
+    columnas_cuotas = [col for col in ["Fallecimiento", "MA", "BPAI"] if col in df_memorias.columns]
+    grupos = dict(list(df_memorias.groupby("Contratante", sort=False))) if len(df_memorias) else {}
+    memorias = {}
+
+    # Los contratantes sin asegurados reciben una memoria vacía
+    for contratante, cobertura in zip(df_cotizaciones["Contratante"], df_cotizaciones["Coberturas"]):
+        df_memoria = grupos.get(contratante, df_memorias.iloc[0:0])
+        excluidas = [col for col in columnas_cuotas if col not in COBERTURAS_COLUMNAS.get(cobertura, [])]
+        memorias[contratante] = df_memoria.drop(columns=excluidas).reset_index(drop=True)
+
+    return memorias
+
+
+def ultimo_ticket_historico(directorio: str) -> int:
+    """
+    *Función que obtiene el último ticket de las particiones del histórico (fecha=YYYY-MM-DD/*.parquet)*
+
+    Sólo se lee la columna Ticket de cada archivo. Se usa el máximo y no el número de registros para
+    que un archivo compactado junto con sus originales no adelante la numeración.
+
+    **Parameters**:
+
+        directorio (str): Directorio local con las particiones del histórico
+
+    **Returns**:
+
+        int: Último ticket registrado (0 si no hay particiones)
+    """
+
+    ultimo = 0
+    if not os.path.isdir(directorio):
+        return ultimo
+    for carpeta, _, archivos in os.walk(directorio):
+        for archivo in archivos:
+            if archivo.endswith(".parquet") and "fecha=" in carpeta:
+                try:
+                    tickets = pd.read_parquet(os.path.join(carpeta, archivo), columns=["Ticket"])["Ticket"]
+                    ultimo = max(ultimo, int(tickets.max()) if len(tickets) else 0)
+                except Exception as e:
+                    print(f"❌ Error al leer los tickets de {archivo}: {e}")
+    return ultimo
     
 
 ##---------------------------
@@ -318,6 +581,8 @@ def creacion_cotizacion_dict(df_parametros: pd.DataFrame, contratante:str, ticke
 
 
 INPUT_DIR = "/opt/ml/processing/input"
+# Particiones del histórico de ejecuciones anteriores (la salida master/historico montada como entrada)
+HISTORICO_INPUT_DIR = "/opt/ml/processing/historico"
 OUTPUT_DIR = "/opt/ml/processing/output"
 OUTPUT_JSON_DIR = "/opt/ml/processing/output/json"
 OUTPUT_MEMORY_DIR = "/opt/ml/processing/output/memory"
@@ -325,6 +590,7 @@ OUTPUT_MASTER_DIR = "/opt/ml/processing/output/master"
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(OUTPUT_JSON_DIR, exist_ok=True)
+os.makedirs(OUTPUT_MEMORY_DIR, exist_ok=True)
 os.makedirs(OUTPUT_MASTER_DIR, exist_ok=True)
 
 dataframes = {}
@@ -379,48 +645,47 @@ if solicitudes:
 
     # output_json_path = os.path.join(OUTPUT_DIR, "json")
     # os.makedirs(output_json_path, exist_ok=True)
-    dicts_contratantes = {}
-    ticket = len(df_hist_cotizaciones) + 1
-    for contratante in df_parametros["Contratante"].dropna().unique():
-        df_contratante = df_calculo[df_calculo["Contratante"] == contratante].copy()
-        if df_contratante.empty:
-            continue
-        cotizacion = creacion_cotizacion_dict(df_parametros, contratante, ticket, df_contratante, df_emisiones, df_cuotas)
-        df_dict_contratante = pd.DataFrame(cotizacion)
-        dicts_contratantes[contratante] = df_dict_contratante
-        ticket += 1
-        if cotizacion:
-            with open(os.path.join(OUTPUT_JSON_DIR, f"{contratante}.json"), "w") as f:
-                json.dump(cotizacion, f, indent=2, default=str)
-            print(f"📝 JSON generado: {contratante}.json")
-
-            memoria = generar_memoria_calculo(
-                contratante,
-                cotizacion['Inicio'][0],
-                df_parametros,
-                df_contratante,
-                df_cuotas,
-                cotizacion['Descuento'][0],
-                cotizacion['RPF'][0]
-            )
-            memoria.to_csv(os.path.join(OUTPUT_MEMORY_DIR, f"memoria_{contratante}.csv"), index=False)
-            print(f"📊 Memoria generada: memoria_{contratante}.csv")
+    # Se cotizan en una sola pasada los contratantes que tienen solicitud. Los tickets continúan después
+    # del histórico de entrada y de las cotizaciones que las ejecuciones anteriores agregaron a las particiones
+    ticket = max(len(df_hist_cotizaciones), ultimo_ticket_historico(HISTORICO_INPUT_DIR)) + 1
+    df_parametros_solicitudes = df_parametros[df_parametros["Contratante"].isin(df_calculo["Contratante"])]
+    df_cotizaciones, df_memorias = cotizar_lote(df_parametros_solicitudes, df_calculo, df_emisiones, df_cuotas, ticket)
+    dicts_contratantes = cotizaciones_a_dicts(df_cotizaciones)
+    memorias = memorias_por_contratante(df_cotizaciones, df_memorias)
+
+    for contratante, cotizacion in dicts_contratantes.items():
+        with open(os.path.join(OUTPUT_JSON_DIR, f"{contratante}.json"), "w") as f:
+            json.dump(cotizacion, f, indent=2, default=str)
+        print(f"📝 JSON generado: {contratante}.json")
+
+        memorias[contratante].to_csv(os.path.join(OUTPUT_MEMORY_DIR, f"memoria_{contratante}.csv"), index=False)
+        print(f"📊 Memoria generada: memoria_{contratante}.csv")
     # Historial de cotizaciones actualizado
-    df_dict_contratantes = pd.concat(dicts_contratantes.values(), ignore_index=True)
+    df_dict_contratantes = df_cotizaciones.copy()
     df_dict_contratantes['Tipo'] = np.where(df_dict_contratantes['Renovacion'] == True, 'renovación', 'nuevo') # Cambiar por True/False
     df_dict_contratantes['Fecha de Inicio'] =df_dict_contratantes['Inicio']
     cols = ['Ticket', 'Fecha de Inicio', 'Mes', "Oficina", "Contratante", "Agente", "Prima", "Evento", "Tipo"]
     df_dict_contratantes = df_dict_contratantes[cols]
-    df_hist_cotizaciones_actualizado = pd.concat([df_hist_cotizaciones, df_dict_contratantes], ignore_index=True)
     parser = argparse.ArgumentParser()
     parser.add_argument("--fecha_proceso", type=str, required=False)
     args = parser.parse_args()
-    fecha_proceso = args.fecha_proceso
-    df_hist_cotizaciones_actualizado["fecha"] = obtener_fecha(fecha_proceso)
+    fecha_proceso = obtener_fecha(args.fecha_proceso) or datetime.now().strftime("%Y-%m-%d")
+    df_dict_contratantes["fecha"] = fecha_proceso
     output_historico_path = os.path.join(OUTPUT_MASTER_DIR, "historico")
     PARTITION_OUTPUT_DIR = os.path.join(output_historico_path, f"fecha={fecha_proceso}")
     os.makedirs(PARTITION_OUTPUT_DIR, exist_ok=True)
     
-    df_hist_cotizaciones_actualizado.to_csv(os.path.join(PARTITION_OUTPUT_DIR, "cotizaciones.csv"), index=False)
-    print("📈 Cotizaciones históricas actualizadas guardadas")
+    # Sólo se agregan las cotizaciones de esta ejecución (mismo formato que src/historico_utils.py); el
+    # histórico completo es la unión de las particiones (p. ej. `leer_historico` o
+    # `compactar_historico.py --exportar` para un solo CSV)
+    # Las columnas que mezclan tipos (p. ej. Prima con el mensaje de siniestralidad) se guardan como texto,
+    # como en `tipar_columnas` de src/parquet_utils.py
+    for col in df_dict_contratantes.columns[df_dict_contratantes.dtypes == object]:
+        if df_dict_contratantes[col].dropna().map(type).nunique() > 1:
+            df_dict_contratantes[col] = df_dict_contratantes[col].where(df_dict_contratantes[col].isna(),
+                                                                        df_dict_contratantes[col].astype(str))
+    marca = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    nombre_particion = f"cotizaciones-{marca}-{os.getpid():08x}-n{len(df_dict_contratantes)}.parquet"
+    df_dict_contratantes.to_parquet(os.path.join(PARTITION_OUTPUT_DIR, nombre_particion), index=False)
+    print(f"📈 {len(df_dict_contratantes)} cotizaciones agregadas al histórico")
 print("\n✅ Proceso de cálculo de primas completado.")
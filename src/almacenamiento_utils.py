@@ -0,0 +1,662 @@
+"""
+Descripción
+===========
+Este modulo implementa la capa de almacenamiento de los pipelines: una interfaz común (listar, leer,
+escribir, consultar metadatos y lectura en streaming) con dos implementaciones, S3 y un directorio
+local, que se elige en la sección `almacenamiento` de la configuración.
+
+Las rutas son siempre llaves con `/` relativas a la raíz del almacenamiento (el bucket o el directorio),
+por lo que las rutas de la configuración sirven igual para ambos. Las funciones que reciben
+`nombre_bucket` aceptan también un `Almacenamiento`.
+
+`AlmacenamientoConCache` envuelve cualquiera de los dos con un caché de lectura en disco local: los
+objetos de referencia (parámetros, cuotas, emisiones, histórico, logos) se guardan con su ETag y en las
+siguientes lecturas sólo se pide el objeto si cambió (If-None-Match).
+
+Funciones
+===========
+"""
+import os
+import re
+import time
+import shutil
+import hashlib
+import tempfile
+from abc import ABC, abstractmethod
+from src.s3_utils import obtener_cliente_s3
+
+
+class Almacenamiento(ABC):
+    """
+    *Interfaz de almacenamiento de objetos*
+
+    Las implementaciones deben definir los métodos abstractos `iterar`, `leer`, `escribir`, `info`,
+    `abrir`, `borrar` y `escribir_condicional` (una implementación incompleta falla al crearse);
+    `listar`, `leer_si_cambio`, `leer_rango`, `subir_archivo` y `descargar_archivo` tienen una
+    implementación por defecto basada en ellas.
+    """
+
+    @abstractmethod
+    def iterar(self, prefijo: str = "", sufijo: str = None):
+        """
+        *Generador de los objetos cuya ruta empieza con `prefijo` (y termina con `sufijo`)*
+
+        El listado se recorre por páginas conforme se consume, por lo que la memoria no depende del
+        número de objetos bajo el prefijo.
+
+        **Parameters**:
+
+            prefijo (str): Prefijo de las rutas
+
+            sufijo (str | tuple): Terminación (o terminaciones) de las rutas que se entregan (None: todas)
+
+        **Returns**:
+
+            generator: Diccionarios {"ruta", "etag", "tamanio"} en orden de ruta
+        """
+
+    def listar(self, prefijo: str = "", sufijo: str = None) -> list:
+        """Lista completa de `iterar(prefijo, sufijo)`."""
+        return list(self.iterar(prefijo, sufijo))
+
+    @abstractmethod
+    def leer(self, ruta: str) -> bytes:
+        """Regresa el contenido de `ruta`; lanza FileNotFoundError si no existe."""
+
+    @abstractmethod
+    def escribir(self, ruta: str, contenido: bytes, tipo_contenido: str = None) -> None:
+        """Escribe `contenido` en `ruta` (reemplaza el objeto si ya existe)."""
+
+    @abstractmethod
+    def info(self, ruta: str):
+        """Regresa {"ruta", "etag", "tamanio"} de `ruta`, o None si no existe."""
+
+    @abstractmethod
+    def abrir(self, ruta: str):
+        """Regresa un objeto tipo archivo para leer `ruta` en streaming (hay que cerrarlo)."""
+
+    @abstractmethod
+    def borrar(self, ruta: str) -> None:
+        """Borra `ruta` si existe."""
+
+    def leer_si_cambio(self, ruta: str, etag: str = None):
+        """
+        *Lectura condicional: regresa el contenido de `ruta` sólo si su ETag ya no es `etag`*
+
+        **Parameters**:
+
+            ruta (str): Ruta del objeto
+
+            etag (str): ETag de la copia que ya se tiene (None: se lee siempre)
+
+        **Returns**:
+
+            tuple | None: (contenido, etag) del objeto, o None si no cambió
+        """
+
+        info = self.info(ruta)
+        if info is None:
+            raise FileNotFoundError(ruta)
+        if etag is not None and info["etag"] == etag:
+            return None
+        return self.leer(ruta), info["etag"]
+
+    def leer_rango(self, ruta: str, inicio: int, longitud: int) -> bytes:
+        """Regresa `longitud` bytes de `ruta` a partir del byte `inicio`."""
+        return self.leer(ruta)[inicio:inicio + longitud]
+
+    @abstractmethod
+    def escribir_condicional(self, ruta: str, contenido: bytes, etag: str = None, tipo_contenido: str = None):
+        """
+        *Escritura atómica con comparación (compare-and-swap) sobre el ETag*
+
+        **Parameters**:
+
+            ruta (str): Ruta del objeto
+
+            contenido (bytes): Contenido nuevo
+
+            etag (str): ETag que debe tener el objeto para reemplazarlo (None: sólo se escribe si no existe)
+
+            tipo_contenido (str): Content-Type del objeto
+
+        **Returns**:
+
+            str | None: ETag del objeto escrito, o None si otro proceso lo modificó antes
+        """
+
+    def subir_archivo(self, ruta_local: str, ruta: str, tipo_contenido: str = None) -> None:
+        """Copia el archivo local `ruta_local` a `ruta`."""
+        with open(ruta_local, "rb") as f:
+            self.escribir(ruta, f.read(), tipo_contenido)
+
+    def descargar_archivo(self, ruta: str, ruta_local: str) -> None:
+        """Copia `ruta` al archivo local `ruta_local` sin cargarlo completo en memoria."""
+        with self.abrir(ruta) as origen, open(ruta_local, "wb") as destino:
+            shutil.copyfileobj(origen, destino, 1024*1024)
+
+
+class AlmacenamientoS3(Almacenamiento):
+    """
+    *Almacenamiento en un bucket de S3 (con el cliente compartido de `src.s3_utils`)*
+
+    **Parameters**:
+
+        nombre_bucket (str): Nombre del bucket
+
+        cliente (botocore.client.S3): Cliente de S3 (None: el cliente compartido)
+    """
+
+    def __init__(self, nombre_bucket: str, cliente=None):
+        self.nombre_bucket = nombre_bucket
+        self._cliente = cliente
+
+    @property
+    def cliente(self):
+        return self._cliente if self._cliente is not None else obtener_cliente_s3()
+
+    def iterar(self, prefijo: str = "", sufijo: str = None):
+        # list_objects_v2 regresa a lo más 1,000 llaves por página
+        paginas = self.cliente.get_paginator('list_objects_v2').paginate(Bucket=self.nombre_bucket, Prefix=prefijo)
+        for pagina in paginas:
+            for obj in pagina.get('Contents', []):
+                if sufijo is None or obj['Key'].endswith(sufijo):
+                    yield {"ruta": obj['Key'], "etag": obj['ETag'].strip('"'), "tamanio": obj['Size']}
+
+    def leer(self, ruta: str) -> bytes:
+        try:
+            return self.cliente.get_object(Bucket=self.nombre_bucket, Key=ruta)['Body'].read()
+        except self.cliente.exceptions.NoSuchKey:
+            raise FileNotFoundError(ruta)
+
+    def escribir(self, ruta: str, contenido: bytes, tipo_contenido: str = None) -> None:
+        extra = {'ContentType': tipo_contenido} if tipo_contenido else {}
+        self.cliente.put_object(Bucket=self.nombre_bucket, Key=ruta, Body=contenido, **extra)
+
+    def info(self, ruta: str):
+        try:
+            response = self.cliente.head_object(Bucket=self.nombre_bucket, Key=ruta)
+        except self.cliente.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {"ruta": ruta, "etag": response['ETag'].strip('"'), "tamanio": response['ContentLength']}
+
+    def abrir(self, ruta: str):
+        try:
+            return self.cliente.get_object(Bucket=self.nombre_bucket, Key=ruta)['Body']
+        except self.cliente.exceptions.NoSuchKey:
+            raise FileNotFoundError(ruta)
+
+    def borrar(self, ruta: str) -> None:
+        self.cliente.delete_object(Bucket=self.nombre_bucket, Key=ruta)
+
+    def leer_si_cambio(self, ruta: str, etag: str = None):
+        # Una sola petición: GET condicional, que responde 304 sin cuerpo si el objeto no cambió
+        extra = {'IfNoneMatch': f'"{etag}"'} if etag else {}
+        try:
+            response = self.cliente.get_object(Bucket=self.nombre_bucket, Key=ruta, **extra)
+        except self.cliente.exceptions.NoSuchKey:
+            raise FileNotFoundError(ruta)
+        except self.cliente.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                return None
+            raise
+        return response['Body'].read(), response['ETag'].strip('"')
+
+    def leer_rango(self, ruta: str, inicio: int, longitud: int) -> bytes:
+        # GET con Range: sólo se transfieren los bytes pedidos
+        try:
+            response = self.cliente.get_object(Bucket=self.nombre_bucket, Key=ruta,
+                                               Range=f"bytes={inicio}-{inicio + longitud - 1}")
+        except self.cliente.exceptions.NoSuchKey:
+            raise FileNotFoundError(ruta)
+        return response['Body'].read()
+
+    def escribir_condicional(self, ruta: str, contenido: bytes, etag: str = None, tipo_contenido: str = None):
+        # Escritura condicional de S3: If-Match con el ETag leído o If-None-Match: * para crear el objeto
+        extra = {'IfMatch': f'"{etag}"'} if etag else {'IfNoneMatch': '*'}
+        if tipo_contenido:
+            extra['ContentType'] = tipo_contenido
+        try:
+            response = self.cliente.put_object(Bucket=self.nombre_bucket, Key=ruta, Body=contenido, **extra)
+        except self.cliente.exceptions.ClientError as e:
+            # 412: el ETag ya no coincide; 409: otra escritura condicional sobre la misma llave está en curso
+            if e.response.get('Error', {}).get('Code') in ('PreconditionFailed', 'ConditionalRequestConflict',
+                                                           '412', '409'):
+                return None
+            raise
+        return response['ETag'].strip('"')
+
+    def subir_archivo(self, ruta_local: str, ruta: str, tipo_contenido: str = None) -> None:
+        extra = {'ContentType': tipo_contenido} if tipo_contenido else None
+        self.cliente.upload_file(ruta_local, self.nombre_bucket, ruta, ExtraArgs=extra)
+
+    def descargar_archivo(self, ruta: str, ruta_local: str) -> None:
+        self.cliente.download_file(self.nombre_bucket, ruta, ruta_local)
+
+
+class AlmacenamientoLocal(Almacenamiento):
+    """
+    *Almacenamiento en un directorio local (cada ruta es un archivo bajo el directorio)*
+
+    El ETag de un archivo se forma con su fecha de modificación y su tamaño, por lo que cambia cada
+    vez que el archivo se reescribe. Las escrituras son atómicas (archivo temporal y renombrado).
+
+    **Parameters**:
+
+        directorio (str): Directorio raíz
+    """
+
+    def __init__(self, directorio: str):
+        self.directorio = os.path.abspath(directorio)
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta_local(self, ruta: str) -> str:
+        ruta_local = os.path.abspath(os.path.join(self.directorio, *ruta.split("/")))
+        if os.path.commonpath([ruta_local, self.directorio]) != self.directorio:
+            raise ValueError(f"Ruta fuera del almacenamiento: {ruta}")
+        return ruta_local
+
+    def _info_local(self, ruta: str, ruta_local: str) -> dict:
+        estado = os.stat(ruta_local)
+        return {"ruta": ruta, "etag": f"{estado.st_mtime_ns:x}-{estado.st_size:x}", "tamanio": estado.st_size}
+
+    def iterar(self, prefijo: str = "", sufijo: str = None):
+        # Sólo se recorre el directorio que contiene al prefijo, un directorio a la vez y en orden de ruta
+        base = prefijo.rsplit("/", 1)[0] if "/" in prefijo else ""
+        yield from self._iterar_directorio(self._ruta_local(base) if base else self.directorio, prefijo, sufijo)
+
+    def _iterar_directorio(self, carpeta: str, prefijo: str, sufijo):
+        try:
+            entradas = sorted(os.scandir(carpeta), key=lambda entrada: entrada.name)
+        except FileNotFoundError:
+            return
+        for entrada in entradas:
+            ruta = os.path.relpath(entrada.path, self.directorio).replace(os.sep, "/")
+            if entrada.is_dir():
+                if ruta.startswith(prefijo) or prefijo.startswith(f"{ruta}/"):
+                    yield from self._iterar_directorio(entrada.path, prefijo, sufijo)
+            elif ruta.startswith(prefijo) and not entrada.name.startswith((".tmp", ".lock")) and (
+                    sufijo is None or ruta.endswith(sufijo)):
+                yield self._info_local(ruta, entrada.path)
+
+    def leer(self, ruta: str) -> bytes:
+        with open(self._ruta_local(ruta), "rb") as f:
+            return f.read()
+
+    def escribir(self, ruta: str, contenido: bytes, tipo_contenido: str = None) -> None:
+        ruta_local = self._ruta_local(ruta)
+        os.makedirs(os.path.dirname(ruta_local), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta_local), prefix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(contenido)
+            os.replace(temporal, ruta_local)
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    def info(self, ruta: str):
+        ruta_local = self._ruta_local(ruta)
+        if not os.path.isfile(ruta_local):
+            return None
+        return self._info_local(ruta, ruta_local)
+
+    def abrir(self, ruta: str):
+        return open(self._ruta_local(ruta), "rb")
+
+    def borrar(self, ruta: str) -> None:
+        ruta_local = self._ruta_local(ruta)
+        if os.path.exists(ruta_local):
+            os.remove(ruta_local)
+
+    def leer_si_cambio(self, ruta: str, etag: str = None):
+        # El ETag se toma del archivo abierto para que corresponda al contenido leído
+        with open(self._ruta_local(ruta), "rb") as f:
+            estado = os.fstat(f.fileno())
+            etag_actual = f"{estado.st_mtime_ns:x}-{estado.st_size:x}"
+            if etag is not None and etag_actual == etag:
+                return None
+            return f.read(), etag_actual
+
+    def leer_rango(self, ruta: str, inicio: int, longitud: int) -> bytes:
+        with open(self._ruta_local(ruta), "rb") as f:
+            f.seek(inicio)
+            return f.read(longitud)
+
+    def escribir_condicional(self, ruta: str, contenido: bytes, etag: str = None, tipo_contenido: str = None):
+        # La comparación y el reemplazo se hacen con un candado de archivo, que también excluye a otros procesos
+        import fcntl
+
+        ruta_local = self._ruta_local(ruta)
+        os.makedirs(os.path.dirname(ruta_local), exist_ok=True)
+        candado_local = os.path.join(os.path.dirname(ruta_local), f".lock{os.path.basename(ruta_local)}")
+        with open(candado_local, "a") as candado:
+            fcntl.flock(candado, fcntl.LOCK_EX)
+            try:
+                actual = self.info(ruta)
+                if (actual["etag"] if actual else None) != etag:
+                    return None
+                self.escribir(ruta, contenido, tipo_contenido)
+                nuevo = self.info(ruta)
+                if actual is not None and nuevo["etag"] == actual["etag"]:
+                    # Misma marca de tiempo y tamaño que la versión anterior: se avanza la fecha para que el
+                    # ETag cambie
+                    estado = os.stat(ruta_local)
+                    os.utime(ruta_local, ns=(estado.st_atime_ns, estado.st_mtime_ns + 1))
+                    nuevo = self.info(ruta)
+                return nuevo["etag"]
+            finally:
+                fcntl.flock(candado, fcntl.LOCK_UN)
+
+    def subir_archivo(self, ruta_local: str, ruta: str, tipo_contenido: str = None) -> None:
+        destino = self._ruta_local(ruta)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), prefix=".tmp")
+        os.close(descriptor)
+        shutil.copyfile(ruta_local, temporal)
+        os.replace(temporal, destino)
+
+    def descargar_archivo(self, ruta: str, ruta_local: str) -> None:
+        shutil.copyfile(self._ruta_local(ruta), ruta_local)
+
+
+class AlmacenamientoConCache(Almacenamiento):
+    """
+    *Caché de lectura en disco local sobre otro almacenamiento, con validación por ETag y desalojo LRU*
+
+    Cada objeto se guarda en `directorio/<huella de la ruta>/<ETag>`. Al leer una ruta en caché se hace una
+    lectura condicional (If-None-Match con el ETag guardado): si el objeto no cambió no se transfiere y se
+    usa la copia local. La fecha de modificación de la copia marca su último uso; al rebasar `max_bytes` se
+    borran las copias usadas menos recientemente. Las copias se escriben a un temporal y se renombran, por
+    lo que varios procesos pueden compartir el directorio. Las escrituras y borrados pasan al almacenamiento
+    y descartan la copia local de la ruta.
+
+    **Parameters**:
+
+        almacenamiento (Almacenamiento): Almacenamiento de origen
+
+        directorio (str): Directorio del caché
+
+        max_bytes (int): Tamaño máximo del caché en disco
+
+        rutas (list): Rutas (o prefijos) que pasan por el caché (None: todas)
+
+        validez_segundos (float): Segundos después de una validación en los que la copia se usa sin consultar
+        el origen (0: se valida en cada lectura)
+    """
+
+    def __init__(self, almacenamiento: Almacenamiento, directorio: str, max_bytes: int = 512*1024**2,
+                 rutas: list = None, validez_segundos: float = 0):
+        self.almacenamiento = almacenamiento
+        self.directorio = os.path.abspath(directorio)
+        self.max_bytes = max_bytes
+        self.rutas = tuple(rutas) if rutas is not None else None
+        self.validez_segundos = validez_segundos
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes_evitados = 0
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _en_cache(self, ruta: str) -> bool:
+        return self.rutas is None or ruta.startswith(self.rutas)
+
+    def _carpeta(self, ruta: str) -> str:
+        return os.path.join(self.directorio, hashlib.sha256(ruta.encode('utf-8')).hexdigest()[:40])
+
+    def _copia(self, ruta: str):
+        """Regresa (ruta local, etag, fecha de uso) de la copia de `ruta`, o None si no hay."""
+        try:
+            with os.scandir(self._carpeta(ruta)) as entradas:
+                for entrada in entradas:
+                    if not entrada.name.startswith(".tmp"):
+                        return entrada.path, entrada.name, entrada.stat().st_mtime
+        except FileNotFoundError:
+            pass
+        return None
+
+    def _descartar(self, ruta: str, conservar: str = None) -> None:
+        carpeta = self._carpeta(ruta)
+        try:
+            nombres = os.listdir(carpeta)
+        except FileNotFoundError:
+            return
+        for nombre in nombres:
+            if nombre != conservar and not nombre.startswith(".tmp"):
+                try:
+                    os.remove(os.path.join(carpeta, nombre))
+                except FileNotFoundError:
+                    pass
+
+    def _guardar_copia(self, ruta: str, etag: str, contenido: bytes) -> None:
+        if len(contenido) > self.max_bytes:
+            return
+        carpeta = self._carpeta(ruta)
+        os.makedirs(carpeta, exist_ok=True)
+        # El nombre de la copia es su ETag (hexadecimal en S3 y en el almacenamiento local)
+        nombre = re.sub(r"[^A-Za-z0-9_-]", "_", etag)
+        descriptor, temporal = tempfile.mkstemp(dir=carpeta, prefix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(contenido)
+            os.replace(temporal, os.path.join(carpeta, nombre))
+        except Exception:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        self._descartar(ruta, conservar=nombre)
+        self._desalojar()
+
+    def _desalojar(self) -> None:
+        copias = []
+        for carpeta in os.scandir(self.directorio):
+            if not carpeta.is_dir():
+                continue
+            try:
+                with os.scandir(carpeta.path) as entradas:
+                    for entrada in entradas:
+                        if not entrada.name.startswith(".tmp"):
+                            estado = entrada.stat()
+                            copias.append((estado.st_mtime, estado.st_size, entrada.path))
+            except FileNotFoundError:
+                continue
+
+        total = sum(tamanio for _, tamanio, _ in copias)
+        for _, tamanio, ruta_local in sorted(copias):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(ruta_local)
+            except FileNotFoundError:
+                pass
+            total -= tamanio
+
+    def leer(self, ruta: str) -> bytes:
+        if not self._en_cache(ruta):
+            return self.almacenamiento.leer(ruta)
+
+        copia = self._copia(ruta)
+        etag = None
+        if copia is not None:
+            ruta_local, etag, uso = copia
+            if self.validez_segundos and time.time() - uso < self.validez_segundos:
+                contenido = self._leer_copia(ruta_local)
+                if contenido is not None:
+                    return contenido
+
+        # Lectura condicional contra el origen; no se transfiere nada si la copia sigue vigente
+        resultado = self.almacenamiento.leer_si_cambio(ruta, etag)
+        if resultado is None:
+            contenido = self._leer_copia(ruta_local, marcar_uso=True)
+            if contenido is not None:
+                return contenido
+            resultado = self.almacenamiento.leer_si_cambio(ruta)
+
+        contenido, etag = resultado
+        self.fallos += 1
+        try:
+            self._guardar_copia(ruta, etag, contenido)
+        except Exception as e:
+            print(f"Error al guardar {ruta} en el caché local: {e}")
+        return contenido
+
+    def _leer_copia(self, ruta_local: str, marcar_uso: bool = False):
+        """Contenido de una copia local (None si otro proceso la desalojó)."""
+        try:
+            with open(ruta_local, "rb") as f:
+                contenido = f.read()
+            if marcar_uso:
+                os.utime(ruta_local)
+        except FileNotFoundError:
+            return None
+        self.aciertos += 1
+        self.bytes_evitados += len(contenido)
+        return contenido
+
+    def escribir(self, ruta: str, contenido: bytes, tipo_contenido: str = None) -> None:
+        self.almacenamiento.escribir(ruta, contenido, tipo_contenido)
+        self._descartar(ruta)
+
+    def subir_archivo(self, ruta_local: str, ruta: str, tipo_contenido: str = None) -> None:
+        self.almacenamiento.subir_archivo(ruta_local, ruta, tipo_contenido)
+        self._descartar(ruta)
+
+    def borrar(self, ruta: str) -> None:
+        self.almacenamiento.borrar(ruta)
+        self._descartar(ruta)
+
+    def iterar(self, prefijo: str = "", sufijo: str = None):
+        return self.almacenamiento.iterar(prefijo, sufijo)
+
+    def info(self, ruta: str):
+        return self.almacenamiento.info(ruta)
+
+    def abrir(self, ruta: str):
+        return self.almacenamiento.abrir(ruta)
+
+    def leer_si_cambio(self, ruta: str, etag: str = None):
+        return self.almacenamiento.leer_si_cambio(ruta, etag)
+
+    def leer_rango(self, ruta: str, inicio: int, longitud: int) -> bytes:
+        return self.almacenamiento.leer_rango(ruta, inicio, longitud)
+
+    def escribir_condicional(self, ruta: str, contenido: bytes, etag: str = None, tipo_contenido: str = None):
+        nuevo = self.almacenamiento.escribir_condicional(ruta, contenido, etag, tipo_contenido)
+        self._descartar(ruta)
+        return nuevo
+
+    def descargar_archivo(self, ruta: str, ruta_local: str) -> None:
+        self.almacenamiento.descargar_archivo(ruta, ruta_local)
+
+    def estadisticas(self) -> dict:
+        """
+        *Regresa los contadores del caché en este proceso*
+
+        **Returns**:
+
+            dict: Aciertos, fallos, tasa de aciertos y bytes que no se transfirieron
+        """
+
+        consultas = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos/consultas if consultas else 0.0,
+            "bytes_evitados": self.bytes_evitados
+        }
+
+
+def crear_almacenamiento(config: dict) -> Almacenamiento:
+    """
+    *Función que construye el almacenamiento indicado en la configuración*
+
+    **Parameters**:
+
+        config (dict): Configuración (como `config/config.yaml`). `almacenamiento.tipo` es "s3" (por defecto,
+        usa `s3.bucket_name`) o "local" (usa `almacenamiento.directorio`)
+
+    **Returns**:
+
+        Almacenamiento: Almacenamiento configurado
+    """
+
+    opciones = config.get('almacenamiento') or {}
+    tipo = (opciones.get('tipo') or 's3').lower()
+
+    if tipo == 'local':
+        almacenamiento = AlmacenamientoLocal(opciones.get('directorio') or 'data/almacenamiento')
+    elif tipo == 's3':
+        almacenamiento = AlmacenamientoS3(config['s3']['bucket_name'])
+    else:
+        raise ValueError(f"Tipo de almacenamiento no soportado: {tipo}")
+
+    if not opciones.get('cache_directorio'):
+        return almacenamiento
+    return AlmacenamientoConCache(almacenamiento, opciones['cache_directorio'],
+                                  (opciones.get('cache_max_mb') or 512)*1024**2,
+                                  rutas_cache(config), opciones.get('cache_validez_segundos') or 0)
+
+
+def rutas_cache(config: dict) -> list:
+    """
+    *Función que regresa las rutas que pasan por el caché local de lecturas*
+
+    **Parameters**:
+
+        config (dict): Configuración. Se usan `almacenamiento.cache_rutas` y las rutas de referencia de `paths`
+        (parámetros, cuotas, emisiones, histórico, dashboard y logos), también bajo `pipeline.parquet_prefijo`
+
+    **Returns**:
+
+        list: Rutas o prefijos
+    """
+
+    referencias = [config.get('paths', {}).get(llave) for llave in
+                   ('parametros_path', 'cuotas_path', 'emisiones_path', 'historico_path', 'dashborad_path',
+                    'logo_principal', 'logo_secundario')]
+    referencias = [ruta for ruta in referencias if ruta]
+    prefijo_parquet = (config.get('pipeline') or {}).get('parquet_prefijo')
+    if prefijo_parquet:
+        referencias += [f"{prefijo_parquet}{ruta}" for ruta in referencias]
+    return list((config.get('almacenamiento') or {}).get('cache_rutas') or []) + referencias
+
+
+def iterar_rutas(prefijo: str, nombre_bucket, sufijo: str = None):
+    """
+    *Generador paginado de las rutas bajo un prefijo*
+
+    **Parameters**:
+
+        prefijo (str): Prefijo de las rutas
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+        sufijo (str | tuple): Terminación de las rutas que se entregan (None: todas)
+
+    **Returns**:
+
+        generator: Rutas en orden
+    """
+
+    for objeto in obtener_almacenamiento(nombre_bucket).iterar(prefijo, sufijo):
+        yield objeto["ruta"]
+
+
+def obtener_almacenamiento(nombre_bucket) -> Almacenamiento:
+    """
+    *Función que regresa el almacenamiento de un argumento `nombre_bucket`*
+
+    **Parameters**:
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+    **Returns**:
+
+        Almacenamiento: El almacenamiento recibido o uno de S3 sobre el bucket
+    """
+
+    if isinstance(nombre_bucket, Almacenamiento):
+        return nombre_bucket
+    return AlmacenamientoS3(nombre_bucket)
@@ -0,0 +1,330 @@
+"""
+Descripción
+===========
+Este modulo implementa un caché persistente de cotizaciones. Cada entrada se identifica por la
+huella de la base de asegurados del contratante, de su registro de parámetros, de la versión de la
+tabla de cuotas (`experiencia_global`) y de la siniestralidad de la póliza, de modo que una
+cotización repetida se obtiene sin volver a calcularla. El caché vive en un directorio local o en
+un prefijo de S3 y se limita por tamaño, desalojando las entradas usadas menos recientemente.
+
+Cada entrada es un archivo Parquet con la memoria de cálculo como tabla y la cotización (con el tipo
+de cada valor) como metadatos JSON, por lo que leer el caché nunca ejecuta código. El índice de
+tamaños y usos se publica con escritura condicional, de modo que ejecuciones simultáneas sobre el
+mismo prefijo no pierden entradas.
+
+Funciones
+===========
+"""
+import json
+import time
+import random
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from io import BytesIO
+from src.incremental_utils import huella_registro
+from src.almacenamiento_utils import AlmacenamientoLocal, obtener_almacenamiento
+
+
+def huellas_filas(df_calculo: pd.DataFrame) -> np.ndarray:
+    """
+    *Función que calcula la huella de cada fila de una base de asegurados*
+
+    **Parameters**:
+
+        df_calculo (DataFrame): Base de asegurados
+
+    **Returns**:
+
+        ndarray: Arreglo uint64 con una huella por fila (no depende del índice del DataFrame)
+    """
+
+    return pd.util.hash_pandas_object(df_calculo, index=False).to_numpy()
+
+
+def huella_censo(huellas: np.ndarray, columnas) -> str:
+    """
+    *Función que calcula la huella SHA-256 de la base de asegurados de un contratante*
+
+    **Parameters**:
+
+        huellas (ndarray): Huellas de las filas del contratante, en su orden (ver `huellas_filas`)
+
+        columnas (list): Columnas de la base de asegurados
+
+    **Returns**:
+
+        str: Huella hexadecimal; cambia si cambia cualquier asegurado, su orden o las columnas
+    """
+
+    huella = hashlib.sha256("|".join(map(str, columnas)).encode('utf-8'))
+    huella.update(np.ascontiguousarray(huellas, dtype=np.uint64).tobytes())
+    return huella.hexdigest()
+
+
+def llave_cotizacion(modo: str, huella_asegurados: str, registro: dict, version_cuotas: str, siniestralidad=None) -> str:
+    """
+    *Función que construye la llave de una cotización en el caché*
+
+    **Parameters**:
+
+        modo (str): Forma de cotizar (por contratante o por lote, con memoria o por histograma)
+
+        huella_asegurados (str): Huella de la base de asegurados del contratante (ver `huella_censo`)
+
+        registro (dict): Registro de parámetros del contratante
+
+        version_cuotas (str): Versión de la tabla de cuotas (`TablaCuotas.version`)
+
+        siniestralidad: Siniestralidad de la póliza para renovaciones (None si no aplica)
+
+    **Returns**:
+
+        str: Llave hexadecimal de la cotización
+    """
+
+    contenido = "|".join([modo, huella_asegurados, huella_registro(registro), version_cuotas, repr(siniestralidad)])
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def _codificar_valor(valor):
+    """Valor de la cotización como [tipo, dato] de JSON, conservando el tipo de NumPy o pandas."""
+    if isinstance(valor, list):
+        return ["list", [_codificar_valor(elemento) for elemento in valor]]
+    if isinstance(valor, pd.Timestamp):
+        return ["Timestamp", valor.isoformat()]
+    if isinstance(valor, np.datetime64):
+        return ["datetime64", str(valor)]
+    if isinstance(valor, np.generic):
+        return [valor.dtype.str, valor.item()]
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return ["py", valor]
+    raise TypeError(f"Tipo no soportado en el caché: {type(valor).__name__}")
+
+
+def _decodificar_valor(codigo):
+    tipo, dato = codigo
+    if tipo == "list":
+        return [_decodificar_valor(elemento) for elemento in dato]
+    if tipo == "Timestamp":
+        return pd.Timestamp(dato)
+    if tipo == "datetime64":
+        return np.datetime64(dato)
+    if tipo == "py":
+        return dato
+    return np.dtype(tipo).type(dato)
+
+
+class CacheCotizaciones:
+    """
+    *Caché persistente de cotizaciones con desalojo LRU limitado por tamaño*
+
+    Las entradas se guardan como archivos Parquet en `directorio` o, si se indica `nombre_bucket` (nombre
+    del bucket o un `Almacenamiento`), como objetos bajo `prefijo`. Un índice JSON junto a las entradas
+    registra el tamaño y el último uso de cada una; al rebasar `max_bytes` se borran las usadas menos
+    recientemente. El índice se persiste con `guardar()`, que se llama al terminar cada cotización o lote,
+    y se combina con los cambios de otras ejecuciones mediante escritura condicional. Los contadores
+    `aciertos` y `fallos` se reportan con `estadisticas()`.
+    """
+
+    def __init__(self, directorio: str = None, nombre_bucket: str = None, prefijo: str = "",
+                 max_bytes: int = 256*1024**2, reintentos: int = 10):
+        self.directorio = directorio
+        self.nombre_bucket = nombre_bucket
+        self.prefijo = prefijo
+        self.max_bytes = max_bytes
+        self.reintentos = reintentos
+        self.aciertos = 0
+        self.fallos = 0
+
+        if nombre_bucket is not None:
+            self._almacenamiento = obtener_almacenamiento(nombre_bucket)
+        else:
+            self._almacenamiento = AlmacenamientoLocal(directorio)
+            self.prefijo = ""
+
+        # Cambios de esta ejecución sobre el índice, que se combinan con el índice publicado en `guardar()`
+        try:
+            self._indice, self._etag_indice = self._cargar_indice()
+        except Exception:
+            self._indice, self._etag_indice = {}, None
+        self._cambios = {}
+        self._borradas = set()
+
+    def _ruta(self, nombre: str) -> str:
+        return f"{self.prefijo}{nombre}"
+
+    def _leer(self, nombre: str) -> bytes:
+        return self._almacenamiento.leer(self._ruta(nombre))
+
+    def _escribir(self, nombre: str, contenido: bytes) -> None:
+        # Cada entrada se escribe completa: en disco a un temporal que se renombra y en S3 como un solo objeto
+        self._almacenamiento.escribir(self._ruta(nombre), contenido)
+
+    def _borrar(self, nombre: str) -> None:
+        self._almacenamiento.borrar(self._ruta(nombre))
+
+    def _cargar_indice(self, etag: str = None) -> tuple:
+        """Regresa (índice publicado, ETag); (None, etag) si no cambió desde `etag` y ({}, None) si no existe."""
+        try:
+            resultado = self._almacenamiento.leer_si_cambio(self._ruta("indice.json"), etag)
+        except FileNotFoundError:
+            return {}, None
+        if resultado is None:
+            return None, etag
+        contenido, etag_actual = resultado
+        try:
+            return json.loads(contenido.decode('utf-8')), etag_actual
+        except ValueError:
+            # Índice corrupto: se reemplaza en la siguiente escritura
+            return {}, etag_actual
+
+    def obtener(self, llave: str):
+        """
+        *Obtiene una cotización del caché*
+
+        **Parameters**:
+
+            llave (str): Llave de la cotización (ver `llave_cotizacion`)
+
+        **Returns**:
+
+            tuple | None: (cotizacion, memoria) guardados, o None si la llave no está en el caché
+        """
+
+        if llave not in self._indice:
+            self.fallos += 1
+            return None
+
+        try:
+            tabla = pq.read_table(BytesIO(self._leer(f"{llave}.parquet")))
+            metadatos = json.loads(tabla.schema.metadata[b"cotizacion"].decode('utf-8'))
+            cotizacion = {columna: _decodificar_valor(codigo) for columna, codigo in metadatos["cotizacion"].items()}
+            memoria = tabla.to_pandas() if metadatos["con_memoria"] else None
+        except Exception:
+            # La entrada se perdió o está corrupta: se trata como un fallo
+            self._indice.pop(llave, None)
+            self._cambios.pop(llave, None)
+            self._borradas.add(llave)
+            self.fallos += 1
+            return None
+
+        self._indice[llave]["uso"] = time.time()
+        self._cambios[llave] = self._indice[llave]
+        self.aciertos += 1
+        return cotizacion, memoria
+
+    def guardar_cotizacion(self, llave: str, cotizacion: dict, memoria=None) -> None:
+        """
+        *Agrega una cotización al caché y desaloja las entradas menos usadas si se rebasa el tamaño*
+
+        **Parameters**:
+
+            llave (str): Llave de la cotización (ver `llave_cotizacion`)
+
+            cotizacion (dict): Diccionario de la cotización ({columna: [valor]} o {columna: valor})
+
+            memoria (DataFrame): Memoria de cálculo del contratante (None si no se generó)
+
+        **Returns**:
+
+            None
+        """
+
+        try:
+            metadatos = {"cotizacion": {columna: _codificar_valor(valor) for columna, valor in cotizacion.items()},
+                         "con_memoria": memoria is not None}
+            tabla = pa.Table.from_pandas(memoria if memoria is not None else pd.DataFrame(), preserve_index=False)
+            tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}),
+                                                   b"cotizacion": json.dumps(metadatos).encode('utf-8')})
+            buffer = BytesIO()
+            pq.write_table(tabla, buffer)
+            contenido = buffer.getvalue()
+
+            self._escribir(f"{llave}.parquet", contenido)
+            self._indice[llave] = {"uso": time.time(), "bytes": len(contenido)}
+            self._cambios[llave] = self._indice[llave]
+            self._borradas.discard(llave)
+            self._desalojar()
+
+        except Exception as e:
+            print(f"Error al guardar la cotización en el caché: {e}")
+
+    def _desalojar(self, indice: dict = None) -> None:
+        # Sobre el índice local o, al publicar, sobre el índice combinado con el de otras ejecuciones
+        indice = self._indice if indice is None else indice
+        total = sum(entrada["bytes"] for entrada in indice.values())
+        for llave in sorted(indice, key=lambda llave: indice[llave]["uso"]):
+            if total <= self.max_bytes:
+                break
+            total -= indice.pop(llave)["bytes"]
+            self._indice.pop(llave, None)
+            self._cambios.pop(llave, None)
+            self._borradas.add(llave)
+            self._borrar(f"{llave}.parquet")
+
+    def guardar(self) -> None:
+        """
+        *Persiste el índice del caché (tamaños y último uso de las entradas)*
+
+        Los cambios de esta ejecución se aplican sobre el índice publicado y se escriben con una escritura
+        condicional; si otra ejecución lo reemplazó entretanto, se vuelve a leer y a combinar. Antes de
+        publicar se desalojan las entradas menos usadas del índice combinado hasta respetar `max_bytes`.
+
+        **Returns**:
+
+            None
+        """
+
+        if not self._cambios and not self._borradas:
+            return
+        try:
+            for intento in range(self.reintentos):
+                # Si nadie movió el índice desde la última lectura, el índice local ya tiene los cambios aplicados
+                indice, etag = self._cargar_indice(self._etag_indice)
+                if indice is None:
+                    indice = dict(self._indice)
+                else:
+                    for llave in self._borradas:
+                        indice.pop(llave, None)
+                    for llave, entrada in self._cambios.items():
+                        if llave not in indice or indice[llave]["uso"] < entrada["uso"]:
+                            indice[llave] = entrada
+                # Las entradas de otras ejecuciones también cuentan para `max_bytes`
+                self._desalojar(indice)
+
+                nuevo_etag = self._almacenamiento.escribir_condicional(
+                    self._ruta("indice.json"), json.dumps(indice).encode('utf-8'), etag, 'application/json'
+                )
+                if nuevo_etag is not None:
+                    self._indice, self._etag_indice = indice, nuevo_etag
+                    self._cambios, self._borradas = {}, set()
+                    return
+
+                # Otra ejecución publicó su índice entre la lectura y la escritura: se vuelve a combinar
+                self._etag_indice = None
+                time.sleep(0.05*2**min(intento, 6)*random.uniform(0.5, 1.0))
+
+            print(f"No se pudo publicar el índice del caché tras {self.reintentos} intentos")
+        except Exception as e:
+            print(f"Error al guardar el índice del caché: {e}")
+
+    def estadisticas(self) -> dict:
+        """
+        *Regresa los contadores del caché*
+
+        **Returns**:
+
+            dict: Aciertos, fallos, tasa de aciertos, número de entradas y bytes ocupados
+        """
+
+        consultas = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos/consultas if consultas else 0.0,
+            "entradas": len(self._indice),
+            "bytes": sum(entrada["bytes"] for entrada in self._indice.values())
+        }
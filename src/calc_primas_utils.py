@@ -6,15 +6,48 @@ Este modulo implementa funciones utilizadas para la cotizacón de primas de segu
 Funciones
 ===========
 """
+import os
+import hashlib
 import numpy as np
 import pandas as pd
-import boto3
 from io import BytesIO
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from openpyxl import load_workbook
+import pyarrow.parquet as pq
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from typing import Any
+from src.cache_utils import huellas_filas, huella_censo, llave_cotizacion
+from src.cotizacion_utils import cotizaciones_desde_tabla
+from src.instrumentacion_utils import etapa, subetapa, contar
+from src.almacenamiento_utils import obtener_almacenamiento, iterar_rutas
+from src.parquet_utils import leer_tabla
+
+# Columnas de cuotas que aplican a cada código de cobertura
+COBERTURAS_COLUMNAS = {
+    "F": ["Fallecimiento"],
+    "FMA": ["Fallecimiento", "MA"],
+    "FBPAI": ["Fallecimiento", "BPAI"],
+    "FMABPAI": ["Fallecimiento", "MA", "BPAI"]
+}
+
+# Recargo por pago fraccionado y número de recibos por forma de pago
+RECARGOS_FORMA_PAGO = {
+    "anual": {"rpf": 0.0, "num_recibos": 1},
+    "semestral": {"rpf": 0.037, "num_recibos": 2},
+    "trimestral": {"rpf": 0.055, "num_recibos": 4},
+    "mensual": {"rpf": 0.065, "num_recibos": 12}
+}
+
+# Descuento por nivel de comisión
+DESCUENTOS_COMISION = {
+    0.20: 0.00, 0.19: 0.02, 0.18: 0.03, 0.17: 0.04, 0.16: 0.06,
+    0.15: 0.07, 0.14: 0.09, 0.13: 0.10, 0.12: 0.12, 0.11: 0.13,
+    0.10: 0.15, 0.09: 0.16, 0.08: 0.18, 0.07: 0.19, 0.06: 0.21, 0.05: 0.22
+}
+
 
 def calcular_edad(fecha_nac, fecha_ref):
     """
@@ -46,6 +79,64 @@ def calcular_edad(fecha_nac, fecha_ref):
         return 0
 
 
+def calcular_edades(fechas_nac, fecha_ref) -> np.ndarray:
+    """
+    *Calcula en una sola pasada la edad de todas las personas de una columna de fechas de nacimiento.*
+
+    Aplica la misma regla que `calcular_edad`: regresa -1 si la fecha de referencia es anterior
+    al nacimiento y resta un año si aún no se llega al cumpleaños. Las fechas vacías producen NaN
+    y las fechas que no se pueden interpretar en bloque se resuelven con `calcular_edad`.
+
+    **Parameters**:
+
+        fechas_nac (Series): Columna "Fecha de Nacimiento" de la base de asegurados.
+
+        fecha_ref (datetime.date | np.datetime64 | array-like): Fecha de corte, única o una por persona.
+
+    **Returns**:
+
+        np.ndarray: Arreglo de edades enteras (float con NaN si hay fechas de nacimiento vacías).
+    """
+
+    fechas = pd.Series(fechas_nac).reset_index(drop=True)
+    es_escalar = np.ndim(fecha_ref) == 0
+
+    try:
+        fecha_ref_conv = pd.to_datetime(fecha_ref)
+        fechas_conv = pd.to_datetime(fechas, errors='coerce')
+
+        anio_ref = np.asarray(fecha_ref_conv.year)
+        mes_ref = np.asarray(fecha_ref_conv.month)
+        dia_ref = np.asarray(fecha_ref_conv.day)
+
+        anio_nac = fechas_conv.dt.year.to_numpy(dtype='float64', na_value=np.nan)
+        mes_nac = fechas_conv.dt.month.to_numpy(dtype='float64', na_value=np.nan)
+        dia_nac = fechas_conv.dt.day.to_numpy(dtype='float64', na_value=np.nan)
+
+        # Se resta un año a quienes aún no cumplen años en la fecha de corte
+        sin_cumpleanios = (mes_ref < mes_nac) | ((mes_ref == mes_nac) & (dia_ref < dia_nac))
+        edades = anio_ref - anio_nac - sin_cumpleanios
+
+        # Fechas de nacimiento posteriores a la fecha de corte
+        futuras = (fechas_conv > (fecha_ref_conv if es_escalar else pd.Series(fecha_ref_conv))).to_numpy()
+        edades = np.where(futuras, -1, edades)
+
+        # Las fechas no vacías que no se pudieron convertir se calculan una por una
+        pendientes = np.flatnonzero(fechas_conv.isna().to_numpy() & fechas.notna().to_numpy())
+
+    except Exception as e:
+        print(f"Error calculando edades en bloque, se calcularán una por una: {e}")
+        edades = np.full(len(fechas), np.nan)
+        pendientes = np.arange(len(fechas))
+
+    for i in pendientes:
+        edades[i] = calcular_edad(fechas.iat[i], fecha_ref if es_escalar else np.asarray(fecha_ref)[i])
+
+    if np.isnan(edades).any():
+        return edades
+    return edades.astype(np.int64)
+
+
 def obtener_lista_nombre_bases(ruta_s3_base_datos:str, nombre_bucket:str) -> list:
     
     """
@@ -55,40 +146,319 @@ def obtener_lista_nombre_bases(ruta_s3_base_datos:str, nombre_bucket:str) -> lis
 
         ruta_s3_base_datos (str): Ruta del archivo en S3
 
-        nombre_bucket (str): Nombre del bucket de S3
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 (o el almacenamiento)
 
     **Returns**:
 
-        list_base (list): Lista con los datos de la base de datos
+        list_base (list): Lista con las rutas de las bases (.xlsx) de la carpeta
 
     """
     
     try:
-        # Obtenemos la lista de objetos en la carpeta especificada
-        s3 = boto3.client('s3')
-        response = s3.list_objects_v2(Bucket=nombre_bucket, Prefix=ruta_s3_base_datos)
+        # Obtenemos los archivos .xlsx de la carpeta (el listado se recorre por páginas)
+        list_base = list(iterar_rutas(ruta_s3_base_datos, nombre_bucket, '.xlsx'))
 
-        if 'Contents' not in response:
+        if not list_base:
             print("No se encontraron archivos en esa carpeta.")
-            return []
-        else:
-            list_base = [obj['Key'] for obj in response['Contents']]
-            # Filtramos los archivos que terminan con .xlsx
-            list_base = [file for file in list_base if file.endswith('.xlsx')]
-            return list_base            
+        return list_base
     
     except Exception as e:
         print(f"Error al obtener la base de datos: {e}")
         return []
 
-def obtener_base_parametros(ruta_archivo:str, nombre_bucket:str) -> pd.DataFrame:
+def obtener_etags_bases(ruta_s3_base_datos:str, nombre_bucket:str) -> dict:
+    """
+    *Obtiene las bases de datos (.xlsx) de una carpeta de S3 junto con su ETag*
+
+    **Parameters**:
+
+        ruta_s3_base_datos (str): Ruta de la carpeta en S3
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 (o el almacenamiento)
+
+    **Returns**:
+
+        dict: Diccionario {ruta: ETag} con las bases de datos de la carpeta
+    """
+
+    try:
+        etags = {obj['ruta']: obj['etag'] for obj in obtener_almacenamiento(nombre_bucket).iterar(ruta_s3_base_datos, '.xlsx')}
+
+        if not etags:
+            print("No se encontraron archivos en esa carpeta.")
+        return etags
+
+    except Exception as e:
+        print(f"Error al obtener la base de datos: {e}")
+        return {}
+
+
+def obtener_bases_calculo(lista_rutas:list, nombre_bucket:str, columnas:list = None) -> dict:
+    """
+    *Función para descargar y leer las bases de asegurados (.xlsx, .csv o su copia .parquet) alojadas en S3.*
+
+    **Parameters**:
+
+        lista_rutas (list): Rutas (Key) de las bases dentro del bucket S3
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 (o el almacenamiento)
+
+        columnas (list): Columnas por leer (None: todas)
+
+    **Returns**:
+
+        dict: Diccionario {ruta: DataFrame}. Las bases que no se pudieron leer se omiten
+    """
+
+    almacenamiento = obtener_almacenamiento(nombre_bucket)
+    bases = {}
+
+    for ruta in lista_rutas:
+        try:
+            with etapa("descarga"):
+                content = almacenamiento.leer(ruta)
+            contar("bytes_leidos", len(content))
+            with etapa("lectura"):
+                bases[ruta] = leer_tabla(content, ruta, columnas)
+            bases[ruta].attrs["bytes"] = len(content)
+        except Exception as e:
+            print(f"Error al obtener la base de cálculo {ruta}: {e}")
+
+    return bases
+
+
+def _descargar_base(almacenamiento, ruta: str) -> bytes:
+    """Descarga el contenido de una base; se ejecuta en los hilos de descarga."""
+    with etapa("descarga"):
+        return almacenamiento.leer(ruta)
+
+
+def iterar_bases_calculo(lista_rutas:list, nombre_bucket:str, hilos:int = 8, procesos:int = None,
+                         max_bytes_en_vuelo:int = 512*1024**2, tamanios:dict = None, columnas:list = None):
+    """
+    *Generador que descarga y lee las bases de asegurados de forma concurrente y las entrega conforme terminan.*
+
+    Las descargas se traslapan en un pool de hilos y la lectura (Excel, CSV o Parquet) corre en un pool de procesos.
+    Sólo se inicia una descarga nueva mientras los bytes en vuelo (descargados o en descarga y aún no
+    entregados) sean menores que `max_bytes_en_vuelo`; el tamaño de una base en descarga se toma de
+    `tamanios` (0 si no se conoce), por lo que sin tamaños el límite puede rebasarse por a lo más `hilos`
+    bases. Siempre se permite una base en vuelo aunque rebase el límite.
+
+    **Parameters**:
+
+        lista_rutas (list): Rutas (Key) de las bases dentro del bucket S3
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 (o el almacenamiento)
+
+        hilos (int): Descargas simultáneas
+
+        procesos (int): Procesos de lectura (None: uno por CPU; 0: se lee en el proceso principal)
+
+        max_bytes_en_vuelo (int): Límite de bytes descargados y aún no entregados
+
+        tamanios (dict): Diccionario {ruta: bytes} con el tamaño de cada base (p. ej. del listado)
+
+        columnas (list): Columnas por leer (None: todas)
+
+    **Returns**:
+
+        generator: Tuplas (ruta, DataFrame) en el orden en que terminan. Las bases que no se pudieron leer se omiten
+    """
+
+    almacenamiento = obtener_almacenamiento(nombre_bucket)
+    tamanios = tamanios or {}
+    procesos = (os.cpu_count() or 1) if procesos is None else procesos
+    pendientes = deque(lista_rutas)
+    descargas, lecturas = {}, {}
+    en_vuelo = 0
+
+    pool_descargas = ThreadPoolExecutor(max_workers=max(1, hilos))
+    pool_lecturas = ProcessPoolExecutor(max_workers=procesos) if procesos > 0 else None
+    try:
+        while pendientes or descargas or lecturas:
+
+            # Se inician descargas mientras haya hilos libres y presupuesto de bytes
+            while pendientes and len(descargas) < max(1, hilos) and (
+                    en_vuelo < max_bytes_en_vuelo or not (descargas or lecturas)):
+                ruta = pendientes.popleft()
+                estimado = tamanios.get(ruta, 0)
+                en_vuelo += estimado
+                descargas[pool_descargas.submit(_descargar_base, almacenamiento, ruta)] = (ruta, estimado)
+
+            terminados, _ = wait(list(descargas) + list(lecturas), return_when=FIRST_COMPLETED)
+
+            for futuro in terminados:
+                if futuro in descargas:
+                    ruta, estimado = descargas.pop(futuro)
+                    try:
+                        contenido = futuro.result()
+                    except Exception as e:
+                        en_vuelo -= estimado
+                        print(f"Error al obtener la base de cálculo {ruta}: {e}")
+                        continue
+                    contar("bytes_leidos", len(contenido))
+
+                    if pool_lecturas is not None:
+                        en_vuelo += len(contenido) - estimado
+                        lecturas[pool_lecturas.submit(leer_tabla, contenido, ruta, columnas)] = (ruta, len(contenido))
+                        continue
+
+                    # Sin procesos de lectura se lee aquí mismo
+                    en_vuelo -= estimado
+                    n_bytes = len(contenido)
+                    try:
+                        with etapa("lectura"):
+                            df = leer_tabla(contenido, ruta, columnas)
+                    except Exception as e:
+                        print(f"Error al obtener la base de cálculo {ruta}: {e}")
+                        continue
+
+                else:
+                    ruta, n_bytes = lecturas.pop(futuro)
+                    en_vuelo -= n_bytes
+                    try:
+                        df = futuro.result()
+                    except Exception as e:
+                        print(f"Error al obtener la base de cálculo {ruta}: {e}")
+                        continue
+
+                df.attrs["bytes"] = n_bytes
+                yield ruta, df
+
+    finally:
+        pool_descargas.shutdown(wait=True, cancel_futures=True)
+        if pool_lecturas is not None:
+            pool_lecturas.shutdown(wait=True, cancel_futures=True)
+
+
+def descargar_bases_calculo(lista_rutas:list, nombre_bucket:str, directorio:str, hilos:int = 1) -> dict:
+    """
+    *Función para descargar las bases de asegurados (.xlsx) de S3 a un directorio local sin cargarlas en memoria.*
+
+    **Parameters**:
+
+        lista_rutas (list): Rutas (Key) de las bases dentro del bucket S3
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 (o el almacenamiento)
+
+        directorio (str): Directorio local donde se guardan las bases
+
+        hilos (int): Descargas simultáneas
+
+    **Returns**:
+
+        dict: Diccionario {ruta: ruta local} en el orden de `lista_rutas`. Las bases que no se pudieron descargar se omiten
+    """
+
+    almacenamiento = obtener_almacenamiento(nombre_bucket)
+    os.makedirs(directorio, exist_ok=True)
+
+    def descargar(i, ruta):
+        try:
+            ruta_local = os.path.join(directorio, f"base_{i}{os.path.splitext(ruta)[1] or '.xlsx'}")
+            with etapa("descarga"):
+                almacenamiento.descargar_archivo(ruta, ruta_local)
+            contar("bytes_leidos", os.path.getsize(ruta_local))
+            return ruta, ruta_local
+        except Exception as e:
+            print(f"Error al descargar la base de cálculo {ruta}: {e}")
+            return ruta, None
+
+    with ThreadPoolExecutor(max_workers=max(1, hilos)) as pool:
+        descargadas = list(pool.map(descargar, range(len(lista_rutas)), lista_rutas))
+
+    return {ruta: ruta_local for ruta, ruta_local in descargadas if ruta_local is not None}
+
+
+def leer_base_por_bloques(ruta_archivo:str, tamanio_bloque:int = 50000, columnas:list = None):
+    """
+    *Generador que lee una base de asegurados (.xlsx o .parquet) por bloques de filas.*
+
+    Usa el modo de solo lectura de openpyxl, por lo que la memoria depende del tamaño del bloque y no
+    del tamaño del archivo. Se lee la primera hoja y su primera fila se toma como encabezado, como en
+    `pd.read_excel`; las filas vacías se omiten. Las copias .parquet se leen por lotes de pyarrow.
+
+    **Parameters**:
+
+        ruta_archivo (str): Ruta local de la base
+
+        tamanio_bloque (int): Número de filas por bloque
+
+        columnas (list): Columnas por leer (None: todas)
+
+    **Returns**:
+
+        generator: DataFrames de a lo más `tamanio_bloque` filas
+    """
+
+    if ruta_archivo.endswith(".parquet"):
+        archivo = pq.ParquetFile(ruta_archivo)
+        if columnas is not None:
+            columnas = [col for col in columnas if col in archivo.schema_arrow.names]
+        try:
+            for lote in archivo.iter_batches(batch_size=tamanio_bloque, columns=columnas):
+                yield lote.to_pandas()
+        finally:
+            archivo.close()
+        return
+
+    libro = load_workbook(ruta_archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        encabezado = [col if col is not None else f"Unnamed: {i}" for i, col in enumerate(encabezado)]
+        seleccion = encabezado if columnas is None else [col for col in encabezado if col in columnas]
+
+        bloque = []
+        for fila in filas:
+            if all(valor is None for valor in fila):
+                continue
+            bloque.append(fila[:len(encabezado)])
+            if len(bloque) == tamanio_bloque:
+                yield pd.DataFrame(bloque, columns=encabezado)[seleccion]
+                bloque = []
+
+        if bloque:
+            yield pd.DataFrame(bloque, columns=encabezado)[seleccion]
+
+    finally:
+        libro.close()
+
+
+def contratantes_en_base(ruta_archivo:str, tamanio_bloque:int = 50000) -> list:
+    """
+    *Función que obtiene los contratantes de una base de asegurados leyéndola por bloques*
+
+    **Parameters**:
+
+        ruta_archivo (str): Ruta local de la base
+
+        tamanio_bloque (int): Número de filas por bloque
+
+    **Returns**:
+
+        list: Contratantes de la base, ordenados
+    """
+
+    contratantes = set()
+    for bloque in leer_base_por_bloques(ruta_archivo, tamanio_bloque, ["Contratante"]):
+        contratantes.update(bloque["Contratante"].dropna().astype(str).unique())
+
+    return sorted(contratantes)
+
+
+def obtener_base_parametros(ruta_archivo:str, nombre_bucket:str, columnas:list = None) -> pd.DataFrame:
     """*Función para cargar la base de datos que contiene los párametros de las cotizaciones alojada en S3.*
     
     **Parameters**:
 
-        nombre_bucket (str): Nombre del bucket de S3 donde se encuentra la base de datos.
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 donde se encuentra la base de datos (o el almacenamiento).
 
         ruta_archivo (str): Ruta (Key) del archivo dentro del bucket S3.
+
+        columnas (list): Columnas por leer (None: todas). La ruta puede ser el .xlsx o su copia .parquet.
     
     **Returns**:
 
@@ -96,32 +466,26 @@ def obtener_base_parametros(ruta_archivo:str, nombre_bucket:str) -> pd.DataFrame
     """
 
     try:
-        s3 = boto3.client('s3')
-        # Se obtiene el objeto del bucket S3
-        response = s3.get_object(Bucket=nombre_bucket, Key=ruta_archivo)
-        
-        if 'Body' not in response:
-            print("No se encontró el archivo en el bucket.")
-            return pd.DataFrame()
-        else:
-            # Se lee el contenido del archivo Excel
-            content = response['Body'].read()
-            parametros = pd.read_excel(BytesIO(content), engine='openpyxl')
-            return parametros
+        # Se lee el contenido del archivo Excel
+        content = obtener_almacenamiento(nombre_bucket).leer(ruta_archivo)
+        parametros = leer_tabla(content, ruta_archivo, columnas)
+        return parametros
     except Exception as e:
         print(f"Error al obtener la base de datos de parámetros: {e}")
         return pd.DataFrame()
 
 
 
-def obtener_base_cuotas(ruta_archivo:str, nombre_bucket:str) -> pd.DataFrame:
+def obtener_base_cuotas(ruta_archivo:str, nombre_bucket:str, columnas:list = None) -> pd.DataFrame:
     """Función para cargar la base de datos que contiene las cuotas de las cotizaciones al millar alojada en S3.
 
     **Parameters**:
 
-        nombre_bucket (str): Nombre del bucket de S3 donde se encuentra la base de datos.
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 donde se encuentra la base de datos (o el almacenamiento).
 
         ruta_archivo (str): Ruta (Key) del archivo dentro del bucket S3.
+
+        columnas (list): Columnas por leer (None: todas). La ruta puede ser el .xlsx o su copia .parquet.
     
     **Returns**:
 
@@ -129,62 +493,50 @@ def obtener_base_cuotas(ruta_archivo:str, nombre_bucket:str) -> pd.DataFrame:
     """
 
     try:
-        # Se obtiene el objeto del bucket S3
-        s3 = boto3.client('s3')
-        response = s3.get_object(Bucket=nombre_bucket, Key=ruta_archivo)
-        
-        if 'Body' not in response:
-            print("No se encontró el archivo en el bucket.")
-            return pd.DataFrame()
-        else:
-            # Se lee el contenido del archivo Excel
-            content = response['Body'].read()
-            cuotas = pd.read_excel(BytesIO(content), engine='openpyxl')
-            return cuotas
+        # Se lee el contenido del archivo Excel
+        content = obtener_almacenamiento(nombre_bucket).leer(ruta_archivo)
+        cuotas = leer_tabla(content, ruta_archivo, columnas)
+        return cuotas
     except Exception as e:
         print(f"Error al obtener la base de datos de cuotas: {e}")
         return pd.DataFrame()
 
 
-def obtener_base_emisiones(ruta_archivo:str, nombre_bucket:str) -> pd.DataFrame:
+def obtener_base_emisiones(ruta_archivo:str, nombre_bucket:str, columnas:list = None) -> pd.DataFrame:
     """*Función para cargar la base de datos que contiene las emisiones y su siniestrridad alojada en S3.*
 
     **Parameters**:
 
-        nombre_bucket (str): Nombre del bucket de S3 donde se encuentra la base de datos.
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 donde se encuentra la base de datos (o el almacenamiento).
 
         ruta_archivo (str): Ruta (Key) del archivo dentro del bucket S3.
+
+        columnas (list): Columnas por leer (None: todas). La ruta puede ser el .xlsx o su copia .parquet.
     **Returns**:
         
         emisiones (DataFrame): DataFrame con las emisiones.
     """
 
     try:
-        # Se obtiene el objeto del bucket S3
-        s3 = boto3.client('s3')
-        response = s3.get_object(Bucket=nombre_bucket, Key=ruta_archivo)
-
-        if 'Body' not in response:
-            print("No se encontró el archivo en el bucket.")
-            return pd.DataFrame()
-        else:
-            # Se lee el contenido del archivo Excel
-            content = response['Body'].read()
-            emisiones = pd.read_excel(BytesIO(content), engine='openpyxl')
-            return emisiones
+        # Se lee el contenido del archivo Excel
+        content = obtener_almacenamiento(nombre_bucket).leer(ruta_archivo)
+        emisiones = leer_tabla(content, ruta_archivo, columnas)
+        return emisiones
     except Exception as e:
         print(f"Error al obtener la base de datos de emisiones: {e}")
         return pd.DataFrame()
     
 
-def obtener_base_historico(ruta_archivo:str, nombre_bucket:str) -> pd.DataFrame:
+def obtener_base_historico(ruta_archivo:str, nombre_bucket:str, columnas:list = None) -> pd.DataFrame:
     """*Función para cargar la base de datos que contiene las cotizaciones históricas alojada en S3.*
     
     **Parameters**:
     
-        nombre_bucket (str): Nombre del bucket de S3 donde se encuentra la base de datos.
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 donde se encuentra la base de datos (o el almacenamiento).
 
         ruta_archivo (str): Ruta (Key) del archivo dentro del bucket S3.
+
+        columnas (list): Columnas por leer (None: todas). La ruta puede ser el .xlsx o su copia .parquet.
     
     **Returns**:
 
@@ -192,18 +544,10 @@ def obtener_base_historico(ruta_archivo:str, nombre_bucket:str) -> pd.DataFrame:
     """
 
     try:
-        # Se obtiene el objeto del bucket S3
-        s3 = boto3.client('s3')
-        response = s3.get_object(Bucket=nombre_bucket, Key=ruta_archivo)
-
-        if 'Body' not in response:
-            print("No se encontró el archivo en el bucket.")
-            return pd.DataFrame()
-        else:
-            # Se lee el contenido del archivo Excel
-            content = response['Body'].read()
-            historico = pd.read_excel(BytesIO(content), engine='openpyxl')
-            return historico
+        # Se lee el contenido del archivo Excel
+        content = obtener_almacenamiento(nombre_bucket).leer(ruta_archivo)
+        historico = leer_tabla(content, ruta_archivo, columnas)
+        return historico
     except Exception as e:
         print(f"Error al obtener la base de datos de historico: {e}")
         return pd.DataFrame()
@@ -242,13 +586,6 @@ def obtener_parametros_forma_pago(forma_pago):
     Returns:
         dict: Diccionario con 'rpf' y 'num_recibos'
     """
-    RECARGOS_FORMA_PAGO = {
-        "anual": {"rpf": 0.0, "num_recibos": 1},
-        "semestral": {"rpf": 0.037, "num_recibos": 2},
-        "trimestral": {"rpf": 0.055, "num_recibos": 4},
-        "mensual": {"rpf": 0.065, "num_recibos": 12}
-    }
-    
     try:
         forma_pago_clean = forma_pago.strip().lower()
         
@@ -275,12 +612,6 @@ def obtener_descuento_comision(comision):
         float: Descuento correspondiente
     """
     try:
-
-        DESCUENTOS_COMISION = {
-        0.20: 0.00, 0.19: 0.02, 0.18: 0.03, 0.17: 0.04, 0.16: 0.06,
-        0.15: 0.07, 0.14: 0.09, 0.13: 0.10, 0.12: 0.12, 0.11: 0.13,
-        0.10: 0.15, 0.09: 0.16, 0.08: 0.18, 0.07: 0.19, 0.06: 0.21, 0.05: 0.22
-        }
         return DESCUENTOS_COMISION[comision]
     
     except Exception as e:
@@ -312,22 +643,417 @@ def obtener_nombre_cobertura(codigo_cobertura):
         return codigo_cobertura
     
 
-def generar_memoria_calculo(contratante:str, fecha_corte:np.datetime64, df_parametros: pd.DataFrame, df_calculo: pd.DataFrame,
-                            df_cuotas:pd.DataFrame, descuento: float, rpf: float)-> pd.DataFrame:
+def indexar_parametros(df_parametros: pd.DataFrame) -> dict:
+    """
+    *Función que construye un índice contratante → registro de parámetros*
+
+    Se construye una vez por ejecución para que obtener los parámetros de un contratante sea una
+    consulta a un diccionario y no un filtro sobre todo `df_parametros`. Si un contratante aparece
+    varias veces se conserva su primer registro, como en `.values[0]`.
+
+    **Parameters**:
+
+        df_parametros (DataFrame): DataFrame con los parámetros de las cotizaciones
+
+    **Returns**:
+
+        dict: Diccionario {contratante: {columna: valor}}
+    """
+
+    df_param = df_parametros[df_parametros["Contratante"].notna()].drop_duplicates(subset="Contratante", keep="first")
+    columnas = {col: df_param[col].to_numpy() for col in df_param.columns}
+
+    return {contratante: {col: valores[i] for col, valores in columnas.items()}
+            for i, contratante in enumerate(df_param["Contratante"])}
+
+
+def indexar_siniestralidad(df_emisiones: pd.DataFrame) -> dict:
+    """
+    *Función que construye un índice póliza → siniestralidad a partir de las emisiones*
+
+    **Parameters**:
+
+        df_emisiones (DataFrame): DataFrame con datos de emisiones
+
+    **Returns**:
+
+        dict: Diccionario {poliza: siniestralidad} con el primer registro de cada póliza
+    """
+
+    df_emisiones = df_emisiones.drop_duplicates(subset="Poliza", keep="first")
+    return dict(zip(df_emisiones["Poliza"], df_emisiones["Siniestralidad"]))
+
+
+def obtener_registro_contratante(df_parametros, contratante: str) -> dict:
+    """
+    *Obtiene el registro de parámetros de un contratante*
+
+    **Parameters**:
+
+        df_parametros (DataFrame | dict): Parámetros de las cotizaciones o su índice de `indexar_parametros`
+
+        contratante (str): Nombre del contratante
+
+    **Returns**:
+
+        dict: Registro {columna: valor} del contratante
+    """
+
+    if isinstance(df_parametros, dict):
+        return df_parametros[contratante]
+
+    df_contratante = df_parametros[df_parametros["Contratante"] == contratante]
+    return {col: df_contratante[col].values[0] for col in df_contratante.columns}
+
+
+def obtener_siniestralidad(df_emisiones, poliza):
+    """
+    *Obtiene la siniestralidad de una póliza*
+
+    **Parameters**:
+
+        df_emisiones (DataFrame | dict): Emisiones o su índice de `indexar_siniestralidad`
+
+        poliza: Número de póliza
+
+    **Returns**:
+
+        float: Siniestralidad de la póliza
+    """
+
+    if isinstance(df_emisiones, dict):
+        return df_emisiones[poliza]
+
+    return df_emisiones.loc[df_emisiones["Poliza"] == poliza, "Siniestralidad"].values[0]
+
+
+class TablaCuotas:
+    """
+    *Tabla de cuotas al millar compilada a partir de experiencia_global, indexada directamente por edad*
+
+    Guarda un arreglo de NumPy por cobertura (Fallecimiento, MA y BPAI) donde la posición `i`
+    corresponde a la edad `edad_minima + i`, de modo que obtener las cuotas de un grupo es una
+    indexación de arreglos en lugar de un merge. Las edades fuera de la tabla (menores a la edad
+    mínima, mayores a la máxima, negativas o vacías) no tienen cuota y regresan NaN, igual que el
+    merge por la izquierda contra `df_cuotas`. El atributo `version` es una huella SHA-256 de las
+    cuotas que cambia sólo si cambia su contenido.
+
+    **Parameters**:
+
+        df_cuotas (DataFrame): DataFrame con datos de cuotas (columnas Edad, Fallecimiento, MA y BPAI)
+    """
+
+    def __init__(self, df_cuotas: pd.DataFrame):
+        df_validas = df_cuotas[df_cuotas["Edad"].notna()]
+        edades = df_validas["Edad"].to_numpy(dtype=np.int64)
+
+        self.columnas = [col for col in ["Fallecimiento", "MA", "BPAI"] if col in df_validas.columns]
+        self.edad_minima = int(edades.min()) if len(edades) else 0
+        self.edad_maxima = int(edades.max()) if len(edades) else -1
+
+        # Las edades intermedias que no aparecen en la tabla quedan sin cuota
+        self.cuotas = {}
+        for col in self.columnas:
+            arreglo = np.full(self.edad_maxima - self.edad_minima + 1, np.nan)
+            arreglo[edades - self.edad_minima] = df_validas[col].to_numpy(dtype=float)
+            self.cuotas[col] = arreglo
+
+        # Huella del contenido de la tabla para saber si cambió entre ejecuciones
+        huella = hashlib.sha256(f"{self.edad_minima}|{self.edad_maxima}|{self.columnas}".encode('utf-8'))
+        for col in self.columnas:
+            huella.update(self.cuotas[col].tobytes())
+        self.version = huella.hexdigest()
+
+    def obtener_cuotas(self, edades, columna: str) -> np.ndarray:
+        """
+        *Obtiene la cuota al millar de cada edad para una cobertura*
+
+        **Parameters**:
+
+            edades (array-like): Edades de los asegurados
+
+            columna (str): Cobertura (Fallecimiento, MA o BPAI)
+
+        **Returns**:
+
+            np.ndarray: Cuotas por asegurado, NaN para edades fuera de la tabla
+        """
+
+        edades = np.asarray(edades, dtype=float)
+        en_rango = (edades >= self.edad_minima) & (edades <= self.edad_maxima) & (edades == np.floor(edades))
+        indices = np.where(en_rango, edades - self.edad_minima, 0).astype(np.intp)
+        return np.where(en_rango, self.cuotas[columna][indices], np.nan)
+
+
+class CensoCompacto:
+    """
+    *Base de asegurados compacta para cotizar: arreglos contiguos en lugar de un DataFrame de objetos*
+
+    Cada asegurado ocupa 9 bytes: el código de su contratante (int32, índice en `contratantes`), su
+    fecha de nacimiento como días desde 1970-01-01 (int32, `DIA_NULO` si está vacía) y, si se indican
+    los parámetros, su edad a la fecha de inicio de su contratante (int8, `EDAD_NULA` si no se puede
+    calcular; las edades se limitan a 127). Las funciones de cotización lo aceptan en lugar de
+    `df_calculo` sin convertirlo y se envía barato a los procesos de `cotizar_lote_paralelo`. Las
+    columnas de `columnas_extra` se conservan sólo para construir la memoria de cálculo.
+
+    **Parameters**:
+
+        df_calculo (DataFrame): Base de asegurados (columnas Contratante y Fecha de Nacimiento)
+
+        df_parametros (DataFrame | dict): Parámetros o su índice de `indexar_parametros`; si se indican
+        se precalcula la edad de cada asegurado
+
+        columnas_extra (list): Otras columnas de la base que se conservan (p. ej. Nombre)
+    """
+
+    DIA_NULO = np.iinfo(np.int32).min
+    EDAD_NULA = np.iinfo(np.int8).min
+
+    def __init__(self, df_calculo: pd.DataFrame, df_parametros=None, columnas_extra=()):
+        contratantes = pd.Categorical(df_calculo["Contratante"])
+        self.contratantes = np.asarray(contratantes.categories, dtype=object)
+        self.codigos = np.ascontiguousarray(contratantes.codes, dtype=np.int32)
+
+        # Fechas de nacimiento como días; las que no se convierten en bloque se intentan una por una
+        fechas_nac = pd.Series(df_calculo["Fecha de Nacimiento"]).reset_index(drop=True)
+        fechas = pd.to_datetime(fechas_nac, errors='coerce').to_numpy().astype('datetime64[D]')
+        for i in np.flatnonzero(np.isnat(fechas) & fechas_nac.notna().to_numpy()):
+            try:
+                fechas[i] = pd.to_datetime(fechas_nac.iat[i]).to_datetime64().astype('datetime64[D]')
+            except Exception:
+                pass
+        self.dias = np.where(np.isnat(fechas), self.DIA_NULO, fechas.astype(np.int64)).astype(np.int32)
+
+        self.columnas_extra = [col for col in columnas_extra if col not in ("Contratante", "Fecha de Nacimiento")]
+        self.extras = {col: df_calculo[col].to_numpy() for col in self.columnas_extra}
+        self.columnas = [col for col in df_calculo.columns
+                         if col in ("Contratante", "Fecha de Nacimiento") or col in self.columnas_extra]
+
+        # Edad a la fecha de inicio de cada contratante
+        self.cortes = None
+        self.edades = None
+        if df_parametros is not None:
+            registros = df_parametros if isinstance(df_parametros, dict) else indexar_parametros(df_parametros)
+            self.cortes = np.array([np.datetime64(registros[c]["Inicio"], 'D') if c in registros else np.datetime64('NaT', 'D')
+                                    for c in self.contratantes] + [np.datetime64('NaT', 'D')], dtype='datetime64[D]')
+            edades = calcular_edades(fechas_nac, self.cortes[self.codigos])
+            self.edades = self._a_int8(edades)
+
+    @classmethod
+    def _a_int8(cls, edades) -> np.ndarray:
+        edades = np.asarray(edades, dtype=float)
+        return np.where(np.isnan(edades), cls.EDAD_NULA, np.clip(np.nan_to_num(edades), -1, 127)).astype(np.int8)
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes ocupados por los arreglos del censo (sin las columnas extra)."""
+        return self.codigos.nbytes + self.dias.nbytes + (self.edades.nbytes if self.edades is not None else 0)
+
+    def codigos_para(self, contratantes) -> np.ndarray:
+        """
+        *Código de cada asegurado respecto a otra lista de contratantes*
+
+        **Parameters**:
+
+            contratantes (array-like): Lista de contratantes (p. ej. la columna Contratante de los parámetros)
+
+        **Returns**:
+
+            np.ndarray: Posición del contratante de cada asegurado en `contratantes` (-1 si no está)
+        """
+
+        mapa = np.append(pd.Index(contratantes).get_indexer(self.contratantes), -1)
+        return mapa[self.codigos]
+
+    def filtrar(self, filas) -> "CensoCompacto":
+        """
+        *Regresa el censo de un subconjunto de asegurados*
+
+        **Parameters**:
+
+            filas (array-like): Máscara booleana o posiciones de los asegurados
+
+        **Returns**:
+
+            CensoCompacto: Censo con los asegurados seleccionados (comparte la lista de contratantes)
+        """
+
+        censo = object.__new__(CensoCompacto)
+        censo.contratantes = self.contratantes
+        censo.codigos = self.codigos[filas]
+        censo.dias = self.dias[filas]
+        censo.columnas_extra = self.columnas_extra
+        censo.extras = {col: valores[filas] for col, valores in self.extras.items()}
+        censo.columnas = self.columnas
+        censo.cortes = self.cortes
+        censo.edades = self.edades[filas] if self.edades is not None else None
+        return censo
+
+    def fechas_nacimiento(self) -> np.ndarray:
+        """Fechas de nacimiento como datetime64 (NaT si están vacías)."""
+        return np.where(self.dias == self.DIA_NULO, np.datetime64('NaT', 'D'), self.dias.astype('datetime64[D]'))
+
+    def calcular_edades(self, fechas_ref) -> np.ndarray:
+        """
+        *Edad de cada asegurado a una fecha de referencia, con las reglas de `calcular_edades`*
+
+        Si la fecha de referencia de cada asegurado es la fecha de inicio de su contratante se usan
+        las edades precalculadas.
+
+        **Parameters**:
+
+            fechas_ref (datetime.date | np.datetime64 | array-like): Fecha de corte, única o una por asegurado
+
+        **Returns**:
+
+            np.ndarray: Edades (float con NaN si hay fechas de nacimiento vacías)
+        """
+
+        if self.edades is not None:
+            try:
+                referencias = pd.to_datetime(fechas_ref)
+                referencias = np.asarray(referencias.to_numpy() if hasattr(referencias, 'to_numpy') else referencias.to_datetime64())
+                if np.all(self.cortes[self.codigos] == referencias.astype('datetime64[D]')):
+                    return np.where(self.edades == self.EDAD_NULA, np.nan, self.edades.astype(float))
+            except Exception:
+                pass
+
+        return calcular_edades(pd.Series(self.fechas_nacimiento()), fechas_ref)
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """
+        *Reconstruye la base de asegurados como DataFrame (para la memoria de cálculo)*
+
+        **Returns**:
+
+            DataFrame: Columnas Contratante, Fecha de Nacimiento y las columnas extra, en el orden original
+        """
+
+        contratantes = np.append(self.contratantes, None)[self.codigos]
+        datos = {"Contratante": contratantes, "Fecha de Nacimiento": pd.to_datetime(self.fechas_nacimiento()), **self.extras}
+        return pd.DataFrame({col: datos[col] for col in self.columnas})
+
+
+def _codigos_censo(df_calculo, contratantes) -> np.ndarray:
+    """Posición del contratante de cada asegurado en `contratantes` (-1 si no está), para DataFrame o CensoCompacto."""
+    if isinstance(df_calculo, CensoCompacto):
+        return df_calculo.codigos_para(contratantes)
+    return pd.Categorical(df_calculo["Contratante"], categories=contratantes).codes
+
+
+def _filtrar_censo(df_calculo, filas):
+    """Subconjunto de asegurados de un DataFrame o CensoCompacto."""
+    if isinstance(df_calculo, CensoCompacto):
+        return df_calculo.filtrar(filas)
+    return df_calculo[filas] if np.asarray(filas).dtype == bool else df_calculo.iloc[filas]
+
+
+def _edades_censo(df_calculo, fechas_ref, filas=None) -> np.ndarray:
+    """Edades de los asegurados (todos o los de `filas`) de un DataFrame o CensoCompacto a la fecha de referencia."""
+    if isinstance(df_calculo, CensoCompacto):
+        return (df_calculo if filas is None else df_calculo.filtrar(filas)).calcular_edades(fechas_ref)
+    fechas_nac = df_calculo["Fecha de Nacimiento"] if filas is None else df_calculo.loc[filas, "Fecha de Nacimiento"]
+    return calcular_edades(fechas_nac, fechas_ref)
+
+
+def _dataframe_censo(df_calculo) -> pd.DataFrame:
+    """Base de asegurados como DataFrame."""
+    if isinstance(df_calculo, CensoCompacto):
+        return df_calculo.a_dataframe()
+    return df_calculo
+
+
+def histograma_edades(edades, codigos=None, n_grupos: int = 1) -> tuple:
+    """
+    *Reduce las edades de uno o varios grupos de asegurados a un histograma por edad*
+
+    **Parameters**:
+
+        edades (array-like): Edades de los asegurados (las edades vacías se ignoran)
+
+        codigos (array-like): Índice del grupo (contratante) de cada asegurado. Si es None todos pertenecen al grupo 0
+
+        n_grupos (int): Número de grupos del histograma
+
+    **Returns**:
+
+        tuple: (eje_edades, conteos) donde conteos[g, i] es el número de asegurados del grupo g con edad eje_edades[i]
+    """
+
+    edades = np.asarray(edades, dtype=float)
+    codigos = np.zeros(len(edades), dtype=np.int64) if codigos is None else np.asarray(codigos, dtype=np.int64)
+
+    con_edad = ~np.isnan(edades)
+    edades = edades[con_edad].astype(np.int64)
+    codigos = codigos[con_edad]
+
+    if len(edades) == 0:
+        return np.array([], dtype=np.int64), np.zeros((n_grupos, 0), dtype=np.int64)
+
+    edad_minima = edades.min()
+    n_edades = int(edades.max() - edad_minima + 1)
+    conteos = np.bincount(codigos*n_edades + (edades - edad_minima), minlength=n_grupos*n_edades)
+
+    return np.arange(edad_minima, edad_minima + n_edades), conteos.reshape(n_grupos, n_edades)
+
+
+def calcular_primas_histograma(eje_edades: np.ndarray, conteos: np.ndarray, tabla_cuotas: TablaCuotas,
+                               coberturas, factores) -> np.ndarray:
+    """
+    *Calcula la prima de cada grupo a partir de su histograma de edades*
+
+    La prima es la suma de cuota[edad] × factor de cada asegurado, por lo que basta con el número
+    de asegurados por edad: el costo depende del número de edades distintas y no del de asegurados.
+
+    **Parameters**:
+
+        eje_edades (np.ndarray): Edades del histograma generado por `histograma_edades`
+
+        conteos (np.ndarray): Asegurados por grupo y edad generados por `histograma_edades`
+
+        tabla_cuotas (TablaCuotas): Tabla de cuotas compilada
+
+        coberturas (array-like): Código de cobertura de cada grupo
+
+        factores (array-like): Factor (1-descuento)*(1+rpf)*SumaAsegurada/1000 de cada grupo
+
+    **Returns**:
+
+        np.ndarray: Prima de cada grupo
+    """
+
+    factores = np.asarray(factores, dtype=float)
+    primas = np.zeros(conteos.shape[0])
+
+    for col in tabla_cuotas.columnas:
+        cubre = np.array([col in COBERTURAS_COLUMNAS.get(cobertura, []) for cobertura in coberturas], dtype=bool)
+        cuotas = np.nan_to_num(tabla_cuotas.obtener_cuotas(eje_edades, col))
+        primas += np.where(cubre, (conteos @ cuotas)*factores, 0.0)
+
+    return primas
+
+
+def generar_memoria_calculo(contratante:str, fecha_corte:np.datetime64, df_parametros, df_calculo: pd.DataFrame,
+                            df_cuotas, descuento: float, rpf: float, edades: np.ndarray = None)-> pd.DataFrame:
     """
     *Función que genera la memoria de cálculo para la cotización*
     
     **Parameters**:
     
-        df_parametros (DataFrame): DataFrame con datos de cálculo
+        df_parametros (DataFrame | dict): Parámetros de las cotizaciones o su índice de `indexar_parametros`
         
         df_calculo (DataFrame): DataFrame con datos de asegurados y edades
         
         df_emisiones (DataFrame): DataFrame con datos de emisiones
         
-        df_cuotas (DataFrame): DataFrame con datos de cuotas
+        df_cuotas (DataFrame | TablaCuotas): Datos de cuotas o su tabla compilada
         
         ticket (int): Número de ticket de la cotización
+
+        edades (np.ndarray): Edades ya calculadas con `calcular_edades` (si es None se calculan)
     
     **Returns**:
     
@@ -335,28 +1061,15 @@ def generar_memoria_calculo(contratante:str, fecha_corte:np.datetime64, df_param
     """
     try:
 
-        df_contratante = df_parametros[df_parametros['Contratante'] == contratante]
-        df_calculo_copy = df_calculo.copy()
-        df_calculo_copy["Edad"] = df_calculo_copy["Fecha de Nacimiento"].apply(lambda x: calcular_edad(x, fecha_corte))
-
-
-
-        if df_contratante["Coberturas"].values[0] == "F":
-            df_calculo_copy = df_calculo_copy.merge(df_cuotas[["Edad","Fallecimiento"]], on="Edad", how="left")
-            df_calculo_copy["Fallecimiento"] = df_calculo_copy["Fallecimiento"]*(1-descuento)*(1+rpf)*df_contratante["SumaAsegurada"].values[0]/1000
-        elif df_contratante["Coberturas"].values[0] == "FMA":
-            df_calculo_copy = df_calculo_copy.merge(df_cuotas[["Edad","Fallecimiento","MA"]], on="Edad", how="left")
-            df_calculo_copy["Fallecimiento"] = df_calculo_copy["Fallecimiento"]*(1-descuento)*(1+rpf)*df_contratante["SumaAsegurada"].values[0]/1000
-            df_calculo_copy["MA"] = df_calculo_copy["MA"]*(1-descuento)*(1+rpf)*df_contratante["SumaAsegurada"].values[0]/1000
-        elif df_contratante["Coberturas"].values[0] == "FBPAI":
-            df_calculo_copy = df_calculo_copy.merge(df_cuotas[["Edad","Fallecimiento","BPAI"]], on="Edad", how="left")
-            df_calculo_copy["Fallecimiento"] = df_calculo_copy["Fallecimiento"]*(1-descuento)*(1+rpf)*df_contratante["SumaAsegurada"].values[0]/1000
-            df_calculo_copy["BPAI"] = df_calculo_copy["BPAI"]*(1-descuento)*(1+rpf)*df_contratante["SumaAsegurada"].values[0]/1000
-        elif df_contratante["Coberturas"].values[0] == "FMABPAI":
-            df_calculo_copy = df_calculo_copy.merge(df_cuotas, on="Edad", how="left")
-            df_calculo_copy["Fallecimiento"] = df_calculo_copy["Fallecimiento"]*(1-descuento)*(1+rpf)*df_contratante["SumaAsegurada"].values[0]/1000
-            df_calculo_copy["MA"] = df_calculo_copy["MA"]*(1-descuento)*(1+rpf)*df_contratante["SumaAsegurada"].values[0]/1000
-            df_calculo_copy["BPAI"] = df_calculo_copy["BPAI"]*(1-descuento)*(1+rpf)*df_contratante["SumaAsegurada"].values[0]/1000
+        registro = obtener_registro_contratante(df_parametros, contratante)
+        tabla_cuotas = df_cuotas if isinstance(df_cuotas, TablaCuotas) else TablaCuotas(df_cuotas)
+        df_calculo_copy = df_calculo.reset_index(drop=True)
+        df_calculo_copy["Edad"] = calcular_edades(df_calculo_copy["Fecha de Nacimiento"], fecha_corte) if edades is None else edades
+
+        # Cuotas de las coberturas contratadas, escaladas por descuento, recargo y suma asegurada
+        factor = (1-descuento)*(1+rpf)*registro["SumaAsegurada"]/1000
+        for col in COBERTURAS_COLUMNAS.get(registro["Coberturas"], []):
+            df_calculo_copy[col] = tabla_cuotas.obtener_cuotas(df_calculo_copy["Edad"], col)*factor
 
         return df_calculo_copy
     
@@ -365,87 +1078,117 @@ def generar_memoria_calculo(contratante:str, fecha_corte:np.datetime64, df_param
         return pd.DataFrame()
 
 
-def creacion_cotizacion_dict(df_parametros: pd.DataFrame, contratante:str, ticket:int, df_calculo:pd.DataFrame,
-                             df_emisiones:pd.DataFrame, df_cuotas:pd.DataFrame)-> dict:
+def cotizar_contratante(df_parametros, contratante:str, ticket:int, df_calculo:pd.DataFrame,
+                        df_emisiones, df_cuotas, por_histograma: bool = False, cache=None)-> tuple:
     """
-    *Función que crea un diccionario con los datos de la cotización*
+    *Función que crea el diccionario de cotización de un contratante junto con su memoria de cálculo*
+
+    Las edades y la memoria de cálculo se obtienen una sola vez y la memoria se regresa junto con la
+    cotización, por lo que no es necesario volver a llamar a `generar_memoria_calculo`.
     
     **Parameters**:
     
-        df_parametros (DataFrame): DataFrame con datos de cálculo
+        df_parametros (DataFrame | dict): Parámetros de las cotizaciones o su índice de `indexar_parametros`
         
         contratante (str): Nombre del contratante
 
         ticket (int): Número de ticket de la cotización
         
-        df_calculo (DataFrame): DataFrame con datos de asegurados y edades
+        df_calculo (DataFrame | CensoCompacto): DataFrame con datos de asegurados y edades
 
-        df_emisiones (DataFrame): DataFrame con datos de emisiones
+        df_emisiones (DataFrame | dict): Emisiones o su índice de `indexar_siniestralidad`
+
+        df_cuotas (DataFrame | TablaCuotas): Datos de cuotas o su tabla compilada
+
+        por_histograma (bool): Si es True la prima se calcula con el histograma de edades, sin
+        construir la memoria de cálculo (se genera aparte con `generar_memoria_calculo` si se requiere)
 
-        df_cuotas (DataFrame): DataFrame con datos de cuotas
+        cache (CacheCotizaciones): Caché de cotizaciones. Si la misma base de asegurados, registro de
+        parámetros, tabla de cuotas y siniestralidad ya se cotizaron, se regresa lo guardado con el ticket nuevo
         
     
     **Returns**:
     
-        dict: Diccionario con los datos de la cotización
+        tuple: (cotizacion_dict, memoria_calculo). La memoria es None si por_histograma es True
     """
     try:
     
         # Para rellenar más facilmente el diccionario
-        df_contratante = df_parametros[df_parametros["Contratante"] == contratante]
-
-        # Creamos una copia del DataFrame de cálculo para evitar modificar el original
-        df_calculo_copy = df_calculo.copy()
+        registro = obtener_registro_contratante(df_parametros, contratante)
+
+        if cache is not None:
+            tabla_cuotas = df_cuotas if isinstance(df_cuotas, TablaCuotas) else TablaCuotas(df_cuotas)
+            siniestralidad = obtener_siniestralidad(df_emisiones, registro["Poliza"]) if registro["Renovacion"] == "Si" else None
+            df_asegurados = _dataframe_censo(df_calculo)
+            llave = llave_cotizacion("contratante-histograma" if por_histograma else "contratante-memoria",
+                                     huella_censo(huellas_filas(df_asegurados), df_asegurados.columns),
+                                     registro, tabla_cuotas.version, siniestralidad)
+            entrada = cache.obtener(llave)
+            if entrada is not None:
+                cotizacion_dict, memoria_calculo = entrada
+                cotizacion_dict["Ticket"] = [ticket]
+                cache.guardar()
+                return cotizacion_dict, memoria_calculo
+            df_cuotas = tabla_cuotas
 
         # Para crear la edad promedio de los asegurados
-        fecha_corte = df_contratante["Inicio"].values[0]
-        df_calculo_copy["Edad"] = df_calculo_copy["Fecha de Nacimiento"].apply(lambda x: calcular_edad(x, fecha_corte))
+        fecha_corte = registro["Inicio"]
+        edades = pd.Series(_edades_censo(df_calculo, fecha_corte))
 
         # Recargo por pago fraccionado y número de recibos
-        forma_pago = df_contratante["FormaPago"].values[0]
+        forma_pago = registro["FormaPago"]
         _ = obtener_parametros_forma_pago(forma_pago)
         rpf = _["rpf"]
         num_recibos = _["num_recibos"]
 
         # Comisión y descuento
-        comision = df_contratante["Comision"].values[0]
+        comision = registro["Comision"]
         descuento = obtener_descuento_comision(comision)
 
-        # Memoria de cálculo
-        memoria_calculo = generar_memoria_calculo(contratante, fecha_corte, df_parametros, df_calculo,
-                            df_cuotas, descuento, rpf)
-        
-        # Primas
-        prima = memoria_calculo[memoria_calculo.columns[3:]].sum().sum()
+        memoria_calculo = None
+        if por_histograma:
+            # Prima a partir del histograma de edades, sin construir la memoria de cálculo
+            tabla_cuotas = df_cuotas if isinstance(df_cuotas, TablaCuotas) else TablaCuotas(df_cuotas)
+            factor = (1-descuento)*(1+rpf)*registro["SumaAsegurada"]/1000
+            eje_edades, conteos = histograma_edades(edades)
+            prima = calcular_primas_histograma(eje_edades, conteos, tabla_cuotas,
+                                               [registro["Coberturas"]], [factor])[0] + edades.sum()
+        else:
+            # Memoria de cálculo
+            memoria_calculo = generar_memoria_calculo(contratante, fecha_corte, {contratante: registro}, _dataframe_censo(df_calculo),
+                                df_cuotas, descuento, rpf, edades.to_numpy())
+            
+            # Primas
+            prima = memoria_calculo[memoria_calculo.columns[3:]].sum().sum()
 
         cotizacion_dict = {
             "Contratante": [contratante],
-            "Coberturas": [df_contratante["Coberturas"].values[0]],
-            "SumaAsegurada": [df_contratante["SumaAsegurada"].values[0]],
-            "Administracion": [df_contratante["Administracion"].values[0]],
-            "Agente": [df_contratante["Agente"].values[0]],
-            "Comision": [df_contratante["Comision"].values[0]],
-            "FormaPago": [df_contratante["FormaPago"].values[0]],
-            "Inicio": [df_contratante["Inicio"].values[0]],
-            "Fin": [df_contratante["Fin"].values[0]],
-            "Renovacion": [df_contratante["Renovacion"].values[0]],
-            "Poliza": [df_contratante["Poliza"].values[0]],
+            "Coberturas": [registro["Coberturas"]],
+            "SumaAsegurada": [registro["SumaAsegurada"]],
+            "Administracion": [registro["Administracion"]],
+            "Agente": [registro["Agente"]],
+            "Comision": [registro["Comision"]],
+            "FormaPago": [registro["FormaPago"]],
+            "Inicio": [registro["Inicio"]],
+            "Fin": [registro["Fin"]],
+            "Renovacion": [registro["Renovacion"]],
+            "Poliza": [registro["Poliza"]],
             "Ticket": [ticket],
-            "Oficina": [df_contratante["Oficina"].values[0]],
+            "Oficina": [registro["Oficina"]],
             "RPF": [rpf],
             "NumRecibos": [num_recibos],
             "Comision": [comision],
             "Descuento": [descuento],
             "Prima": [],
-            "EdadPromedio": [df_calculo_copy["Edad"].mean()],
-            "SAMI": [df_contratante["SumaAsegurada"].values[0]],
-            "Asegurados": [df_calculo_copy["Edad"].count()],
-            "Mes": [obtener_nombre_mes(df_contratante["Inicio"].values[0])],
+            "EdadPromedio": [edades.mean()],
+            "SAMI": [registro["SumaAsegurada"]],
+            "Asegurados": [edades.count()],
+            "Mes": [obtener_nombre_mes(registro["Inicio"])],
             "Evento": []
         }
 
-        if df_contratante["Renovacion"].values[0] == "Si":
-            siniestralidad = df_emisiones.loc[df_emisiones["Poliza"] == df_contratante["Poliza"].values[0], "Siniestralidad"].values[0]
+        if registro["Renovacion"] == "Si":
+            siniestralidad = obtener_siniestralidad(df_emisiones, registro["Poliza"])
             
             if siniestralidad < 0.50:
                 cotizacion_dict["Prima"].append(prima)
@@ -459,11 +1202,672 @@ def creacion_cotizacion_dict(df_parametros: pd.DataFrame, contratante:str, ticke
             cotizacion_dict["Prima"].append(prima)
             cotizacion_dict["Evento"].append("na")            
             
+        if cache is not None:
+            cache.guardar_cotizacion(llave, cotizacion_dict, memoria_calculo)
+            cache.guardar()
 
-
-        return cotizacion_dict
+        return cotizacion_dict, memoria_calculo
     
     except Exception as e:
         print(f"Error al crear el diccionario de cotización: {e}")
+        return {}, pd.DataFrame()
+
+
+def creacion_cotizacion_dict(df_parametros, contratante:str, ticket:int, df_calculo:pd.DataFrame,
+                             df_emisiones, df_cuotas, por_histograma: bool = False, cache=None)-> dict:
+    """
+    *Función que crea un diccionario con los datos de la cotización*
+
+    Para obtener también la memoria de cálculo sin volver a calcularla usar `cotizar_contratante`.
+    
+    **Parameters**:
+    
+        df_parametros (DataFrame | dict): Parámetros de las cotizaciones o su índice de `indexar_parametros`
+        
+        contratante (str): Nombre del contratante
+
+        ticket (int): Número de ticket de la cotización
+        
+        df_calculo (DataFrame | CensoCompacto): DataFrame con datos de asegurados y edades
+
+        df_emisiones (DataFrame | dict): Emisiones o su índice de `indexar_siniestralidad`
+
+        df_cuotas (DataFrame | TablaCuotas): Datos de cuotas o su tabla compilada
+
+        por_histograma (bool): Si es True la prima se calcula con el histograma de edades
+
+        cache (CacheCotizaciones): Caché de cotizaciones (ver `cotizar_contratante`)
+    
+    **Returns**:
+    
+        dict: Diccionario con los datos de la cotización
+    """
+
+    cotizacion_dict, _ = cotizar_contratante(df_parametros, contratante, ticket, df_calculo,
+                                             df_emisiones, df_cuotas, por_histograma, cache)
+    return cotizacion_dict
+
+
+def cotizar_escenarios(df_parametros, contratante: str, df_calculo: pd.DataFrame, df_cuotas) -> pd.DataFrame:
+    """
+    *Función que calcula la prima de un contratante para todas las combinaciones de comisión, forma de pago y cobertura*
+
+    Las edades y las cuotas se obtienen una sola vez con el histograma de edades del grupo; el resto
+    de la malla (16 comisiones × 4 formas de pago × 4 coberturas) se obtiene por broadcasting. No se
+    aplica la política de siniestralidad de renovaciones.
+
+    **Parameters**:
+
+        df_parametros (DataFrame | dict): Parámetros de las cotizaciones o su índice (se usan Inicio y SumaAsegurada)
+
+        contratante (str): Nombre del contratante
+
+        df_calculo (DataFrame | CensoCompacto): DataFrame con datos de asegurados del contratante
+
+        df_cuotas (DataFrame | TablaCuotas): Datos de cuotas o su tabla compilada
+
+    **Returns**:
+
+        DataFrame: Una fila por escenario con Comision, Descuento, FormaPago, RPF, NumRecibos, Coberturas y Prima
+    """
+    try:
+
+        registro = obtener_registro_contratante(df_parametros, contratante)
+        tabla_cuotas = df_cuotas if isinstance(df_cuotas, TablaCuotas) else TablaCuotas(df_cuotas)
+
+        # Histograma de edades del grupo (única pasada sobre los asegurados)
+        fecha_corte = registro["Inicio"]
+        edades = _edades_censo(df_calculo, fecha_corte)
+        eje_edades, conteos = histograma_edades(edades)
+
+        # Prima sin descuento ni recargo de cada cobertura
+        suma_asegurada = registro["SumaAsegurada"]
+        coberturas = list(COBERTURAS_COLUMNAS)
+        primas_cobertura = calcular_primas_histograma(eje_edades, np.repeat(conteos, len(coberturas), axis=0),
+                                                      tabla_cuotas, coberturas, np.full(len(coberturas), suma_asegurada/1000))
+
+        comisiones = np.array(list(DESCUENTOS_COMISION))
+        descuentos = np.array(list(DESCUENTOS_COMISION.values()))
+        formas_pago = list(RECARGOS_FORMA_PAGO)
+        rpf = np.array([RECARGOS_FORMA_PAGO[forma_pago]["rpf"] for forma_pago in formas_pago])
+        num_recibos = np.array([RECARGOS_FORMA_PAGO[forma_pago]["num_recibos"] for forma_pago in formas_pago])
+
+        # Malla comisión × forma de pago × cobertura
+        primas = (1-descuentos)[:, None, None]*(1+rpf)[None, :, None]*primas_cobertura[None, None, :] + np.nansum(edades)
+        i_comision, i_forma_pago, i_cobertura = np.meshgrid(np.arange(len(comisiones)), np.arange(len(formas_pago)),
+                                                            np.arange(len(coberturas)), indexing="ij")
+
+        return pd.DataFrame({
+            "Contratante": contratante,
+            "Comision": comisiones[i_comision.ravel()],
+            "Descuento": descuentos[i_comision.ravel()],
+            "FormaPago": np.array(formas_pago)[i_forma_pago.ravel()],
+            "RPF": rpf[i_forma_pago.ravel()],
+            "NumRecibos": num_recibos[i_forma_pago.ravel()],
+            "Coberturas": np.array(coberturas)[i_cobertura.ravel()],
+            "Prima": primas.ravel()
+        })
+
+    except Exception as e:
+        print(f"Error al calcular los escenarios de cotización: {e}")
+        return pd.DataFrame()
+
+
+def cotizar_lote(df_parametros: pd.DataFrame, df_calculo: pd.DataFrame, df_emisiones,
+                 df_cuotas, ticket_inicial: int, generar_memorias: bool = True, cache=None) -> tuple:
+    """
+    *Función que cotiza a todos los contratantes en una sola pasada vectorizada*
+
+    Agrupa la base de asegurados por contratante una sola vez, une los parámetros de cada
+    contratante a sus asegurados, calcula edades y cuotas para todos los asegurados a la vez y
+    agrega las primas por contratante. Los tickets se asignan en el orden de `df_parametros`,
+    igual que en el cálculo contratante por contratante. Si la pasada vectorizada falla se cotiza
+    contratante por contratante, de modo que un error sólo descarta al contratante que lo provoca.
+
+    **Parameters**:
+
+        df_parametros (DataFrame): DataFrame con los parámetros de las cotizaciones
+
+        df_calculo (DataFrame | CensoCompacto): Asegurados de todos los contratantes
+
+        df_emisiones (DataFrame | dict): Emisiones o su índice de `indexar_siniestralidad`
+
+        df_cuotas (DataFrame | TablaCuotas): Datos de cuotas o su tabla compilada
+
+        ticket_inicial (int): Número de ticket de la primera cotización
+
+        generar_memorias (bool): Si es False las primas se calculan con el histograma de edades de
+        cada contratante y no se construye la memoria de cálculo por asegurado
+
+        cache (CacheCotizaciones): Caché de cotizaciones. Sólo se calculan los contratantes que no están en el caché
+
+    **Returns**:
+
+        tuple: (df_cotizaciones, df_memorias) con una fila por cotización y la memoria de cálculo
+        de todos los asegurados, identificada por la columna "Contratante" (None si generar_memorias es False).
+    """
+    try:
+        if cache is not None:
+            return _cotizar_lote_con_cache(
+                lambda df_param, df_calc, ticket: _cotizar_fragmento_con_tablas(df_param, df_calc, df_emisiones, df_cuotas,
+                                                                                ticket, generar_memorias),
+                df_parametros, df_calculo, df_emisiones, df_cuotas, ticket_inicial, generar_memorias, cache
+            )
+
+        return _cotizar_fragmento_con_tablas(df_parametros, df_calculo, df_emisiones, df_cuotas, ticket_inicial, generar_memorias)
+
+    except Exception as e:
+        print(f"Error al cotizar el lote de contratantes: {e}")
+        return pd.DataFrame(), pd.DataFrame()
+
+
+def _cotizar_lote(df_parametros: pd.DataFrame, df_calculo: pd.DataFrame, df_emisiones,
+                  df_cuotas, ticket_inicial: int, generar_memorias: bool = True) -> tuple:
+    """Implementación de `cotizar_lote` que propaga los errores en lugar de imprimirlos."""
+
+    # Un registro por contratante (el cálculo individual toma el primero)
+    df_param = df_parametros[df_parametros["Contratante"].notna()]
+    df_param = df_param.drop_duplicates(subset="Contratante", keep="first").reset_index(drop=True)
+    n_contratantes = len(df_param)
+    rpf, num_recibos, descuento, factor = _factores_lote(df_param)
+
+    # Índice del contratante de cada asegurado (un solo join contra los parámetros)
+    codigos = _codigos_censo(df_calculo, df_param["Contratante"])
+    con_contratante = codigos >= 0
+    codigos = codigos[con_contratante]
+
+    with subetapa("edades"):
+        edades = _edades_censo(df_calculo, df_param["Inicio"].to_numpy()[codigos], con_contratante)
+    tabla_cuotas = df_cuotas if isinstance(df_cuotas, TablaCuotas) else TablaCuotas(df_cuotas)
+
+    if generar_memorias:
+
+        # Cuotas por edad para todos los asegurados, escaladas según su contratante
+        with subetapa("cuotas"):
+            df_memorias = _memoria_asegurados(_dataframe_censo(_filtrar_censo(df_calculo, con_contratante)), edades,
+                                              codigos, df_param["Coberturas"], factor, tabla_cuotas)
+        with subetapa("agregacion"):
+            prima_asegurado = df_memorias[tabla_cuotas.columnas].sum(axis=1).to_numpy()
+            primas = np.bincount(codigos, weights=prima_asegurado, minlength=n_contratantes)
+
+    else:
+
+        # Sólo se necesita el número de asegurados por edad de cada contratante
+        df_memorias = None
+        with subetapa("agregacion"):
+            eje_edades, conteos = histograma_edades(edades, codigos, n_contratantes)
+        with subetapa("cuotas"):
+            primas = calcular_primas_histograma(eje_edades, conteos, tabla_cuotas, df_param["Coberturas"], factor)
+
+    # Agregados de edad por contratante
+    with subetapa("agregacion"):
+        asegurados, suma_edades = _agregados_edad(edades, codigos, n_contratantes)
+        df_cotizaciones, sin_emision = _tabla_cotizaciones(df_param, rpf, num_recibos, descuento, primas,
+                                                           asegurados, suma_edades, df_emisiones, ticket_inicial)
+    if df_memorias is not None:
+        df_memorias = df_memorias[~sin_emision[codigos]].reset_index(drop=True)
+
+    return df_cotizaciones, df_memorias
+
+
+def _factores_lote(df_param: pd.DataFrame) -> tuple:
+    """Recargo, número de recibos, descuento y factor de prima (por cada mil de suma asegurada) de cada contratante."""
+
+    formas_pago = [obtener_parametros_forma_pago(forma_pago) for forma_pago in df_param["FormaPago"]]
+    rpf = np.array([forma_pago["rpf"] for forma_pago in formas_pago], dtype=float)
+    num_recibos = np.array([forma_pago["num_recibos"] for forma_pago in formas_pago])
+    descuentos = {comision: obtener_descuento_comision(comision) for comision in df_param["Comision"].unique()}
+    descuento = df_param["Comision"].map(descuentos).to_numpy(dtype=float)
+    factor = (1-descuento)*(1+rpf)*df_param["SumaAsegurada"].to_numpy(dtype=float)/1000
+
+    return rpf, num_recibos, descuento, factor
+
+
+def _memoria_asegurados(df_calculo: pd.DataFrame, edades, codigos: np.ndarray, coberturas: pd.Series,
+                        factor: np.ndarray, tabla_cuotas: TablaCuotas) -> pd.DataFrame:
+    """Memoria de cálculo de un grupo de asegurados: su edad y la cuota de cada cobertura escalada según su contratante."""
+
+    df_memorias = df_calculo.reset_index(drop=True)
+    df_memorias["Edad"] = edades
+
+    for col in tabla_cuotas.columnas:
+        cubre = coberturas.map(lambda cobertura: col in COBERTURAS_COLUMNAS.get(cobertura, [])).to_numpy(dtype=bool)
+        cuotas = tabla_cuotas.obtener_cuotas(edades, col)
+        df_memorias[col] = np.where(cubre[codigos], cuotas*factor[codigos], np.nan)
+
+    return df_memorias
+
+
+def _agregados_edad(edades, codigos: np.ndarray, n_contratantes: int) -> tuple:
+    """Número de asegurados con edad y suma de sus edades por contratante."""
+
+    edades = np.asarray(edades, dtype=float)
+    con_edad = ~np.isnan(edades)
+    asegurados = np.bincount(codigos[con_edad], minlength=n_contratantes)
+    suma_edades = np.bincount(codigos[con_edad], weights=edades[con_edad], minlength=n_contratantes)
+
+    return asegurados, suma_edades
+
+
+def _tabla_cotizaciones(df_param: pd.DataFrame, rpf: np.ndarray, num_recibos: np.ndarray, descuento: np.ndarray,
+                        primas: np.ndarray, asegurados: np.ndarray, suma_edades: np.ndarray, df_emisiones,
+                        ticket_inicial: int) -> tuple:
+    """Tabla de cotizaciones a partir de los agregados por contratante, con la política de siniestralidad aplicada.
+    Regresa también la máscara de las renovaciones sin emisión, que se descartan de la tabla."""
+
+    n_contratantes = len(df_param)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        edad_promedio = suma_edades/asegurados
+
+    # Política de siniestralidad para renovaciones
+    indice_siniestralidad = df_emisiones if isinstance(df_emisiones, dict) else indexar_siniestralidad(df_emisiones)
+    renovacion = (df_param["Renovacion"] == "Si").to_numpy()
+    con_emision = np.array([poliza in indice_siniestralidad for poliza in df_param["Poliza"]], dtype=bool)
+    siniestralidad = np.array([indice_siniestralidad.get(poliza, np.nan) for poliza in df_param["Poliza"]], dtype=float)
+    fuera_politica = renovacion & con_emision & ~(siniestralidad < 0.50)
+
+    # Misma prima que `cotizar_contratante` (suma de memoria.columns[3:]: edad y cuotas)
+    primas = primas + suma_edades
+
+    mensaje = "La siniestralidad está desviada, consulte a un suscriptor"
+    prima = np.where(fuera_politica, mensaje, primas.astype(object))
+
+    df_cotizaciones = pd.DataFrame({
+        "Contratante": df_param["Contratante"],
+        "Coberturas": df_param["Coberturas"],
+        "SumaAsegurada": df_param["SumaAsegurada"],
+        "Administracion": df_param["Administracion"],
+        "Agente": df_param["Agente"],
+        "Comision": df_param["Comision"],
+        "FormaPago": df_param["FormaPago"],
+        "Inicio": df_param["Inicio"],
+        "Fin": df_param["Fin"],
+        "Renovacion": df_param["Renovacion"],
+        "Poliza": df_param["Poliza"],
+        "Ticket": ticket_inicial + np.arange(n_contratantes),
+        "Oficina": df_param["Oficina"],
+        "RPF": rpf,
+        "NumRecibos": num_recibos,
+        "Descuento": descuento,
+        "Prima": prima,
+        "EdadPromedio": edad_promedio,
+        "SAMI": df_param["SumaAsegurada"],
+        "Asegurados": asegurados,
+        "Mes": [obtener_nombre_mes(inicio) for inicio in df_param["Inicio"]],
+        "Evento": np.where(fuera_politica, "Fuera de política", "na")
+    })
+
+    # Las renovaciones sin emisión no se pueden cotizar (conservan su ticket, como en el cálculo individual)
+    sin_emision = renovacion & ~con_emision
+    for contratante, poliza in zip(df_param.loc[sin_emision, "Contratante"], df_param.loc[sin_emision, "Poliza"]):
+        print(f"Error con {contratante}: no se encontró la póliza {poliza} en emisiones")
+
+    return df_cotizaciones[~sin_emision].reset_index(drop=True), sin_emision
+
+
+def _cotizar_lote_con_cache(cotizar, df_parametros: pd.DataFrame, df_calculo: pd.DataFrame, df_emisiones,
+                            df_cuotas, ticket_inicial: int, generar_memorias: bool, cache) -> tuple:
+    """
+    Cotiza un lote consultando primero el caché: `cotizar(df_param, df_calculo, ticket_inicial)` sólo
+    recibe a los contratantes que no están en el caché y sus resultados se agregan al caché. Los
+    tickets se asignan por la posición del contratante en `df_parametros`, igual que sin caché.
+    """
+
+    df_param = df_parametros[df_parametros["Contratante"].notna()]
+    df_param = df_param.drop_duplicates(subset="Contratante", keep="first").reset_index(drop=True)
+    if df_param.empty:
+        return cotizar(df_param, _filtrar_censo(df_calculo, np.zeros(len(df_calculo), dtype=bool)), ticket_inicial)
+    registros = indexar_parametros(df_param)
+    tabla_cuotas = df_cuotas if isinstance(df_cuotas, TablaCuotas) else TablaCuotas(df_cuotas)
+    indice_siniestralidad = df_emisiones if isinstance(df_emisiones, dict) else indexar_siniestralidad(df_emisiones)
+    modo = "lote-memoria" if generar_memorias else "lote-histograma"
+
+    # Filas de cada contratante en el orden de la base (una sola pasada de hash sobre los asegurados)
+    codigos = _codigos_censo(df_calculo, df_param["Contratante"])
+    df_asegurados = _dataframe_censo(df_calculo)
+    huellas = huellas_filas(df_asegurados)
+    orden = np.argsort(codigos, kind="stable")
+    limites = np.searchsorted(codigos[orden], np.arange(len(df_param) + 1))
+
+    llaves, entradas = [], {}
+    for i, contratante in enumerate(df_param["Contratante"]):
+        registro = registros[contratante]
+        siniestralidad = indice_siniestralidad.get(registro["Poliza"]) if registro["Renovacion"] == "Si" else None
+        llaves.append(llave_cotizacion(modo, huella_censo(huellas[orden[limites[i]:limites[i+1]]], df_asegurados.columns),
+                                       registro, tabla_cuotas.version, siniestralidad))
+        entrada = cache.obtener(llaves[i])
+        if entrada is not None:
+            entradas[i] = entrada
+
+    # Contratantes que no están en el caché
+    faltantes = np.array([i not in entradas for i in range(len(df_param))], dtype=bool)
+    if faltantes.any():
+        df_cot, df_mem = cotizar(df_param[faltantes], _filtrar_censo(df_calculo, (codigos >= 0) & faltantes[codigos]), ticket_inicial)
+        posiciones = dict(zip(df_param["Contratante"], range(len(df_param))))
+        memorias = dict(list(df_mem.groupby("Contratante", sort=False))) if generar_memorias and len(df_mem) else {}
+
+        for registro_cot in df_cot.to_dict("records"):
+            i = posiciones[registro_cot["Contratante"]]
+            memoria = memorias.get(registro_cot["Contratante"], df_mem.iloc[0:0]) if generar_memorias else None
+            entradas[i] = (registro_cot, memoria)
+            cache.guardar_cotizacion(llaves[i], registro_cot, memoria)
+
+    cache.guardar()
+
+    # Se arma el lote en el orden de los parámetros con el ticket de cada posición
+    posiciones = sorted(entradas)
+    df_cotizaciones = pd.DataFrame([{**entradas[i][0], "Ticket": ticket_inicial + i} for i in posiciones])
+    df_memorias = None
+    if generar_memorias:
+        memorias = [entradas[i][1] for i in posiciones]
+        df_memorias = pd.concat(memorias, ignore_index=True) if memorias else pd.DataFrame()
+
+    return df_cotizaciones, df_memorias
+
+
+def cotizar_por_bloques(df_parametros: pd.DataFrame, bloques, df_emisiones, df_cuotas, ticket_inicial: int,
+                        directorio_memorias: str = None) -> tuple:
+    """
+    *Función que cotiza a todos los contratantes recorriendo la base de asegurados por bloques*
+
+    Cada bloque se une a los parámetros, se calcula su memoria de cálculo y se acumulan por
+    contratante la prima, el número de asegurados y la suma de edades, por lo que la memoria usada
+    depende del tamaño del bloque y no del tamaño de la cartera. La memoria de cálculo de cada
+    contratante se agrega a su CSV en `directorio_memorias` conforme se procesan los bloques. El
+    resultado es el mismo que el de `cotizar_lote` con la memoria de cálculo.
+
+    **Parameters**:
+
+        df_parametros (DataFrame): DataFrame con los parámetros de las cotizaciones
+
+        bloques (iterable): Bloques (DataFrames) de la base de asegurados, p. ej. de `leer_base_por_bloques`
+
+        df_emisiones (DataFrame | dict): Emisiones o su índice de `indexar_siniestralidad`
+
+        df_cuotas (DataFrame | TablaCuotas): Datos de cuotas o su tabla compilada
+
+        ticket_inicial (int): Número de ticket de la primera cotización
+
+        directorio_memorias (str): Directorio local para las memorias de cálculo (None: no se escriben).
+        Cada memoria conserva sólo las columnas de las coberturas contratadas y las columnas del primer
+        bloque en que aparece el contratante
+
+    **Returns**:
+
+        tuple: (df_cotizaciones, rutas_memorias) con la tabla de cotizaciones de `cotizar_lote` y un
+        diccionario {contratante: ruta del CSV con su memoria de cálculo}
+    """
+    try:
+
+        df_param = df_parametros[df_parametros["Contratante"].notna()]
+        df_param = df_param.drop_duplicates(subset="Contratante", keep="first").reset_index(drop=True)
+        n_contratantes = len(df_param)
+        rpf, num_recibos, descuento, factor = _factores_lote(df_param)
+        tabla_cuotas = df_cuotas if isinstance(df_cuotas, TablaCuotas) else TablaCuotas(df_cuotas)
+        inicios = df_param["Inicio"].to_numpy()
+
+        # Acumuladores por contratante
+        primas = np.zeros(n_contratantes)
+        asegurados = np.zeros(n_contratantes, dtype=np.int64)
+        suma_edades = np.zeros(n_contratantes)
+
+        if directorio_memorias is not None:
+            os.makedirs(directorio_memorias, exist_ok=True)
+        rutas_memorias = {}
+        columnas_memorias = {}
+        columnas_base = None
+
+        for bloque in bloques:
+            codigos = pd.Categorical(bloque["Contratante"], categories=df_param["Contratante"]).codes
+            con_contratante = codigos >= 0
+            codigos = codigos[con_contratante]
+            if not len(codigos):
+                continue
+
+            with subetapa("edades"):
+                edades = calcular_edades(bloque.loc[con_contratante, "Fecha de Nacimiento"], inicios[codigos])
+            with subetapa("cuotas"):
+                df_memoria = _memoria_asegurados(bloque[con_contratante], edades, codigos, df_param["Coberturas"],
+                                                 factor, tabla_cuotas)
+
+            with subetapa("agregacion"):
+                primas += np.bincount(codigos, weights=df_memoria[tabla_cuotas.columnas].sum(axis=1).to_numpy(),
+                                      minlength=n_contratantes)
+                asegurados_bloque, suma_edades_bloque = _agregados_edad(edades, codigos, n_contratantes)
+                asegurados += asegurados_bloque
+                suma_edades += suma_edades_bloque
+
+            if directorio_memorias is None:
+                continue
+
+            # Se agrega la memoria del bloque al CSV de cada contratante
+            columnas_base = columnas_base if columnas_base is not None else list(df_memoria.columns)
+            for codigo, df_grupo in df_memoria.groupby(codigos, sort=False):
+                if codigo not in rutas_memorias:
+                    cubiertas = COBERTURAS_COLUMNAS.get(df_param["Coberturas"].iloc[codigo], [])
+                    columnas_memorias[codigo] = [col for col in df_grupo.columns
+                                                 if col not in tabla_cuotas.columnas or col in cubiertas]
+                    rutas_memorias[codigo] = os.path.join(directorio_memorias, f"memoria_{codigo}.csv")
+                    df_grupo[columnas_memorias[codigo]].to_csv(rutas_memorias[codigo], index=False)
+                else:
+                    df_grupo.reindex(columns=columnas_memorias[codigo]).to_csv(rutas_memorias[codigo], mode="a",
+                                                                               header=False, index=False)
+
+        df_cotizaciones, sin_emision = _tabla_cotizaciones(df_param, rpf, num_recibos, descuento, primas,
+                                                           asegurados, suma_edades, df_emisiones, ticket_inicial)
+
+        if directorio_memorias is None:
+            return df_cotizaciones, {}
+
+        # Los contratantes sin asegurados reciben una memoria vacía
+        memorias = {}
+        for codigo in np.flatnonzero(~sin_emision):
+            if codigo not in rutas_memorias:
+                cubiertas = COBERTURAS_COLUMNAS.get(df_param["Coberturas"].iloc[codigo], [])
+                columnas = [col for col in (columnas_base or []) if col not in tabla_cuotas.columnas or col in cubiertas]
+                rutas_memorias[codigo] = os.path.join(directorio_memorias, f"memoria_{codigo}.csv")
+                pd.DataFrame(columns=columnas).to_csv(rutas_memorias[codigo], index=False)
+            memorias[df_param["Contratante"].iloc[codigo]] = rutas_memorias[codigo]
+
+        return df_cotizaciones, memorias
+
+    except Exception as e:
+        print(f"Error al cotizar el lote de contratantes por bloques: {e}")
+        return pd.DataFrame(), {}
+
+
+# Tablas de solo lectura compartidas por los procesos de `cotizar_lote_paralelo`
+_TABLAS_PROCESO = {}
+
+
+def _inicializar_proceso(df_emisiones, tabla_cuotas: TablaCuotas):
+    """Guarda en cada proceso las tablas de solo lectura, que se envían una sola vez por proceso."""
+    _TABLAS_PROCESO["emisiones"] = df_emisiones
+    _TABLAS_PROCESO["cuotas"] = tabla_cuotas
+
+
+def _cotizar_fragmento(df_param: pd.DataFrame, df_calculo: pd.DataFrame, ticket_inicial: int,
+                       generar_memorias: bool) -> tuple:
+    """Cotiza un fragmento de contratantes dentro de un proceso del pool."""
+    return _cotizar_fragmento_con_tablas(df_param, df_calculo, _TABLAS_PROCESO["emisiones"], _TABLAS_PROCESO["cuotas"],
+                                         ticket_inicial, generar_memorias)
+
+
+def _cotizar_fragmento_con_tablas(df_param: pd.DataFrame, df_calculo: pd.DataFrame, df_emisiones,
+                                  tabla_cuotas, ticket_inicial: int, generar_memorias: bool) -> tuple:
+    """
+    Cotiza un fragmento en bloque y, si falla, contratante por contratante para que un error
+    sólo afecte al contratante que lo provoca. Cada contratante conserva el ticket de su posición.
+    """
+    try:
+        return _cotizar_lote(df_param, df_calculo, df_emisiones, tabla_cuotas, ticket_inicial, generar_memorias)
+    except Exception as e:
+        print(f"Error al cotizar el fragmento, se cotizará contratante por contratante: {e}")
+
+    # Un registro por contratante, como en `_cotizar_lote`, para que los tickets coincidan
+    df_param = df_param[df_param["Contratante"].notna()]
+    df_param = df_param.drop_duplicates(subset="Contratante", keep="first").reset_index(drop=True)
+    tabla_cuotas = tabla_cuotas if isinstance(tabla_cuotas, TablaCuotas) else TablaCuotas(tabla_cuotas)
+    df_emisiones = df_emisiones if isinstance(df_emisiones, dict) else indexar_siniestralidad(df_emisiones)
+
+    cotizaciones, memorias = [], []
+    for i, contratante in enumerate(df_param["Contratante"]):
+        try:
+            df_cotizacion, df_memoria = _cotizar_lote(df_param.iloc[[i]], _filtrar_censo(df_calculo, _codigos_censo(df_calculo, [contratante]) == 0),
+                                                      df_emisiones, tabla_cuotas, ticket_inicial + i, generar_memorias)
+            cotizaciones.append(df_cotizacion)
+            memorias.append(df_memoria)
+        except Exception as e:
+            print(f"Error con {contratante}: {e}")
+
+    if not cotizaciones:
+        return pd.DataFrame(), (pd.DataFrame() if generar_memorias else None)
+    return (pd.concat(cotizaciones, ignore_index=True),
+            pd.concat(memorias, ignore_index=True) if generar_memorias else None)
+
+
+def cotizar_lote_paralelo(df_parametros: pd.DataFrame, df_calculo: pd.DataFrame, df_emisiones,
+                          df_cuotas, ticket_inicial: int, n_procesos: int = None,
+                          contratantes_por_fragmento: int = None, generar_memorias: bool = True, cache=None) -> tuple:
+    """
+    *Función que cotiza a todos los contratantes repartiéndolos en fragmentos entre un pool de procesos*
+
+    Cada fragmento es un bloque contiguo de contratantes (en el orden de `df_parametros`) con sus
+    asegurados, y se cotiza con `cotizar_lote` a partir del ticket que le corresponde, por lo que los
+    tickets son idénticos a los de una ejecución secuencial. La tabla de cuotas y las emisiones se
+    envían una sola vez a cada proceso. Si un fragmento falla se cotiza contratante por contratante,
+    de modo que un error sólo descarta al contratante que lo provoca.
+
+    **Parameters**:
+
+        df_parametros (DataFrame): DataFrame con los parámetros de las cotizaciones
+
+        df_calculo (DataFrame | CensoCompacto): Asegurados de todos los contratantes
+
+        df_emisiones (DataFrame | dict): Emisiones o su índice de `indexar_siniestralidad`
+
+        df_cuotas (DataFrame | TablaCuotas): Datos de cuotas o su tabla compilada
+
+        ticket_inicial (int): Número de ticket de la primera cotización
+
+        n_procesos (int): Número de procesos del pool (por defecto uno por CPU). Con 1 se cotiza en el proceso actual
+
+        contratantes_por_fragmento (int): Contratantes por tarea (por defecto, cuatro fragmentos por proceso)
+
+        generar_memorias (bool): Si es False las primas se calculan con el histograma de edades
+
+        cache (CacheCotizaciones): Caché de cotizaciones. Sólo se reparten los contratantes que no están en el caché
+
+    **Returns**:
+
+        tuple: (df_cotizaciones, df_memorias) con el mismo contenido que `cotizar_lote`
+    """
+    try:
+
+        n_procesos = n_procesos or os.cpu_count() or 1
+        tabla_cuotas = df_cuotas if isinstance(df_cuotas, TablaCuotas) else TablaCuotas(df_cuotas)
+        indice_siniestralidad = df_emisiones if isinstance(df_emisiones, dict) else indexar_siniestralidad(df_emisiones)
+
+        if cache is not None:
+            return _cotizar_lote_con_cache(
+                lambda df_param, df_calc, ticket: cotizar_lote_paralelo(df_param, df_calc, indice_siniestralidad, tabla_cuotas,
+                                                                        ticket, n_procesos, contratantes_por_fragmento,
+                                                                        generar_memorias),
+                df_parametros, df_calculo, indice_siniestralidad, tabla_cuotas, ticket_inicial, generar_memorias, cache
+            )
+
+        if n_procesos <= 1:
+            # En el proceso actual, con la misma reserva contratante por contratante que los fragmentos del pool
+            return _cotizar_fragmento_con_tablas(df_parametros, df_calculo, indice_siniestralidad, tabla_cuotas,
+                                                 ticket_inicial, generar_memorias)
+
+        df_param = df_parametros[df_parametros["Contratante"].notna()]
+        df_param = df_param.drop_duplicates(subset="Contratante", keep="first").reset_index(drop=True)
+        n_contratantes = len(df_param)
+        if n_contratantes == 0:
+            return _cotizar_fragmento_con_tablas(df_param, df_calculo, indice_siniestralidad, tabla_cuotas,
+                                                 ticket_inicial, generar_memorias)
+
+        tamanio = contratantes_por_fragmento or max(1, -(-n_contratantes // (n_procesos*4)))
+        n_fragmentos = -(-n_contratantes // tamanio)
+
+        # Se ordenan los asegurados por fragmento una sola vez para repartirlos en rebanadas contiguas
+        codigos = _codigos_censo(df_calculo, df_param["Contratante"])
+        fragmento_asegurado = codigos[codigos >= 0] // tamanio
+        orden = np.argsort(fragmento_asegurado, kind="stable")
+        df_ordenado = _filtrar_censo(df_calculo, np.flatnonzero(codigos >= 0)[orden])
+        limites = np.searchsorted(fragmento_asegurado[orden], np.arange(n_fragmentos + 1))
+
+        fragmentos = [(df_param.iloc[k*tamanio:(k+1)*tamanio], _filtrar_censo(df_ordenado, np.arange(limites[k], limites[k+1])),
+                       ticket_inicial + k*tamanio) for k in range(n_fragmentos)]
+
+        resultados = []
+        with ProcessPoolExecutor(max_workers=n_procesos, initializer=_inicializar_proceso,
+                                 initargs=(indice_siniestralidad, tabla_cuotas)) as pool:
+            futuros = [pool.submit(_cotizar_fragmento, df_frag, df_calc, ticket, generar_memorias)
+                       for df_frag, df_calc, ticket in fragmentos]
+
+            for (df_frag, df_calc, ticket), futuro in zip(fragmentos, futuros):
+                try:
+                    resultados.append(futuro.result())
+                except Exception as e:
+                    print(f"Error en el proceso del fragmento con ticket inicial {ticket}, se cotizará en el proceso principal: {e}")
+                    resultados.append(_cotizar_fragmento_con_tablas(df_frag, df_calc, indice_siniestralidad, tabla_cuotas,
+                                                                    ticket, generar_memorias))
+
+        df_cotizaciones = pd.concat([df_cot for df_cot, _ in resultados], ignore_index=True)
+        df_memorias = pd.concat([df_mem for _, df_mem in resultados], ignore_index=True) if generar_memorias else None
+
+        return df_cotizaciones, df_memorias
+
+    except Exception as e:
+        print(f"Error al cotizar el lote de contratantes en paralelo: {e}")
+        return pd.DataFrame(), pd.DataFrame()
+
+
+def cotizaciones_a_dicts(df_cotizaciones: pd.DataFrame) -> dict:
+    """
+    *Función que convierte la tabla de cotizaciones al diccionario de cotización de cada contratante*
+
+    **Parameters**:
+
+        df_cotizaciones (DataFrame): Tabla de cotizaciones generada por `cotizar_lote`
+
+    **Returns**:
+
+        dict: Diccionario {contratante: diccionario de cotización} con el mismo formato que `creacion_cotizacion_dict`
+    """
+
+    return {cotizacion.contratante: cotizacion.a_dict() for cotizacion in cotizaciones_desde_tabla(df_cotizaciones)}
+
+
+def memorias_por_contratante(df_cotizaciones: pd.DataFrame, df_memorias: pd.DataFrame) -> dict:
+    """
+    *Función que separa la memoria de cálculo del lote en una memoria por contratante*
+
+    Cada memoria conserva sólo las columnas de las coberturas contratadas, como en `generar_memoria_calculo`.
+
+    **Parameters**:
+
+        df_cotizaciones (DataFrame): Tabla de cotizaciones generada por `cotizar_lote`
+
+        df_memorias (DataFrame): Memoria de cálculo del lote generada por `cotizar_lote`
+
+    **Returns**:
+
+        dict: Diccionario {contratante: DataFrame con su memoria de cálculo}, en el orden de `df_cotizaciones`
+    """
+
+    if df_cotizaciones.empty:
         return {}
-    
\ No newline at end of file
+    columnas_cuotas = [col for col in ["Fallecimiento", "MA", "BPAI"] if col in df_memorias.columns]
+    grupos = dict(list(df_memorias.groupby("Contratante", sort=False))) if len(df_memorias) else {}
+    memorias = {}
+
+    # Los contratantes sin asegurados reciben una memoria vacía
+    for contratante, cobertura in zip(df_cotizaciones["Contratante"], df_cotizaciones["Coberturas"]):
+        df_memoria = grupos.get(contratante, df_memorias.iloc[0:0])
+        excluidas = [col for col in columnas_cuotas if col not in COBERTURAS_COLUMNAS.get(cobertura, [])]
+        memorias[contratante] = df_memoria.drop(columns=excluidas).reset_index(drop=True)
+
+    return memorias
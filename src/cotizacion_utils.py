@@ -0,0 +1,178 @@
+"""
+Descripción
+===========
+Este modulo implementa el registro `Cotizacion`, que representa la cotización de un contratante
+con un atributo por campo en lugar del diccionario de listas de un elemento, y sus conversiones al
+JSON que se sube a S3, a una fila de la tabla de cotizaciones y de regreso.
+
+Funciones
+===========
+"""
+import json
+from dataclasses import dataclass, fields
+from typing import Any
+import pandas as pd
+
+
+# Columnas de la tabla de cotizaciones (y llaves del JSON), en el orden de los atributos de `Cotizacion`
+COLUMNAS_COTIZACION = [
+    "Contratante", "Coberturas", "SumaAsegurada", "Administracion", "Agente", "Comision",
+    "FormaPago", "Inicio", "Fin", "Renovacion", "Poliza", "Ticket", "Oficina", "RPF",
+    "NumRecibos", "Descuento", "Prima", "EdadPromedio", "SAMI", "Asegurados", "Mes", "Evento"
+]
+
+
+@dataclass(slots=True)
+class Cotizacion:
+    """
+    *Cotización de un contratante*
+
+    Cada atributo corresponde, en orden, a una columna de `COLUMNAS_COTIZACION`. `prima` es el
+    monto de la prima o el mensaje de siniestralidad desviada para renovaciones fuera de política.
+    """
+
+    contratante: str
+    coberturas: str
+    suma_asegurada: float
+    administracion: str
+    agente: str
+    comision: float
+    forma_pago: str
+    inicio: Any
+    fin: Any
+    renovacion: str
+    poliza: Any
+    ticket: int
+    oficina: str
+    rpf: float
+    num_recibos: int
+    descuento: float
+    prima: Any
+    edad_promedio: float
+    sami: float
+    asegurados: int
+    mes: str
+    evento: str
+
+    def a_fila(self) -> tuple:
+        """
+        *Regresa la cotización como fila de la tabla de cotizaciones*
+
+        **Returns**:
+
+            tuple: Valores en el orden de `COLUMNAS_COTIZACION`
+        """
+
+        return tuple(getattr(self, atributo) for atributo in _ATRIBUTOS)
+
+    def a_dict(self) -> dict:
+        """
+        *Regresa la cotización con el formato de `creacion_cotizacion_dict`*
+
+        **Returns**:
+
+            dict: Diccionario {columna: [valor]}
+        """
+
+        return {columna: [getattr(self, atributo)] for atributo, columna in zip(_ATRIBUTOS, COLUMNAS_COTIZACION)}
+
+    def a_json(self, indent: int = 2) -> str:
+        """
+        *Serializa la cotización al JSON que se sube a S3 (diccionario de listas)*
+
+        **Parameters**:
+
+            indent (int): Sangría del JSON
+
+        **Returns**:
+
+            str: JSON de la cotización
+        """
+
+        return json.dumps(self.a_dict(), indent=indent, ensure_ascii=False, default=str)
+
+    @classmethod
+    def desde_fila(cls, fila) -> "Cotizacion":
+        """
+        *Crea una cotización a partir de una fila de la tabla de cotizaciones*
+
+        **Parameters**:
+
+            fila (tuple): Valores en el orden de `COLUMNAS_COTIZACION`
+
+        **Returns**:
+
+            Cotizacion: Cotización de la fila
+        """
+
+        return cls(*fila)
+
+    @classmethod
+    def desde_dict(cls, diccionario: dict) -> "Cotizacion":
+        """
+        *Crea una cotización a partir de un diccionario de cotización*
+
+        **Parameters**:
+
+            diccionario (dict): Diccionario {columna: [valor]} o {columna: valor}. Las columnas que falten quedan en None
+
+        **Returns**:
+
+            Cotizacion: Cotización del diccionario
+        """
+
+        valores = [diccionario.get(columna) for columna in COLUMNAS_COTIZACION]
+        return cls(*[valor[0] if isinstance(valor, list) and valor else valor for valor in valores])
+
+    @classmethod
+    def desde_json(cls, texto: str) -> "Cotizacion":
+        """
+        *Crea una cotización a partir de su JSON*
+
+        **Parameters**:
+
+            texto (str): JSON generado con `a_json` (o por el pipeline)
+
+        **Returns**:
+
+            Cotizacion: Cotización del JSON
+        """
+
+        return cls.desde_dict(json.loads(texto))
+
+
+_ATRIBUTOS = [campo.name for campo in fields(Cotizacion)]
+
+
+def tabla_cotizaciones(cotizaciones) -> pd.DataFrame:
+    """
+    *Función que construye la tabla de cotizaciones a partir de una lista de cotizaciones en un solo paso*
+
+    **Parameters**:
+
+        cotizaciones (iterable): Cotizaciones (`Cotizacion`)
+
+    **Returns**:
+
+        DataFrame: Una fila por cotización con las columnas de `COLUMNAS_COTIZACION`
+    """
+
+    return pd.DataFrame.from_records([cotizacion.a_fila() for cotizacion in cotizaciones], columns=COLUMNAS_COTIZACION)
+
+
+def cotizaciones_desde_tabla(df_cotizaciones: pd.DataFrame) -> list:
+    """
+    *Función que convierte la tabla de cotizaciones en una lista de cotizaciones*
+
+    **Parameters**:
+
+        df_cotizaciones (DataFrame): Tabla de cotizaciones (p. ej. de `cotizar_lote`)
+
+    **Returns**:
+
+        list: Cotizaciones (`Cotizacion`) en el orden de la tabla
+    """
+
+    if df_cotizaciones.empty:
+        return []
+    return [Cotizacion(*fila) for fila in df_cotizaciones[COLUMNAS_COTIZACION].itertuples(index=False, name=None)]
@@ -0,0 +1,285 @@
+"""
+Descripción
+===========
+Este modulo implementa el histórico de cotizaciones en modo sólo-agregar. Cada ejecución escribe
+únicamente sus cotizaciones nuevas como un archivo Parquet dentro de la partición de su fecha:
+
+    {prefijo}fecha=YYYY-MM-DD/cotizaciones-{marca de tiempo}-{id}-n{registros}.parquet
+
+El costo de escritura de una ejecución es proporcional a sus cotizaciones y no al tamaño del
+histórico. El lector une las particiones (con filtro por rango de fechas), el número de registros se
+obtiene del listado sin descargar archivos y la compactación junta los archivos de cada partición
+cerrada en uno solo para que el número de objetos no crezca con el número de ejecuciones. El archivo
+compactado registra en sus metadatos Parquet los archivos que reemplaza, de modo que el lector y el
+conteo los omiten aunque la compactación no haya terminado de borrarlos.
+
+Funciones
+===========
+"""
+import re
+import json
+import uuid
+import struct
+import posixpath
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from io import BytesIO
+from datetime import datetime
+from src.almacenamiento_utils import obtener_almacenamiento
+from src.parquet_utils import leer_tabla, tipar_columnas
+
+
+# Partición y número de registros a partir de la ruta de un archivo del histórico
+PATRON_PARTICION = re.compile(r"fecha=(\d{4}-\d{2}-\d{2})/")
+PATRON_REGISTROS = re.compile(r"-n(\d+)\.parquet$")
+
+
+def _ruta_archivo(prefijo: str, fecha: str, n_registros: int, etiqueta: str = "cotizaciones") -> str:
+    marca = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    return f"{prefijo}fecha={fecha}/{etiqueta}-{marca}-{uuid.uuid4().hex[:8]}-n{n_registros}.parquet"
+
+
+def _metadatos_parquet(almacenamiento, ruta: str, tamanio: int):
+    """Metadatos (pie) de un archivo Parquet con lecturas por rango, sin descargar el archivo."""
+    longitud = min(tamanio, 64*1024)
+    cola = almacenamiento.leer_rango(ruta, tamanio - longitud, longitud)
+    longitud_pie = struct.unpack("<i", cola[-8:-4])[0]
+    if longitud_pie + 8 > len(cola):
+        cola = almacenamiento.leer_rango(ruta, tamanio - longitud_pie - 8, longitud_pie + 8)
+    return pq.read_metadata(BytesIO(b"PAR1" + cola[-(longitud_pie + 8):]))
+
+
+def _archivos_reemplazados(almacenamiento, archivos: list) -> set:
+    """Rutas que algún archivo compactado de `archivos` ya contiene (según sus metadatos)."""
+    reemplazados = set()
+    for archivo in archivos:
+        if not posixpath.basename(archivo["ruta"]).startswith("compactado-"):
+            continue
+        metadatos = _metadatos_parquet(almacenamiento, archivo["ruta"], archivo["tamanio"]).metadata or {}
+        carpeta = posixpath.dirname(archivo["ruta"])
+        reemplazados.update(posixpath.join(carpeta, nombre) for nombre in json.loads(metadatos.get(b"reemplaza", b"[]")))
+    return reemplazados
+
+
+def archivos_historico(prefijo: str, nombre_bucket, desde: str = None, hasta: str = None) -> list:
+    """
+    *Función que lista los archivos del histórico, en orden de partición y de escritura*
+
+    **Parameters**:
+
+        prefijo (str): Prefijo del histórico
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+        desde (str): Primera fecha (YYYY-MM-DD) que se incluye (None: sin límite)
+
+        hasta (str): Última fecha (YYYY-MM-DD) que se incluye (None: sin límite)
+
+    **Returns**:
+
+        list: Diccionarios {"ruta", "etag", "tamanio", "fecha"}
+    """
+
+    archivos = []
+    for objeto in obtener_almacenamiento(nombre_bucket).iterar(prefijo, ".parquet"):
+        particion = PATRON_PARTICION.search(objeto["ruta"][len(prefijo):])
+        if particion is None:
+            continue
+        fecha = particion.group(1)
+        if (desde is not None and fecha < desde) or (hasta is not None and fecha > hasta):
+            continue
+        archivos.append({**objeto, "fecha": fecha})
+    return archivos
+
+
+def agregar_historico(df_nuevas: pd.DataFrame, prefijo: str, nombre_bucket, fecha: str = None) -> str:
+    """
+    *Función que agrega las cotizaciones de una ejecución al histórico (un archivo nuevo en la partición de la fecha)*
+
+    **Parameters**:
+
+        df_nuevas (DataFrame): Cotizaciones nuevas
+
+        prefijo (str): Prefijo del histórico
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+        fecha (str): Fecha de la partición (YYYY-MM-DD; None: hoy)
+
+    **Returns**:
+
+        str: Ruta del archivo escrito, o None si no había cotizaciones
+    """
+
+    if df_nuevas.empty:
+        return None
+    fecha = fecha or datetime.now().strftime("%Y-%m-%d")
+    ruta = _ruta_archivo(prefijo, fecha, len(df_nuevas))
+    contenido = tipar_columnas(df_nuevas).to_parquet(index=False)
+    obtener_almacenamiento(nombre_bucket).escribir(ruta, contenido, 'application/vnd.apache.parquet')
+    return ruta
+
+
+def contar_historico(prefijo: str, nombre_bucket) -> int:
+    """
+    *Función que cuenta los registros del histórico a partir del listado (sin descargar los archivos)*
+
+    Los archivos que ya reemplazó una compactación no se cuentan.
+
+    **Parameters**:
+
+        prefijo (str): Prefijo del histórico
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+    **Returns**:
+
+        int: Número de registros
+    """
+
+    almacenamiento = obtener_almacenamiento(nombre_bucket)
+    archivos = archivos_historico(prefijo, almacenamiento)
+    reemplazados = _archivos_reemplazados(almacenamiento, archivos)
+    total = 0
+    for archivo in archivos:
+        if archivo["ruta"] in reemplazados:
+            continue
+        registros = PATRON_REGISTROS.search(archivo["ruta"])
+        if registros is not None:
+            total += int(registros.group(1))
+        else:
+            total += _metadatos_parquet(almacenamiento, archivo["ruta"], archivo["tamanio"]).num_rows
+    return total
+
+
+def leer_historico(prefijo: str, nombre_bucket, columnas: list = None, desde: str = None,
+                   hasta: str = None) -> pd.DataFrame:
+    """
+    *Función que lee el histórico uniendo sus particiones*
+
+    Se agrega la columna `fecha` de la partición. Si una compactación está en curso, un archivo puede
+    aparecer junto con su versión compactada; se omiten los archivos que el compactado registra como
+    reemplazados. Los tickets repetidos (p. ej. de dos ejecuciones simultáneas que numeraron a partir
+    del mismo histórico) se reportan pero no se descartan.
+
+    **Parameters**:
+
+        prefijo (str): Prefijo del histórico
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+        columnas (list): Columnas por leer (None: todas)
+
+        desde (str): Primera fecha (YYYY-MM-DD) que se lee (None: sin límite)
+
+        hasta (str): Última fecha (YYYY-MM-DD) que se lee (None: sin límite)
+
+    **Returns**:
+
+        DataFrame: Cotizaciones del histórico en orden de escritura
+    """
+
+    try:
+        almacenamiento = obtener_almacenamiento(nombre_bucket)
+        archivos = archivos_historico(prefijo, almacenamiento, desde, hasta)
+        reemplazados = _archivos_reemplazados(almacenamiento, archivos)
+        partes = []
+        for archivo in archivos:
+            if archivo["ruta"] in reemplazados:
+                continue
+            df = leer_tabla(almacenamiento.leer(archivo["ruta"]), archivo["ruta"], columnas)
+            partes.append(df.assign(fecha=archivo["fecha"]))
+        if not partes:
+            return pd.DataFrame(columns=[*(columnas or []), "fecha"])
+        df_historico = pd.concat(partes, ignore_index=True)
+        if "Ticket" in df_historico.columns:
+            repetidos = df_historico.loc[df_historico["Ticket"].duplicated(), "Ticket"].unique()
+            if len(repetidos):
+                print(f"Advertencia: {len(repetidos)} tickets aparecen más de una vez en el histórico: "
+                      f"{repetidos[:10].tolist()}")
+        return df_historico
+
+    except Exception as e:
+        print(f"Error al leer el histórico de cotizaciones: {e}")
+        return pd.DataFrame()
+
+
+def compactar_historico(prefijo: str, nombre_bucket, hasta: str = None) -> dict:
+    """
+    *Función que junta en un solo archivo los archivos de cada partición cerrada del histórico*
+
+    Primero se escribe el archivo compactado, con la lista de los archivos que reemplaza en sus
+    metadatos, y después se borran los originales, por lo que una falla a la mitad no pierde registros
+    y `leer_historico` y `contar_historico` no los cuentan dos veces.
+
+    **Parameters**:
+
+        prefijo (str): Prefijo del histórico
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+        hasta (str): Última fecha (YYYY-MM-DD) que se compacta (None: hasta ayer; la partición de hoy sigue
+        recibiendo archivos)
+
+    **Returns**:
+
+        dict: Diccionario {fecha: archivos compactados} de las particiones compactadas
+    """
+
+    almacenamiento = obtener_almacenamiento(nombre_bucket)
+    if hasta is None:
+        hasta = (pd.Timestamp.now().normalize() - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+
+    # Los restos de una compactación interrumpida ya están en su compactado: sólo falta borrarlos
+    archivos = archivos_historico(prefijo, almacenamiento, hasta=hasta)
+    reemplazados = _archivos_reemplazados(almacenamiento, archivos)
+    for ruta in sorted(reemplazados.intersection(archivo["ruta"] for archivo in archivos)):
+        almacenamiento.borrar(ruta)
+
+    particiones = {}
+    for archivo in archivos:
+        if archivo["ruta"] not in reemplazados:
+            particiones.setdefault(archivo["fecha"], []).append(archivo["ruta"])
+
+    compactadas = {}
+    for fecha, rutas in particiones.items():
+        if len(rutas) < 2:
+            continue
+        try:
+            df = pd.concat([leer_tabla(almacenamiento.leer(ruta), ruta) for ruta in rutas], ignore_index=True)
+            destino = _ruta_archivo(prefijo, fecha, len(df), etiqueta="compactado")
+            tabla = pa.Table.from_pandas(tipar_columnas(df), preserve_index=False)
+            reemplaza = json.dumps([posixpath.basename(ruta) for ruta in rutas])
+            tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), b"reemplaza": reemplaza.encode('utf-8')})
+            buffer = BytesIO()
+            pq.write_table(tabla, buffer)
+            almacenamiento.escribir(destino, buffer.getvalue(), 'application/vnd.apache.parquet')
+            for ruta in rutas:
+                almacenamiento.borrar(ruta)
+            compactadas[fecha] = len(rutas)
+        except Exception as e:
+            print(f"Error al compactar la partición fecha={fecha}: {e}")
+    return compactadas
+
+
+def exportar_historico_csv(df_historico: pd.DataFrame, ruta: str, nombre_bucket) -> None:
+    """
+    *Función que escribe el histórico completo como un solo CSV (para consumidores que esperan ese formato)*
+
+    **Parameters**:
+
+        df_historico (DataFrame): Histórico completo
+
+        ruta (str): Ruta del CSV
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+    **Returns**:
+
+        None
+    """
+
+    buffer = BytesIO()
+    df_historico.to_csv(buffer, index=False)
+    obtener_almacenamiento(nombre_bucket).escribir(ruta, buffer.getvalue(), 'text/csv')
@@ -0,0 +1,292 @@
+"""
+Descripción
+===========
+Este modulo implementa funciones utilizadas para las ejecuciones incrementales del pipeline de
+cotización: un manifiesto guarda, por contratante, las bases de asegurados (con su ETag), la huella
+de sus parámetros, la versión de la tabla de cuotas y la siniestralidad (renovaciones) con que se
+cotizó, de modo que sólo se vuelven a cotizar y subir los contratantes cuyas entradas cambiaron.
+
+Funciones
+===========
+"""
+import json
+import hashlib
+import pandas as pd
+from src.almacenamiento_utils import obtener_almacenamiento
+
+
+def manifiesto_vacio() -> dict:
+    """
+    *Función que crea un manifiesto sin archivos ni contratantes registrados*
+
+    **Returns**:
+
+        dict: Manifiesto con las llaves `archivos` y `contratantes` vacías
+    """
+
+    return {"archivos": {}, "contratantes": {}}
+
+
+def cargar_manifiesto(ruta_manifiesto:str, nombre_bucket:str) -> dict:
+    """
+    *Función que carga el manifiesto de la última ejecución desde S3*
+
+    **Parameters**:
+
+        ruta_manifiesto (str): Ruta (Key) del manifiesto JSON en S3
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 (o el almacenamiento)
+
+    **Returns**:
+
+        dict: Manifiesto guardado. Si no existe o no se puede leer se regresa un manifiesto vacío,
+        con lo que la ejecución cotiza a todos los contratantes
+    """
+
+    try:
+        manifiesto = json.loads(obtener_almacenamiento(nombre_bucket).leer(ruta_manifiesto).decode('utf-8'))
+        manifiesto.setdefault("archivos", {})
+        manifiesto.setdefault("contratantes", {})
+        return manifiesto
+
+    except Exception as e:
+        print(f"No se pudo cargar el manifiesto, se cotizarán todos los contratantes: {e}")
+        return manifiesto_vacio()
+
+
+def guardar_manifiesto(manifiesto:dict, ruta_manifiesto:str, nombre_bucket:str) -> None:
+    """
+    *Función que sube el manifiesto de la ejecución a S3*
+
+    **Parameters**:
+
+        manifiesto (dict): Manifiesto actualizado
+
+        ruta_manifiesto (str): Ruta (Key) del manifiesto JSON en S3
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 (o el almacenamiento)
+
+    **Returns**:
+
+        None
+    """
+
+    obtener_almacenamiento(nombre_bucket).escribir(
+        ruta_manifiesto,
+        json.dumps(manifiesto, indent=2, ensure_ascii=False).encode('utf-8'),
+        'application/json'
+    )
+
+
+def huella_registro(registro:dict) -> str:
+    """
+    *Función que calcula la huella SHA-256 de un registro de parámetros*
+
+    **Parameters**:
+
+        registro (dict): Registro {columna: valor} de un contratante (ver `indexar_parametros`)
+
+    **Returns**:
+
+        str: Huella hexadecimal; cambia si cambia cualquier valor del registro
+    """
+
+    contenido = json.dumps(registro, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def siniestralidades_contratantes(registros:dict, indice_siniestralidad:dict) -> dict:
+    """
+    *Función que obtiene la siniestralidad con que se cotiza cada contratante*
+
+    Sólo las renovaciones dependen de la siniestralidad de su póliza en emisiones (la misma que entra
+    en la llave del caché de cotizaciones); para el resto el valor es None.
+
+    **Parameters**:
+
+        registros (dict): Índice {contratante: registro} de los parámetros (ver `indexar_parametros`)
+
+        indice_siniestralidad (dict): Índice {poliza: siniestralidad} (ver `indexar_siniestralidad`)
+
+    **Returns**:
+
+        dict: Diccionario {contratante: siniestralidad como texto, o None si no es renovación o no
+        tiene emisión}
+    """
+
+    siniestralidades = {}
+    for contratante, registro in registros.items():
+        siniestralidad = indice_siniestralidad.get(registro["Poliza"]) if registro["Renovacion"] == "Si" else None
+        siniestralidades[contratante] = None if siniestralidad is None else str(float(siniestralidad))
+    return siniestralidades
+
+
+def archivos_modificados(manifiesto:dict, etags_bases:dict) -> list:
+    """
+    *Función que obtiene las bases de asegurados nuevas o con un ETag distinto al del manifiesto*
+
+    **Parameters**:
+
+        manifiesto (dict): Manifiesto de la última ejecución
+
+        etags_bases (dict): Diccionario {ruta: ETag} de las bases actuales en S3
+
+    **Returns**:
+
+        list: Rutas de las bases que se deben volver a descargar
+    """
+
+    return [ruta for ruta, etag in etags_bases.items()
+            if manifiesto["archivos"].get(ruta, {}).get("etag") != etag]
+
+
+def contratantes_por_archivo(dfs_calculos:dict) -> dict:
+    """
+    *Función que obtiene los contratantes presentes en cada base de asegurados descargada*
+
+    **Parameters**:
+
+        dfs_calculos (dict): Diccionario {ruta: DataFrame} con las bases de asegurados
+
+    **Returns**:
+
+        dict: Diccionario {ruta: [contratantes]}
+    """
+
+    return {ruta: sorted(df["Contratante"].dropna().astype(str).unique().tolist())
+            for ruta, df in dfs_calculos.items()}
+
+
+def contratantes_pendientes(manifiesto:dict, etags_bases:dict, huellas_parametros:dict,
+                            version_cuotas:str, archivos_contratantes:dict, siniestralidades:dict = None) -> set:
+    """
+    *Función que determina los contratantes que se deben volver a cotizar*
+
+    Un contratante está pendiente si no tiene registro en el manifiesto, si cambió la huella de sus
+    parámetros, la versión de la tabla de cuotas o su siniestralidad, si alguna de sus bases cambió o
+    desapareció, o si aparece en alguna de las bases que se acaban de descargar.
+
+    **Parameters**:
+
+        manifiesto (dict): Manifiesto de la última ejecución
+
+        etags_bases (dict): Diccionario {ruta: ETag} de las bases actuales en S3
+
+        huellas_parametros (dict): Diccionario {contratante: huella} de los parámetros actuales
+
+        version_cuotas (str): Versión de la tabla de cuotas (`TablaCuotas.version`)
+
+        archivos_contratantes (dict): Contratantes de las bases descargadas (ver `contratantes_por_archivo`)
+
+        siniestralidades (dict): Siniestralidad actual de cada contratante (ver `siniestralidades_contratantes`;
+        None: no se compara)
+
+    **Returns**:
+
+        set: Contratantes por cotizar
+    """
+
+    en_bases_descargadas = {c for contratantes in archivos_contratantes.values() for c in contratantes}
+    pendientes = set()
+
+    for contratante, huella in huellas_parametros.items():
+        previo = manifiesto["contratantes"].get(str(contratante))
+
+        if (previo is None
+                or str(contratante) in en_bases_descargadas
+                or previo.get("huella_parametros") != huella
+                or previo.get("version_cuotas") != version_cuotas
+                or (siniestralidades is not None and previo.get("siniestralidad") != siniestralidades.get(contratante))
+                or any(manifiesto["archivos"].get(ruta, {}).get("etag") != etags_bases.get(ruta)
+                       for ruta in previo.get("archivos", []))):
+            pendientes.add(contratante)
+
+    return pendientes
+
+
+def archivos_de_contratantes(manifiesto:dict, contratantes:set, etags_bases:dict) -> set:
+    """
+    *Función que obtiene las bases de asegurados registradas para un conjunto de contratantes*
+
+    **Parameters**:
+
+        manifiesto (dict): Manifiesto de la última ejecución
+
+        contratantes (set): Contratantes a buscar
+
+        etags_bases (dict): Diccionario {ruta: ETag} de las bases actuales en S3
+
+    **Returns**:
+
+        set: Rutas de las bases registradas (y que todavía existen en S3) donde aparecen los contratantes
+    """
+
+    claves = {str(contratante) for contratante in contratantes}
+    return {ruta for ruta, registro in manifiesto["archivos"].items()
+            if ruta in etags_bases and claves.intersection(registro["contratantes"])}
+
+
+def actualizar_manifiesto(manifiesto:dict, etags_bases:dict, archivos_contratantes:dict,
+                          df_cotizaciones:pd.DataFrame, pendientes:set, contratantes_cotizados:set,
+                          huellas_parametros:dict, version_cuotas:str, siniestralidades:dict = None) -> dict:
+    """
+    *Función que construye el manifiesto de la ejecución actual*
+
+    Los contratantes que no estaban pendientes conservan su registro anterior; los pendientes que
+    fallaron se quitan del manifiesto para que se vuelvan a cotizar en la siguiente ejecución.
+
+    **Parameters**:
+
+        manifiesto (dict): Manifiesto de la última ejecución
+
+        etags_bases (dict): Diccionario {ruta: ETag} de las bases actuales en S3
+
+        archivos_contratantes (dict): Contratantes de las bases descargadas (ver `contratantes_por_archivo`)
+
+        df_cotizaciones (DataFrame): Cotizaciones de la ejecución (ver `cotizar_lote`)
+
+        pendientes (set): Contratantes que se intentaron cotizar en la ejecución
+
+        contratantes_cotizados (set): Contratantes cuya cotización se subió correctamente
+
+        huellas_parametros (dict): Diccionario {contratante: huella} de los parámetros actuales
+
+        version_cuotas (str): Versión de la tabla de cuotas (`TablaCuotas.version`)
+
+        siniestralidades (dict): Siniestralidad con que se cotizó cada contratante (ver `siniestralidades_contratantes`)
+
+    **Returns**:
+
+        dict: Manifiesto actualizado
+    """
+
+    # Bases vigentes: las descargadas con su ETag nuevo, el resto con el registro anterior
+    archivos = {}
+    for ruta, etag in etags_bases.items():
+        if ruta in archivos_contratantes:
+            archivos[ruta] = {"etag": etag, "contratantes": archivos_contratantes[ruta]}
+        elif ruta in manifiesto["archivos"]:
+            archivos[ruta] = manifiesto["archivos"][ruta]
+
+    rutas_por_contratante = {}
+    for ruta, registro in archivos.items():
+        for contratante in registro["contratantes"]:
+            rutas_por_contratante.setdefault(contratante, []).append(ruta)
+
+    tickets = dict(zip(df_cotizaciones["Contratante"].astype(str), df_cotizaciones["Ticket"])) if len(df_cotizaciones) else {}
+
+    contratantes = {}
+    for contratante, huella in huellas_parametros.items():
+        clave = str(contratante)
+        if contratante in contratantes_cotizados:
+            contratantes[clave] = {
+                "archivos": sorted(rutas_por_contratante.get(clave, [])),
+                "huella_parametros": huella,
+                "version_cuotas": version_cuotas,
+                "siniestralidad": (siniestralidades or {}).get(contratante),
+                "ticket": int(tickets[clave]) if clave in tickets else None
+            }
+        elif contratante not in pendientes and clave in manifiesto["contratantes"]:
+            contratantes[clave] = manifiesto["contratantes"][clave]
+
+    return {"archivos": archivos, "contratantes": contratantes}
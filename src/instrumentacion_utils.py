@@ -0,0 +1,212 @@
+"""
+Descripción
+===========
+Este modulo implementa la instrumentación del pipeline de cotización: tiempos por etapa (listado,
+descarga, lectura, edades, cuotas, agregación, subidas e histórico) y contadores globales y por
+contratante (asegurados, bytes leídos y bytes escritos), con un reporte JSON de la ejecución.
+
+La instrumentación se activa con `Instrumentacion(...).activar()`. Mientras no haya una activa,
+`etapa`, `subetapa` y `contar` no hacen nada. Las subetapas del motor de cálculo y los contadores por
+contratante sólo se registran en modo detallado. Las etapas que corren dentro de los procesos de
+`cotizar_lote_paralelo` no se reportan.
+
+Funciones
+===========
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from src.almacenamiento_utils import obtener_almacenamiento
+
+
+# Instrumentación activa del proceso (None: desactivada)
+_ACTIVA = None
+_NULA = nullcontext()
+
+
+class Instrumentacion:
+    """
+    *Acumula los tiempos por etapa y los contadores de una ejecución*
+
+    **Parameters**:
+
+        detallada (bool): Si es True también se registran las subetapas del motor de cálculo (edades,
+        cuotas y agregación) y los contadores por contratante
+    """
+
+    def __init__(self, detallada: bool = False):
+        self.detallada = detallada
+        self.inicio = datetime.now()
+        self._inicio_reloj = time.perf_counter()
+        self.etapas = {}
+        self.contadores = {}
+        self.contratantes = {}
+        self._candado = threading.Lock()
+
+    def activar(self) -> "Instrumentacion":
+        """Hace de esta instrumentación la activa del proceso y la regresa."""
+        global _ACTIVA
+        _ACTIVA = self
+        return self
+
+    def desactivar(self) -> None:
+        """Desactiva la instrumentación del proceso."""
+        global _ACTIVA
+        if _ACTIVA is self:
+            _ACTIVA = None
+
+    @contextmanager
+    def medir(self, nombre: str):
+        """Mide el tiempo de un bloque y lo acumula en la etapa `nombre`."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._candado:
+                registro = self.etapas.setdefault(nombre, {"segundos": 0.0, "llamadas": 0})
+                registro["segundos"] += duracion
+                registro["llamadas"] += 1
+
+    def sumar(self, nombre: str, valor=1, contratante=None) -> None:
+        """Suma `valor` al contador global `nombre` y, en modo detallado, al del contratante."""
+        with self._candado:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + valor
+            if contratante is not None and self.detallada:
+                contadores = self.contratantes.setdefault(str(contratante), {})
+                contadores[nombre] = contadores.get(nombre, 0) + valor
+
+    def reporte(self) -> dict:
+        """
+        *Regresa el reporte de la ejecución*
+
+        **Returns**:
+
+            dict: Inicio, duración, etapas {nombre: {segundos, llamadas}}, contadores globales y,
+            en modo detallado, contadores por contratante
+        """
+
+        with self._candado:
+            return {
+                "inicio": self.inicio.isoformat(timespec="seconds"),
+                "duracion_segundos": round(time.perf_counter() - self._inicio_reloj, 4),
+                "detallada": self.detallada,
+                "etapas": {nombre: {"segundos": round(registro["segundos"], 4), "llamadas": registro["llamadas"]}
+                           for nombre, registro in self.etapas.items()},
+                "contadores": dict(self.contadores),
+                "contratantes": {contratante: dict(contadores) for contratante, contadores in self.contratantes.items()}
+            }
+
+    def guardar_reporte(self, directorio: str, nombre_bucket: str = None, ruta_s3: str = None) -> str:
+        """
+        *Guarda el reporte JSON en disco y, opcionalmente, en S3*
+
+        **Parameters**:
+
+            directorio (str): Directorio local del reporte
+
+            nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o almacenamiento (None: no se sube)
+
+            ruta_s3 (str): Prefijo en S3 donde se sube el reporte
+
+        **Returns**:
+
+            str: Ruta local del reporte
+        """
+
+        nombre = f"reporte_ejecucion_{self.inicio.strftime('%Y%m%d_%H%M%S')}.json"
+        contenido = json.dumps(self.reporte(), indent=2, ensure_ascii=False, default=str)
+
+        os.makedirs(directorio, exist_ok=True)
+        ruta_local = os.path.join(directorio, nombre)
+        with open(ruta_local, "w", encoding="utf-8") as f:
+            f.write(contenido)
+
+        if nombre_bucket and ruta_s3 is not None:
+            try:
+                obtener_almacenamiento(nombre_bucket).escribir(f"{ruta_s3}{nombre}", contenido.encode('utf-8'),
+                                                               'application/json')
+            except Exception as e:
+                print(f"Error al subir el reporte de ejecución: {e}")
+
+        return ruta_local
+
+    def resumen(self) -> str:
+        """Regresa un resumen legible de los tiempos por etapa."""
+        lineas = [f"  {nombre:<18} {registro['segundos']:>10.3f} s  ({registro['llamadas']} llamadas)"
+                  for nombre, registro in sorted(self.etapas.items(), key=lambda item: -item[1]["segundos"])]
+        return "\n".join(lineas)
+
+
+def instrumentacion_activa():
+    """Regresa la instrumentación activa del proceso (None si está desactivada)."""
+    return _ACTIVA
+
+
+def etapa(nombre: str):
+    """
+    *Context manager que mide una etapa en la instrumentación activa (no hace nada si no hay una)*
+
+    **Parameters**:
+
+        nombre (str): Nombre de la etapa
+    """
+
+    return _ACTIVA.medir(nombre) if _ACTIVA is not None else _NULA
+
+
+def subetapa(nombre: str):
+    """
+    *Como `etapa`, pero sólo mide si la instrumentación activa es detallada (uso dentro del motor de cálculo)*
+
+    **Parameters**:
+
+        nombre (str): Nombre de la subetapa
+    """
+
+    return _ACTIVA.medir(nombre) if _ACTIVA is not None and _ACTIVA.detallada else _NULA
+
+
+def contar(nombre: str, valor=1, contratante=None) -> None:
+    """
+    *Suma `valor` al contador `nombre` de la instrumentación activa (no hace nada si no hay una)*
+
+    **Parameters**:
+
+        nombre (str): Nombre del contador (p. ej. asegurados, bytes_leidos, bytes_escritos)
+
+        valor (int | float): Cantidad a sumar
+
+        contratante (str): Contratante al que se atribuye (sólo se registra en modo detallado)
+    """
+
+    if _ACTIVA is not None:
+        _ACTIVA.sumar(nombre, valor, contratante)
+
+
+def medir_iterador(iterable, nombre: str):
+    """
+    *Generador que mide en la etapa `nombre` el tiempo de producir cada elemento de `iterable` (p. ej. la
+    lectura por bloques), sin incluir el tiempo que el consumidor tarda en procesarlo*
+
+    **Parameters**:
+
+        iterable (iterable): Elementos a medir
+
+        nombre (str): Nombre de la etapa
+
+    **Returns**:
+
+        generator: Los elementos de `iterable`
+    """
+
+    iterador = iter(iterable)
+    while True:
+        with etapa(nombre):
+            elemento = next(iterador, _NULA)
+        if elemento is _NULA:
+            return
+        yield elemento
@@ -0,0 +1,225 @@
+"""
+Descripción
+===========
+Este modulo implementa el almacén consolidado de cotizaciones. Cada ejecución escribe sus cotizaciones
+en un solo archivo JSONL (una cotización por línea, con el mismo diccionario que el JSON por
+contratante) y un índice con el ticket y la posición en bytes de cada contratante:
+
+    {prefijo}lote-{marca}.jsonl           cotizaciones de la ejecución
+    {prefijo}indice-{marca}.json          {contratante: {"lote", "ticket", "inicio", "longitud"}}
+    {prefijo}ultimo.json                  apuntador al índice vigente
+
+El índice acumula la última cotización de cada contratante de todas las ejecuciones (una ejecución
+incremental sólo reemplaza las entradas que cotizó). Los lectores cargan un lote completo con una
+sola lectura o una cotización con una lectura por rango. El apuntador se actualiza con escritura
+condicional, por lo que dos ejecuciones simultáneas no se pierden entradas.
+
+Funciones
+===========
+"""
+import json
+import time
+import random
+from datetime import datetime
+from src.almacenamiento_utils import obtener_almacenamiento
+
+
+class LoteCotizaciones:
+    """
+    *Lote de cotizaciones de una ejecución, serializado como JSONL conforme se agregan*
+
+    **Parameters**:
+
+        cotizaciones (iterable): Cotizaciones (`Cotizacion`) iniciales
+    """
+
+    def __init__(self, cotizaciones=()):
+        self._lineas = []
+        self._n_bytes = 0
+        self.indice = {}
+        for cotizacion in cotizaciones:
+            self.agregar(cotizacion)
+
+    def __len__(self) -> int:
+        return len(self.indice)
+
+    def agregar(self, cotizacion) -> None:
+        """
+        *Agrega una cotización al lote (si el contratante ya estaba, la nueva línea la reemplaza en el índice)*
+
+        **Parameters**:
+
+            cotizacion (Cotizacion): Cotización del contratante
+
+        **Returns**:
+
+            None
+        """
+
+        linea = (cotizacion.a_json(indent=None) + "\n").encode('utf-8')
+        self.indice[str(cotizacion.contratante)] = {
+            "ticket": int(cotizacion.ticket), "inicio": self._n_bytes, "longitud": len(linea)
+        }
+        self._lineas.append(linea)
+        self._n_bytes += len(linea)
+
+    def contenido(self) -> bytes:
+        """Contenido JSONL del lote."""
+        return b"".join(self._lineas)
+
+
+def cargar_indice(prefijo: str, nombre_bucket) -> dict:
+    """
+    *Función que carga el índice vigente del almacén de cotizaciones*
+
+    **Parameters**:
+
+        prefijo (str): Prefijo del almacén
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+    **Returns**:
+
+        dict: Diccionario {contratante: {"lote", "ticket", "inicio", "longitud"}} (vacío si no hay índice)
+    """
+
+    indice, _ = _cargar_indice(prefijo, obtener_almacenamiento(nombre_bucket))
+    return indice
+
+
+def _cargar_indice(prefijo: str, almacenamiento) -> tuple:
+    """Regresa (índice vigente, ETag del apuntador); ({}, None) si el almacén está vacío."""
+    try:
+        contenido, etag = almacenamiento.leer_si_cambio(f"{prefijo}ultimo.json")
+    except FileNotFoundError:
+        return {}, None
+    apuntador = json.loads(contenido.decode('utf-8'))
+    return json.loads(almacenamiento.leer(apuntador["indice"]).decode('utf-8')), etag
+
+
+def guardar_lote(lote: LoteCotizaciones, prefijo: str, nombre_bucket, reintentos: int = 10) -> str:
+    """
+    *Función que escribe el lote de una ejecución y actualiza el índice del almacén*
+
+    El lote se escribe una vez. El índice nuevo (el vigente más las entradas del lote) se publica
+    reemplazando el apuntador con una escritura condicional; si otra ejecución lo movió, se vuelve a
+    combinar con su índice.
+
+    **Parameters**:
+
+        lote (LoteCotizaciones): Cotizaciones de la ejecución
+
+        prefijo (str): Prefijo del almacén
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+        reintentos (int): Intentos de publicar el índice
+
+    **Returns**:
+
+        str: Ruta del lote escrito
+    """
+
+    almacenamiento = obtener_almacenamiento(nombre_bucket)
+    marca = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    ruta_lote = f"{prefijo}lote-{marca}.jsonl"
+    almacenamiento.escribir(ruta_lote, lote.contenido(), 'application/x-ndjson')
+
+    entradas = {contratante: {"lote": ruta_lote, **entrada} for contratante, entrada in lote.indice.items()}
+    for intento in range(reintentos):
+        indice, etag = _cargar_indice(prefijo, almacenamiento)
+        indice.update(entradas)
+        ruta_indice = f"{prefijo}indice-{marca}-{intento}.json"
+        almacenamiento.escribir(ruta_indice, json.dumps(indice, ensure_ascii=False).encode('utf-8'),
+                                'application/json')
+
+        apuntador = json.dumps({"indice": ruta_indice, "lote": ruta_lote, "actualizado": datetime.now().isoformat()})
+        if almacenamiento.escribir_condicional(f"{prefijo}ultimo.json", apuntador.encode('utf-8'), etag,
+                                               'application/json') is not None:
+            return ruta_lote
+
+        almacenamiento.borrar(ruta_indice)
+        time.sleep(0.05*2**min(intento, 6)*random.uniform(0.5, 1.0))
+
+    raise RuntimeError(f"No se pudo publicar el índice de cotizaciones en {prefijo}")
+
+
+def _leer_lineas(contenido: bytes) -> dict:
+    cotizaciones = {}
+    for linea in contenido.splitlines():
+        if linea.strip():
+            cotizacion = json.loads(linea.decode('utf-8'))
+            cotizaciones[str(cotizacion["Contratante"][0])] = cotizacion
+    return cotizaciones
+
+
+def leer_lote(ruta_lote: str, nombre_bucket) -> dict:
+    """
+    *Función que lee un lote completo con una sola lectura*
+
+    **Parameters**:
+
+        ruta_lote (str): Ruta del lote (.jsonl)
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+    **Returns**:
+
+        dict: Diccionario {contratante: diccionario de cotización}
+    """
+
+    return _leer_lineas(obtener_almacenamiento(nombre_bucket).leer(ruta_lote))
+
+
+def leer_cotizaciones(indice: dict, nombre_bucket) -> dict:
+    """
+    *Función que lee las cotizaciones vigentes del índice, con una lectura por lote*
+
+    **Parameters**:
+
+        indice (dict): Índice del almacén (ver `cargar_indice`)
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+    **Returns**:
+
+        dict: Diccionario {contratante: diccionario de cotización}, en el orden del índice
+    """
+
+    almacenamiento = obtener_almacenamiento(nombre_bucket)
+    lotes = {}
+    for entrada in indice.values():
+        lotes.setdefault(entrada["lote"], None)
+    for ruta_lote in lotes:
+        lotes[ruta_lote] = leer_lote(ruta_lote, almacenamiento)
+
+    # De cada lote sólo se toman los contratantes cuya entrada vigente apunta a él
+    return {contratante: lotes[entrada["lote"]][contratante] for contratante, entrada in indice.items()}
+
+
+def leer_cotizacion(indice: dict, nombre_bucket, contratante: str = None, ticket: int = None) -> dict:
+    """
+    *Función que lee una cotización con una lectura por rango de su lote*
+
+    **Parameters**:
+
+        indice (dict): Índice del almacén (ver `cargar_indice`)
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+        contratante (str): Contratante de la cotización
+
+        ticket (int): Ticket de la cotización (si no se indica el contratante)
+
+    **Returns**:
+
+        dict: Diccionario de cotización, o None si no está en el índice
+    """
+
+    if contratante is None:
+        contratante = next((nombre for nombre, entrada in indice.items() if entrada["ticket"] == ticket), None)
+    entrada = indice.get(contratante)
+    if entrada is None:
+        return None
+    contenido = obtener_almacenamiento(nombre_bucket).leer_rango(entrada["lote"], entrada["inicio"], entrada["longitud"])
+    return json.loads(contenido.decode('utf-8'))
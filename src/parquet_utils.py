@@ -0,0 +1,185 @@
+"""
+Descripción
+===========
+Este modulo implementa la capa de conversión a Parquet de las bases de entrada. Cada archivo .xlsx
+(o .csv) se convierte una sola vez a Parquet con tipos por columna y se guarda en el almacenamiento
+bajo un prefijo propio, con una ruta que incluye el ETag del archivo original: mientras el original no
+cambie, las ejecuciones leen la copia Parquet (con proyección de columnas) en lugar de volver a
+interpretar el Excel.
+
+Funciones
+===========
+"""
+import pandas as pd
+import pyarrow.parquet as pq
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from src.almacenamiento_utils import obtener_almacenamiento
+
+
+def ruta_parquet(ruta: str, etag: str, prefijo: str) -> str:
+    """
+    *Función que regresa la ruta de la copia Parquet de un archivo*
+
+    **Parameters**:
+
+        ruta (str): Ruta del archivo original
+
+        etag (str): ETag del archivo original
+
+        prefijo (str): Prefijo de las copias Parquet
+
+    **Returns**:
+
+        str: Ruta {prefijo}{ruta}.{etag}.parquet
+    """
+
+    etag = etag.strip('"')
+    return f"{prefijo}{ruta}.{etag}.parquet"
+
+
+def leer_tabla(contenido: bytes, ruta: str, columnas: list = None) -> pd.DataFrame:
+    """
+    *Función que interpreta el contenido de una tabla según la extensión de su ruta (.parquet, .csv o Excel)*
+
+    **Parameters**:
+
+        contenido (bytes): Contenido del archivo
+
+        ruta (str): Ruta del archivo
+
+        columnas (list): Columnas por leer (None: todas). Las que no existan se ignoran
+
+    **Returns**:
+
+        DataFrame: Tabla leída
+    """
+
+    if ruta.endswith(".parquet"):
+        if columnas is None:
+            return pd.read_parquet(BytesIO(contenido))
+        disponibles = set(pq.read_schema(BytesIO(contenido)).names)
+        return pd.read_parquet(BytesIO(contenido), columns=[col for col in columnas if col in disponibles])
+
+    if ruta.endswith(".csv"):
+        df = pd.read_csv(BytesIO(contenido))
+    else:
+        df = pd.read_excel(BytesIO(contenido), engine='openpyxl')
+    return df if columnas is None else df[[col for col in columnas if col in df.columns]]
+
+
+def tipar_columnas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    *Función que prepara una tabla para guardarse en Parquet*
+
+    Las columnas numéricas y de fecha conservan su tipo. Las columnas de texto que mezclan tipos (p. ej.
+    pólizas numéricas y alfanuméricas) se convierten a texto, conservando los nulos.
+
+    **Parameters**:
+
+        df (DataFrame): Tabla leída del archivo original
+
+    **Returns**:
+
+        DataFrame: Tabla con un tipo por columna
+    """
+
+    df = df.copy()
+    df.columns = [str(col) for col in df.columns]
+    for col in df.columns[df.dtypes == object]:
+        valores = df[col].dropna()
+        if len({type(valor) for valor in valores}) > 1:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def convertir_a_parquet(ruta: str, nombre_bucket, prefijo: str, etag: str = None) -> str:
+    """
+    *Función que convierte un archivo a Parquet si su copia para el ETag actual no existe*
+
+    Al crear la copia se borran las copias de versiones anteriores del mismo archivo.
+
+    **Parameters**:
+
+        ruta (str): Ruta del archivo original (.xlsx o .csv)
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+        prefijo (str): Prefijo de las copias Parquet
+
+        etag (str): ETag del archivo original (None: se consulta)
+
+    **Returns**:
+
+        str: Ruta de la copia Parquet, o la ruta original si no se pudo convertir
+    """
+
+    almacenamiento = obtener_almacenamiento(nombre_bucket)
+    try:
+        if etag is None:
+            info = almacenamiento.info(ruta)
+            if info is None:
+                return ruta
+            etag = info["etag"]
+
+        destino = ruta_parquet(ruta, etag, prefijo)
+        if almacenamiento.info(destino) is not None:
+            return destino
+
+        df = tipar_columnas(leer_tabla(almacenamiento.leer(ruta), ruta))
+        almacenamiento.escribir(destino, df.to_parquet(index=False), 'application/vnd.apache.parquet')
+
+        # Sólo las copias de este archivo ({prefijo}{ruta}.{etag}.parquet): el prefijo también lista las de
+        # archivos hermanos cuyo nombre empieza igual (p. ej. base.xlsx.respaldo.xlsx)
+        base = f"{prefijo}{ruta}."
+        for anterior in almacenamiento.iterar(base, ".parquet"):
+            etag_anterior = anterior["ruta"][len(base):-len(".parquet")]
+            if anterior["ruta"] != destino and etag_anterior and not any(c in etag_anterior for c in "./"):
+                almacenamiento.borrar(anterior["ruta"])
+        return destino
+
+    except Exception as e:
+        print(f"Error al convertir {ruta} a Parquet, se leerá el original: {e}")
+        return ruta
+
+
+def convertir_bases_a_parquet(etags: dict, nombre_bucket, prefijo: str, procesos: int = None) -> dict:
+    """
+    *Función que convierte a Parquet, en paralelo, los archivos que aún no tienen copia (etapa de ingesta)*
+
+    **Parameters**:
+
+        etags (dict): Diccionario {ruta: ETag} de los archivos originales (ETag None: se consulta)
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento
+
+        prefijo (str): Prefijo de las copias Parquet
+
+        procesos (int): Procesos de conversión (None: uno por CPU; 1: en el proceso principal)
+
+    **Returns**:
+
+        dict: Diccionario {ruta original: ruta por leer} con la copia Parquet o, si falló la conversión, el original
+    """
+
+    almacenamiento = obtener_almacenamiento(nombre_bucket)
+
+    # Sólo se convierten los archivos cuya copia para el ETag actual no existe
+    destinos, pendientes = {}, []
+    for ruta, etag in etags.items():
+        if etag is None:
+            pendientes.append(ruta)
+            continue
+        destinos[ruta] = ruta_parquet(ruta, etag, prefijo)
+        if almacenamiento.info(destinos[ruta]) is None:
+            pendientes.append(ruta)
+
+    if procesos == 1 or len(pendientes) <= 1:
+        convertidos = [convertir_a_parquet(ruta, almacenamiento, prefijo, etags[ruta]) for ruta in pendientes]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            convertidos = list(pool.map(convertir_a_parquet, pendientes, [almacenamiento]*len(pendientes),
+                                        [prefijo]*len(pendientes), [etags[ruta] for ruta in pendientes]))
+
+    destinos.update(zip(pendientes, convertidos))
+    return {ruta: destinos[ruta] for ruta in etags}
@@ -6,7 +6,6 @@ Este modulo implementa funciones utilizadas para generar archivos PDF de cotizac
 Funciones
 ===========
 """
-import boto3
 import json
 import pandas as pd
 from typing import Any
@@ -15,8 +14,11 @@ from reportlab.lib.utils import ImageReader
 from io import BytesIO
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
+from src.cotizacion_utils import Cotizacion
+from src.almacenamiento_utils import obtener_almacenamiento, iterar_rutas
+from src.lote_cotizaciones_utils import leer_cotizacion
 
-def cargar_dict_cotizacion(contratante:str, nombre_bucket:str) -> dict:
+def cargar_dict_cotizacion(contratante:str, nombre_bucket:str, indice:dict = None) -> dict:
     """
     *Función que carga el diccionario de cotización de un contratante específico desde S3.*
     
@@ -24,15 +26,21 @@ def cargar_dict_cotizacion(contratante:str, nombre_bucket:str) -> dict:
 
         contratante (str): Nombre del contratante para el cual se desea cargar el diccionario de cotización.   
 
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 (o el almacenamiento).
+
+        indice (dict): Índice del almacén consolidado (ver `src.lote_cotizaciones_utils.cargar_indice`); si se
+        indica, la cotización se lee del lote con una lectura por rango en lugar del JSON por contratante.
+
     **Returns**:
 
         dict_contratante (dict): Diccionario de cotización del contratante especificado.
     """
     try:
-        s3 = boto3.client('s3')
+        if indice is not None:
+            return leer_cotizacion(indice, nombre_bucket, contratante)
+        
         ruta_dict_contratante = f'coco/data/master_data/dict/{contratante}.json'
-        response = s3.get_object(Bucket=nombre_bucket, Key=ruta_dict_contratante)
-        content = response['Body'].read()
+        content = obtener_almacenamiento(nombre_bucket).leer(ruta_dict_contratante)
         dict_contratante = json.loads(content.decode('utf-8'))
         return dict_contratante
     
@@ -120,30 +128,20 @@ def convertir_campo_a_fecha(diccionario: dict, campo: str, formato: str = 'dd/mm
 
 def obtener_nombres_empresas(bucket_name, ruta_dict):
     """
-    *Función para obtener los nombres de las empresas a partir de los archivos JSON en S3.*
+    *Generador de los nombres de las empresas a partir de los archivos JSON en S3 (el listado se recorre por páginas conforme se consume).*
     
     **Parameters**:
         
-        bucket_name (str): Nombre del bucket de S3.
+        bucket_name (str | Almacenamiento): Nombre del bucket de S3 (o el almacenamiento).
         
         ruta_dict (str): Ruta dentro del bucket donde se encuentran los archivos JSON.
     
     **Returns**:
         
-        nombres_empresas (list): Lista de nombres de empresas extraídos de los archivos JSON.
+        generator: Nombres de empresas extraídos de los archivos JSON.
     """
-    s3 = boto3.client('s3')
-    response = s3.list_objects_v2(Bucket=bucket_name, Prefix=ruta_dict)
-    nombres_empresas = []
-    
-    if 'Contents' in response:
-        for obj in response['Contents']:
-            key = obj['Key']
-            if key.endswith('.json'):
-                nombre_empresa = key.split('/')[-1].replace('.json', '')
-                nombres_empresas.append(nombre_empresa)
-    
-    return nombres_empresas
+    for key in iterar_rutas(ruta_dict, bucket_name, '.json'):
+        yield key.split('/')[-1].replace('.json', '')
 
 
 
@@ -330,40 +328,36 @@ def draw_single_column_table(canvas_obj, data, start_y, width, row_height=25):
     
     return y_pos
 
-def generar_pdf_cotizacion(bucket_name: str, contratante_dict: dict) -> Any:
+def generar_pdf_cotizacion(bucket_name: str, contratante_dict) -> Any:
     """
     *Función que genera un PDF de cotización de seguro de vida grupal con formato profesional.*
 
     **Parameters**:
-        bucket_name (str): Nombre del bucket de S3 donde se encuentran los logos.
+        bucket_name (str | Almacenamiento): Nombre del bucket de S3 donde se encuentran los logos (o el almacenamiento).
         
-        contratante_dict (dict): Diccionario que contiene los datos del contratante y la cotización.    
+        contratante_dict (dict | Cotizacion): Diccionario de cotización o `Cotizacion` con los datos del contratante y la cotización.    
 
     **Returns**:
         BytesIO: Objeto BytesIO que contiene el PDF generado.
     """
     
-    # Creamos un cliente de S3
-    s3 = boto3.client('s3')
+    # Almacenamiento de los logos
+    almacenamiento = obtener_almacenamiento(bucket_name)
     logo_principal_key = "coco/data/master_data/logo/logo_SegurosDelValle.png"
     logo_secundario_key = "coco/data/master_data/logo/core.jpeg"
     
-    # Cargamos las imágenes desde S3
-    imagen_principal_buffer = BytesIO()
-    s3.download_fileobj(bucket_name, logo_principal_key, imagen_principal_buffer)
-    imagen_principal_buffer.seek(0)
-    
-    imagen_secundaria_buffer = BytesIO()
-    s3.download_fileobj(bucket_name, logo_secundario_key, imagen_secundaria_buffer)
-    imagen_secundaria_buffer.seek(0)
+    # Cargamos las imágenes
+    imagen_principal_buffer = BytesIO(almacenamiento.leer(logo_principal_key))
+    imagen_secundaria_buffer = BytesIO(almacenamiento.leer(logo_secundario_key))
     
     # Creamos un PDF en memoria
     pdf_buffer = BytesIO()
     c = canvas.Canvas(pdf_buffer, pagesize=letter)
     width, height = letter
     
-    # Extraer datos del diccionario
-    contratante = contratante_dict["Contratante"][0]
+    # Extraer datos de la cotización
+    cotizacion = contratante_dict if isinstance(contratante_dict, Cotizacion) else Cotizacion.desde_dict(contratante_dict)
+    contratante = cotizacion.contratante
     
     # Mapeo de coberturas
     coberturas_map = {
@@ -372,19 +366,19 @@ def generar_pdf_cotizacion(bucket_name: str, contratante_dict: dict) -> Any:
         "FBPAI": "FALLECIMIENTO E INVALIDEZ TOTAL",
         "FMABPAI": "FALLECIMIENTO, MUERTE ACCIDENTAL E INVALIDEZ TOTAL"
     }
-    coberturas = coberturas_map.get(contratante_dict["Coberturas"][0], contratante_dict["Coberturas"][0])
-    
-    suma_asegurada = contratante_dict["SumaAsegurada"][0]
-    edad_promedio = int(contratante_dict["EdadPromedio"][0])
-    administracion = contratante_dict["Administracion"][0]
-    agente = contratante_dict["Agente"][0]
-    inicio = contratante_dict['Inicio'][0]
-    fin = contratante_dict['Fin'][0]
+    coberturas = coberturas_map.get(cotizacion.coberturas, cotizacion.coberturas)
+    
+    suma_asegurada = cotizacion.suma_asegurada
+    edad_promedio = int(cotizacion.edad_promedio)
+    administracion = cotizacion.administracion
+    agente = cotizacion.agente
+    inicio = cotizacion.inicio
+    fin = cotizacion.fin
     vigencia = f"{inicio} - {fin}"
-    prima = contratante_dict["Prima"][0]
-    forma_pago = contratante_dict["FormaPago"][0]
-    asegurados = int(contratante_dict['Asegurados'][0])
-    num_recibos = contratante_dict["NumRecibos"][0]
+    prima = cotizacion.prima
+    forma_pago = cotizacion.forma_pago
+    asegurados = int(cotizacion.asegurados)
+    num_recibos = cotizacion.num_recibos
     
     # === ENCABEZADO ===
     # Logo principal
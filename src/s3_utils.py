@@ -0,0 +1,143 @@
+"""
+Descripción
+===========
+Este modulo implementa la fábrica del cliente de S3 compartido. El cliente se construye una sola vez
+por proceso a partir de `config/config.yaml` (credenciales, región, tamaño del pool de conexiones,
+reintentos, keep-alive y endpoint) y lo reutilizan todos los módulos, en lugar de crear un cliente y
+un pool de conexiones nuevos en cada llamada.
+
+Los clientes de boto3 se pueden compartir entre hilos pero no entre procesos; si el proceso se bifurca
+(p. ej. el pool de `cotizar_lote_paralelo`), el proceso hijo construye su propio cliente.
+
+Funciones
+===========
+"""
+import os
+import threading
+import boto3
+import yaml
+from botocore.config import Config
+
+
+RUTA_CONFIG = 'config/config.yaml'
+
+# Valores por defecto de la sección s3 de la configuración
+MAX_CONEXIONES = 50
+REINTENTOS = 5
+MODO_REINTENTOS = "standard"
+TIMEOUT_CONEXION = 10
+TIMEOUT_LECTURA = 60
+
+_candado = threading.Lock()
+_cliente = None
+_pid_cliente = None
+
+
+def cargar_configuracion(ruta_config: str = RUTA_CONFIG) -> dict:
+    """
+    *Función que lee el archivo de configuración*
+
+    **Parameters**:
+
+        ruta_config (str): Ruta del YAML de configuración
+
+    **Returns**:
+
+        dict: Configuración. Si el archivo no existe o no se puede leer se regresa un diccionario vacío
+    """
+
+    try:
+        with open(ruta_config, 'r') as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Error al leer la configuración {ruta_config}: {e}")
+        return {}
+
+
+def crear_cliente_s3(config: dict = None, endpoint_url: str = None):
+    """
+    *Función que construye un cliente de S3 con el pool de conexiones, los reintentos y el keep-alive de la configuración*
+
+    **Parameters**:
+
+        config (dict): Configuración (como `config/config.yaml`). Secciones usadas:
+
+            - aws: access_key_id, secret_access_key y region (vacías: cadena de credenciales de boto3)
+            - s3: max_conexiones, reintentos, modo_reintentos, timeout_conexion, timeout_lectura, keep_alive y endpoint_url
+
+        endpoint_url (str): Endpoint de S3 (p. ej. un S3 local para pruebas). Tiene prioridad sobre s3.endpoint_url
+
+    **Returns**:
+
+        botocore.client.S3: Cliente de S3
+    """
+
+    config = config or {}
+    aws = config.get('aws') or {}
+    opciones = config.get('s3') or {}
+
+    configuracion_cliente = Config(
+        max_pool_connections=opciones.get('max_conexiones') or MAX_CONEXIONES,
+        retries={
+            'max_attempts': opciones.get('reintentos', REINTENTOS),
+            'mode': opciones.get('modo_reintentos') or MODO_REINTENTOS
+        },
+        connect_timeout=opciones.get('timeout_conexion') or TIMEOUT_CONEXION,
+        read_timeout=opciones.get('timeout_lectura') or TIMEOUT_LECTURA,
+        tcp_keepalive=opciones.get('keep_alive', True)
+    )
+
+    return boto3.client(
+        's3',
+        aws_access_key_id=aws.get('access_key_id') or None,
+        aws_secret_access_key=aws.get('secret_access_key') or None,
+        region_name=aws.get('region') or None,
+        endpoint_url=endpoint_url or opciones.get('endpoint_url') or None,
+        config=configuracion_cliente
+    )
+
+
+def obtener_cliente_s3(endpoint_url: str = None, ruta_config: str = RUTA_CONFIG):
+    """
+    *Función que regresa el cliente de S3 compartido del proceso, construyéndolo la primera vez*
+
+    **Parameters**:
+
+        endpoint_url (str): Endpoint de S3. Si se indica y es distinto del endpoint del cliente actual, el cliente
+        se reconstruye con él (también se puede fijar con s3.endpoint_url en la configuración)
+
+        ruta_config (str): Ruta del YAML de configuración (sólo se lee al construir el cliente)
+
+    **Returns**:
+
+        botocore.client.S3: Cliente de S3 compartido
+    """
+
+    global _cliente, _pid_cliente
+
+    with _candado:
+        vigente = _cliente is not None and _pid_cliente == os.getpid()
+        if vigente and endpoint_url and _cliente.meta.endpoint_url.rstrip('/') != endpoint_url.rstrip('/'):
+            vigente = False
+        if not vigente:
+            _cliente = crear_cliente_s3(cargar_configuracion(ruta_config), endpoint_url)
+            _pid_cliente = os.getpid()
+        return _cliente
+
+
+def reiniciar_cliente_s3() -> None:
+    """
+    *Función que descarta el cliente compartido; el siguiente `obtener_cliente_s3` construye uno nuevo (p. ej. al cambiar la configuración)*
+
+    **Returns**:
+
+        None
+    """
+
+    global _cliente, _pid_cliente
+
+    with _candado:
+        _cliente = None
+        _pid_cliente = None
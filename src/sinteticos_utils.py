@@ -0,0 +1,296 @@
+"""
+Descripción
+===========
+Este modulo implementa un generador de carteras sintéticas (parámetros, emisiones, histórico de
+cotizaciones y bases de asegurados) con la misma estructura que las bases reales, para medir y
+probar el motor de cotización sin datos de clientes. Todas las funciones son reproducibles con la
+misma semilla.
+
+Funciones
+===========
+"""
+import os
+import numpy as np
+import pandas as pd
+from src.calc_primas_utils import (
+    COBERTURAS_COLUMNAS,
+    RECARGOS_FORMA_PAGO,
+    DESCUENTOS_COMISION,
+    obtener_nombre_mes
+)
+
+
+OFICINAS = ['Ciudad de Mexico', 'Orizaba', 'Aguascalientes', 'Monterrey', 'Leon', 'Queretaro', 'Puebla',
+            'Morelia', 'Satelite', 'Guadalajara', 'Chihuahua', 'Tijuana', 'Mexicali', 'Merida',
+            'Hermosillo', 'Torreon', 'Obregon']
+
+SUMAS_ASEGURADAS = [50000, 100000, 150000, 250000, 500000, 1000000]
+
+
+def generar_parametros(n_contratantes: int, semilla: int = 0, fraccion_renovacion: float = 0.6,
+                       fecha_base: str = "2025-01-01") -> pd.DataFrame:
+    """
+    *Función que genera la base de parámetros de cotización de una cartera sintética*
+
+    Usa todas las coberturas, formas de pago y comisiones del tarifario, con una mezcla de
+    renovaciones y negocio nuevo.
+
+    **Parameters**:
+
+        n_contratantes (int): Número de contratantes
+
+        semilla (int): Semilla del generador aleatorio
+
+        fraccion_renovacion (float): Proporción de contratantes que son renovaciones
+
+        fecha_base (str): Primera fecha de inicio de vigencia; las demás caen en el año siguiente
+
+    **Returns**:
+
+        DataFrame: Parámetros con las columnas de la base real (Contratante, Coberturas, SumaAsegurada, ...)
+    """
+
+    rng = np.random.default_rng(semilla)
+    inicio = pd.Timestamp(fecha_base) + pd.to_timedelta(rng.integers(0, 365, n_contratantes), unit="D")
+    ancho = len(str(n_contratantes))
+
+    df_parametros = pd.DataFrame({
+        "Contratante": [f"Empresa {i:0{ancho}d}" for i in range(1, n_contratantes + 1)],
+        "Coberturas": rng.choice(list(COBERTURAS_COLUMNAS), n_contratantes),
+        "SumaAsegurada": rng.choice(SUMAS_ASEGURADAS, n_contratantes),
+        "Administracion": rng.choice(["Tradicional", "Autoadministrada"], n_contratantes, p=[0.8, 0.2]),
+        "Agente": [f"Agente {i:03d}" for i in rng.integers(1, max(2, n_contratantes // 20) + 1, n_contratantes)],
+        "Comision": rng.choice(list(DESCUENTOS_COMISION), n_contratantes),
+        "FormaPago": rng.choice(list(RECARGOS_FORMA_PAGO), n_contratantes),
+        "Inicio": inicio,
+        "Fin": inicio + pd.DateOffset(years=1),
+        "Renovacion": np.where(rng.random(n_contratantes) < fraccion_renovacion, "Si", "No"),
+        "Poliza": [f"P{i:0{max(ancho, 6)}d}" for i in range(1, n_contratantes + 1)],
+        "Oficina": rng.choice(OFICINAS, n_contratantes)
+    })
+
+    return df_parametros
+
+
+def generar_emisiones(df_parametros: pd.DataFrame, semilla: int = 0, fraccion_sin_emision: float = 0.01) -> pd.DataFrame:
+    """
+    *Función que genera la base de emisiones (siniestralidad por póliza) de las renovaciones*
+
+    La siniestralidad sigue una distribución beta con cerca de 10% de pólizas fuera de política
+    (siniestralidad de 50% o más). Una fracción de las renovaciones se deja sin emisión para
+    ejercitar ese error.
+
+    **Parameters**:
+
+        df_parametros (DataFrame): Parámetros generados con `generar_parametros`
+
+        semilla (int): Semilla del generador aleatorio
+
+        fraccion_sin_emision (float): Proporción de renovaciones sin registro de emisión
+
+    **Returns**:
+
+        DataFrame: Emisiones con las columnas Poliza y Siniestralidad
+    """
+
+    rng = np.random.default_rng(semilla + 1)
+    renovaciones = df_parametros.loc[df_parametros["Renovacion"] == "Si", "Poliza"].to_numpy()
+    polizas = renovaciones[rng.random(len(renovaciones)) >= fraccion_sin_emision]
+
+    return pd.DataFrame({
+        "Poliza": polizas,
+        "Siniestralidad": np.round(rng.beta(2, 6, len(polizas)), 4)
+    })
+
+
+def generar_historico(df_parametros: pd.DataFrame, n_registros: int, semilla: int = 0) -> pd.DataFrame:
+    """
+    *Función que genera un histórico de cotizaciones con las columnas del histórico real*
+
+    **Parameters**:
+
+        df_parametros (DataFrame): Parámetros generados con `generar_parametros`
+
+        n_registros (int): Número de cotizaciones anteriores
+
+        semilla (int): Semilla del generador aleatorio
+
+    **Returns**:
+
+        DataFrame: Histórico con las columnas Ticket, Fecha de Inicio, Mes, Oficina, Contratante, Agente, Prima, Evento y Tipo
+    """
+
+    rng = np.random.default_rng(semilla + 2)
+    df_muestra = df_parametros.iloc[rng.integers(0, len(df_parametros), n_registros)].reset_index(drop=True)
+    inicio = df_muestra["Inicio"] - pd.DateOffset(years=1)
+    fuera_politica = rng.random(n_registros) < 0.1
+
+    return pd.DataFrame({
+        "Ticket": np.arange(1, n_registros + 1),
+        "Fecha de Inicio": inicio,
+        "Mes": [obtener_nombre_mes(fecha) for fecha in inicio],
+        "Oficina": df_muestra["Oficina"],
+        "Contratante": df_muestra["Contratante"],
+        "Agente": df_muestra["Agente"],
+        "Prima": np.where(fuera_politica, "La siniestralidad está desviada, consulte a un suscriptor",
+                          np.round(rng.lognormal(11, 1, n_registros), 2).astype(object)),
+        "Evento": np.where(fuera_politica, "Fuera de política", "na"),
+        "Tipo": np.where(df_muestra["Renovacion"] == "Si", "renovación", "nuevo")
+    })
+
+
+def tamanios_grupos(n_contratantes: int, total_asegurados: int, semilla: int = 0) -> np.ndarray:
+    """
+    *Función que reparte el total de asegurados entre los contratantes*
+
+    Los tamaños siguen una distribución lognormal (muchos grupos chicos y pocas cuentas grandes),
+    con al menos un asegurado por contratante, y suman exactamente `total_asegurados`.
+
+    **Parameters**:
+
+        n_contratantes (int): Número de contratantes
+
+        total_asegurados (int): Número total de asegurados de la cartera
+
+        semilla (int): Semilla del generador aleatorio
+
+    **Returns**:
+
+        np.ndarray: Número de asegurados de cada contratante
+    """
+
+    rng = np.random.default_rng(semilla + 3)
+    pesos = rng.lognormal(0, 1.5, n_contratantes)
+    tamanios = np.maximum(1, np.floor(pesos/pesos.sum()*total_asegurados)).astype(np.int64)
+
+    # El faltante por redondeo se reparte entre los grupos más grandes; el excedente (por el mínimo
+    # de un asegurado) se descuenta del más grande
+    diferencia = int(total_asegurados - tamanios.sum())
+    orden = np.argsort(-tamanios, kind="stable")
+    if diferencia > 0:
+        tamanios[orden[:diferencia]] += 1
+    elif diferencia < 0:
+        tamanios[orden[0]] = max(1, tamanios[orden[0]] + diferencia)
+    return tamanios
+
+
+def generar_censo(df_parametros: pd.DataFrame, tamanios: np.ndarray, semilla: int = 0,
+                  fraccion_fechas_vacias: float = 0.001, fraccion_fuera_tabla: float = 0.002) -> pd.DataFrame:
+    """
+    *Función que genera la base de asegurados de un conjunto de contratantes*
+
+    Las edades a la fecha de inicio siguen una normal truncada entre 18 y 70 años. Una fracción de
+    asegurados no tiene fecha de nacimiento y otra queda fuera de la tabla de cuotas (mayores de 75
+    años o con nacimiento posterior al inicio de vigencia).
+
+    **Parameters**:
+
+        df_parametros (DataFrame): Parámetros de los contratantes
+
+        tamanios (np.ndarray): Número de asegurados de cada contratante (ver `tamanios_grupos`)
+
+        semilla (int): Semilla del generador aleatorio
+
+        fraccion_fechas_vacias (float): Proporción de asegurados sin fecha de nacimiento
+
+        fraccion_fuera_tabla (float): Proporción de asegurados con edad fuera de la tabla de cuotas
+
+    **Returns**:
+
+        DataFrame: Base de asegurados con las columnas Nombre, Fecha de Nacimiento y Contratante
+    """
+
+    rng = np.random.default_rng(semilla + 4)
+    tamanios = np.asarray(tamanios, dtype=np.int64)
+    codigos = np.repeat(np.arange(len(df_parametros)), tamanios)
+    n = len(codigos)
+
+    # Edad en días a la fecha de inicio de su contratante
+    edades = np.clip(rng.normal(38, 11, n), 18, 70)
+    fuera_tabla = rng.random(n) < fraccion_fuera_tabla
+    edades = np.where(fuera_tabla, rng.choice([-1.0, 80.0, 90.0], n), edades)
+    dias = np.round(edades*365.25 + rng.uniform(0, 365, n)).astype("timedelta64[D]")
+
+    inicios = df_parametros["Inicio"].to_numpy().astype("datetime64[D]")
+    fechas = (inicios[codigos] - dias).astype("datetime64[ns]")
+    fechas[rng.random(n) < fraccion_fechas_vacias] = np.datetime64("NaT")
+
+    return pd.DataFrame({
+        "Nombre": [f"Asegurado {i}" for i in range(1, n + 1)],
+        "Fecha de Nacimiento": fechas,
+        "Contratante": df_parametros["Contratante"].to_numpy()[codigos]
+    })
+
+
+def generar_cartera(n_contratantes: int, total_asegurados: int, semilla: int = 0, n_historico: int = None) -> dict:
+    """
+    *Función que genera una cartera sintética completa*
+
+    **Parameters**:
+
+        n_contratantes (int): Número de contratantes
+
+        total_asegurados (int): Número total de asegurados
+
+        semilla (int): Semilla del generador aleatorio
+
+        n_historico (int): Registros del histórico de cotizaciones (por defecto, dos por contratante)
+
+    **Returns**:
+
+        dict: Diccionario con los DataFrames parametros, emisiones, historico y calculo y el arreglo tamanios
+    """
+
+    df_parametros = generar_parametros(n_contratantes, semilla)
+    tamanios = tamanios_grupos(n_contratantes, total_asegurados, semilla)
+
+    return {
+        "parametros": df_parametros,
+        "emisiones": generar_emisiones(df_parametros, semilla),
+        "historico": generar_historico(df_parametros, n_historico if n_historico is not None else 2*n_contratantes, semilla),
+        "calculo": generar_censo(df_parametros, tamanios, semilla),
+        "tamanios": tamanios
+    }
+
+
+def guardar_cartera(cartera: dict, directorio: str, asegurados_por_archivo: int = 200000) -> list:
+    """
+    *Función que guarda una cartera sintética con la estructura de archivos de las bases reales*
+
+    Escribe parametros.xlsx, emisiones.xlsx, historico.xlsx y las bases de asegurados en
+    `solicitudes/`, agrupando contratantes completos hasta `asegurados_por_archivo` filas por
+    archivo (Excel admite a lo más 1,048,575 filas de datos por hoja).
+
+    **Parameters**:
+
+        cartera (dict): Cartera generada con `generar_cartera`
+
+        directorio (str): Directorio de salida
+
+        asegurados_por_archivo (int): Filas aproximadas por base de asegurados
+
+    **Returns**:
+
+        list: Rutas de los archivos escritos
+    """
+
+    os.makedirs(os.path.join(directorio, "solicitudes"), exist_ok=True)
+    rutas = []
+
+    for nombre in ["parametros", "emisiones", "historico"]:
+        ruta = os.path.join(directorio, f"{nombre}.xlsx")
+        cartera[nombre].to_excel(ruta, index=False)
+        rutas.append(ruta)
+
+    # Cortes de archivo en fronteras de contratante
+    limites = np.concatenate([[0], np.cumsum(cartera["tamanios"])])
+    inicio, k = 0, 0
+    while inicio < len(cartera["calculo"]):
+        fin = limites[min(np.searchsorted(limites, inicio + asegurados_por_archivo, side="right") - 1, len(limites) - 1)]
+        fin = fin if fin > inicio else limites[np.searchsorted(limites, inicio, side="right")]
+        ruta = os.path.join(directorio, "solicitudes", f"solicitud_{k:04d}.xlsx")
+        cartera["calculo"].iloc[inicio:fin].to_excel(ruta, index=False)
+        rutas.append(ruta)
+        inicio, k = fin, k + 1
+
+    return rutas
@@ -0,0 +1,190 @@
+"""
+Descripción
+===========
+Este modulo implementa la cola de subidas asíncrona del pipeline: las salidas (JSON de cotización,
+memorias de cálculo) se encolan por lotes y un pool de hilos las escribe en el almacenamiento mientras
+el proceso principal sigue calculando.
+
+La cola aplica contrapresión (`enviar` se bloquea cuando hay `max_pendientes` lotes sin terminar),
+reintenta con espera exponencial los errores transitorios (throttling de S3, errores 5xx y de conexión)
+y `esperar()` funciona como barrera: regresa cuando todo lo encolado terminó.
+
+Funciones
+===========
+"""
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from botocore.exceptions import ClientError, ConnectionError as ErrorConexionBotocore
+from src.instrumentacion_utils import etapa, contar
+
+
+# Códigos de error de S3 que indican saturación o fallas transitorias
+CODIGOS_REINTENTABLES = {
+    "SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded", "TooManyRequestsException",
+    "RequestTimeout", "RequestTimeTooSkewed", "InternalError", "ServiceUnavailable", "500", "502", "503", "504"
+}
+
+
+@dataclass(slots=True)
+class Subida:
+    """
+    *Objeto por escribir en el almacenamiento*
+
+    Se indica `contenido` (bytes) o `ruta_local` (archivo que se sube sin cargarlo). `etapa` es el nombre
+    con el que se mide en la instrumentación.
+    """
+
+    ruta: str
+    contenido: bytes = None
+    ruta_local: str = None
+    tipo_contenido: str = None
+    etapa: str = "subida"
+
+
+def es_reintentable(error: Exception) -> bool:
+    """
+    *Función que indica si un error de escritura es transitorio*
+
+    **Parameters**:
+
+        error (Exception): Error de la escritura
+
+    **Returns**:
+
+        bool: True para throttling, errores 5xx, de conexión o de E/S
+    """
+
+    if isinstance(error, ClientError):
+        return str(error.response.get("Error", {}).get("Code")) in CODIGOS_REINTENTABLES
+    return isinstance(error, (ErrorConexionBotocore, ConnectionError, TimeoutError))
+
+
+class ColaSubidas:
+    """
+    *Cola de subidas por lotes con un pool de hilos, contrapresión y reintentos*
+
+    Cada lote (p. ej. el JSON y la memoria de un contratante) se escribe completo en un hilo y al terminar
+    se llama `al_terminar(error)` con None si todo se escribió o con el último error. Se usa como context
+    manager; al salir se espera a que terminen las subidas.
+
+    **Parameters**:
+
+        almacenamiento (Almacenamiento): Almacenamiento destino
+
+        hilos (int): Escrituras simultáneas
+
+        max_pendientes (int): Lotes encolados o en curso antes de que `enviar` se bloquee
+
+        reintentos (int): Reintentos por objeto ante errores transitorios
+
+        espera_base (float): Segundos de la primera espera; se duplica en cada reintento (con variación aleatoria)
+
+        espera_maxima (float): Tope de la espera entre reintentos
+    """
+
+    def __init__(self, almacenamiento, hilos: int = 16, max_pendientes: int = 256, reintentos: int = 5,
+                 espera_base: float = 0.2, espera_maxima: float = 20.0):
+        self.almacenamiento = almacenamiento
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.errores = []
+        self._pool = ThreadPoolExecutor(max_workers=max(1, hilos))
+        self._cupo = threading.BoundedSemaphore(max(1, max_pendientes))
+        self._candado = threading.Lock()
+        self._pendientes = 0
+        self._sin_pendientes = threading.Condition(self._candado)
+
+    def __enter__(self) -> "ColaSubidas":
+        return self
+
+    def __exit__(self, *excepcion) -> None:
+        self.cerrar()
+
+    def enviar(self, subidas: list, al_terminar=None) -> None:
+        """
+        *Encola un lote de subidas (se bloquea si ya hay `max_pendientes` lotes sin terminar)*
+
+        **Parameters**:
+
+            subidas (list): Objetos `Subida` del lote
+
+            al_terminar (callable): Función `al_terminar(error)` que se llama desde el hilo de la subida al terminar el lote
+
+        **Returns**:
+
+            None
+        """
+
+        self._cupo.acquire()
+        with self._candado:
+            self._pendientes += 1
+        try:
+            self._pool.submit(self._subir_lote, list(subidas), al_terminar)
+        except Exception:
+            self._terminar_lote()
+            raise
+
+    def esperar(self) -> list:
+        """
+        *Barrera: espera a que terminen todos los lotes encolados*
+
+        **Returns**:
+
+            list: Errores (ruta, error) de las subidas que fallaron desde la creación de la cola
+        """
+
+        with self._sin_pendientes:
+            self._sin_pendientes.wait_for(lambda: self._pendientes == 0)
+        return list(self.errores)
+
+    def cerrar(self) -> None:
+        """Espera a que terminen las subidas y libera los hilos."""
+        self.esperar()
+        self._pool.shutdown(wait=True)
+
+    def _terminar_lote(self) -> None:
+        with self._sin_pendientes:
+            self._pendientes -= 1
+            self._sin_pendientes.notify_all()
+        self._cupo.release()
+
+    def _subir_lote(self, subidas: list, al_terminar) -> None:
+        error = None
+        try:
+            for subida in subidas:
+                try:
+                    self._subir(subida)
+                except Exception as e:
+                    error = e
+                    with self._candado:
+                        self.errores.append((subida.ruta, e))
+                    break
+            if al_terminar is not None:
+                try:
+                    al_terminar(error)
+                except Exception as e:
+                    print(f"Error al registrar la subida de {subidas[0].ruta if subidas else ''}: {e}")
+        finally:
+            self._terminar_lote()
+
+    def _subir(self, subida: Subida) -> None:
+        intento = 0
+        while True:
+            try:
+                with etapa(subida.etapa):
+                    if subida.ruta_local is not None:
+                        self.almacenamiento.subir_archivo(subida.ruta_local, subida.ruta, subida.tipo_contenido)
+                    else:
+                        self.almacenamiento.escribir(subida.ruta, subida.contenido, subida.tipo_contenido)
+                return
+            except Exception as e:
+                if intento >= self.reintentos or not es_reintentable(e):
+                    raise
+                espera = min(self.espera_maxima, self.espera_base*2**intento)
+                time.sleep(espera*random.uniform(0.5, 1.0))
+                intento += 1
+                contar("reintentos_subida")
@@ -0,0 +1,98 @@
+"""
+Descripción
+===========
+Este modulo implementa el asignador de tickets de cotización. El siguiente ticket disponible vive en
+un objeto contador pequeño (JSON) del almacenamiento y cada ejecución reserva un rango contiguo con
+una escritura condicional (compare-and-swap sobre el ETag): si otra ejecución movió el contador entre
+la lectura y la escritura, la escritura se rechaza y se vuelve a intentar. Así, ejecuciones simultáneas
+o por fragmentos reciben rangos que no se traslapan y no hace falta leer el histórico para numerar.
+
+Funciones
+===========
+"""
+import json
+import time
+import random
+from datetime import datetime
+from src.almacenamiento_utils import obtener_almacenamiento
+
+
+class AsignadorTickets:
+    """
+    *Asignador durable de rangos de tickets sobre un objeto contador*
+
+    **Parameters**:
+
+        nombre_bucket (str | Almacenamiento): Nombre del bucket de S3 o un almacenamiento (S3 o local)
+
+        ruta (str): Ruta del contador
+
+        inicio (int | callable): Primer ticket si el contador aún no existe; si es una función, se llama
+        sólo en ese caso (p. ej. para continuar la numeración de un histórico existente)
+
+        reintentos (int): Intentos de escritura condicional antes de fallar
+
+        espera_base (float): Segundos de la primera espera entre intentos; se duplica en cada intento
+    """
+
+    def __init__(self, nombre_bucket, ruta: str, inicio=1, reintentos: int = 20, espera_base: float = 0.05):
+        self.almacenamiento = obtener_almacenamiento(nombre_bucket)
+        self.ruta = ruta
+        self.inicio = inicio
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+
+    def _leer(self):
+        """Regresa (siguiente ticket, etag) del contador, o (None, None) si no existe."""
+        try:
+            contenido, etag = self.almacenamiento.leer_si_cambio(self.ruta)
+        except FileNotFoundError:
+            return None, None
+        return int(json.loads(contenido.decode('utf-8'))["siguiente"]), etag
+
+    def siguiente(self) -> int:
+        """
+        *Regresa el siguiente ticket disponible sin reservarlo*
+
+        **Returns**:
+
+            int: Siguiente ticket
+        """
+
+        siguiente, _ = self._leer()
+        if siguiente is None:
+            return self.inicio() if callable(self.inicio) else self.inicio
+        return siguiente
+
+    def reservar(self, n: int) -> int:
+        """
+        *Reserva un rango contiguo de `n` tickets*
+
+        **Parameters**:
+
+            n (int): Número de tickets
+
+        **Returns**:
+
+            int: Primer ticket del rango [ticket, ticket + n)
+        """
+
+        inicio = None
+        for intento in range(self.reintentos):
+            siguiente, etag = self._leer()
+            if siguiente is None:
+                if inicio is None:
+                    inicio = self.inicio() if callable(self.inicio) else self.inicio
+                siguiente = int(inicio)
+            if n <= 0:
+                return siguiente
+
+            contenido = json.dumps({"siguiente": siguiente + n, "actualizado": datetime.now().isoformat()})
+            if self.almacenamiento.escribir_condicional(self.ruta, contenido.encode('utf-8'), etag,
+                                                        'application/json') is not None:
+                return siguiente
+
+            # Otra ejecución movió el contador: se espera un poco (con variación) y se vuelve a leer
+            time.sleep(self.espera_base*2**min(intento, 6)*random.uniform(0.5, 1.0))
+
+        raise RuntimeError(f"No se pudo reservar tickets en {self.ruta} tras {self.reintentos} intentos")
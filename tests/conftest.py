@@ -0,0 +1,35 @@
+import os
+import pytest
+import pandas as pd
+from src.almacenamiento_utils import AlmacenamientoLocal
+from src.calc_primas_utils import TablaCuotas
+from src.sinteticos_utils import generar_cartera
+
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def tabla_cuotas():
+    return TablaCuotas(pd.read_excel(os.path.join(RAIZ, "modelo", "experiencia_global.xlsx")))
+
+
+@pytest.fixture(scope="session")
+def cartera():
+    """Cartera sintética con una renovación fuera de política, una sin emisión y un registro repetido."""
+    cartera = generar_cartera(12, 1500, semilla=3)
+    df_parametros, df_emisiones = cartera["parametros"], cartera["emisiones"]
+
+    renovaciones = df_parametros.loc[df_parametros["Renovacion"] == "Si", "Poliza"].tolist()
+    df_emisiones.loc[df_emisiones["Poliza"] == renovaciones[0], "Siniestralidad"] = 0.9
+    cartera["emisiones"] = df_emisiones[df_emisiones["Poliza"] != renovaciones[1]].reset_index(drop=True)
+
+    # El cálculo individual toma el primer registro de un contratante repetido
+    repetido = df_parametros.iloc[[0]].assign(Comision=0.05)
+    cartera["parametros"] = pd.concat([df_parametros, repetido], ignore_index=True)
+    return cartera
+
+
+@pytest.fixture
+def almacenamiento(tmp_path):
+    return AlmacenamientoLocal(str(tmp_path / "almacenamiento"))
@@ -0,0 +1,76 @@
+import json
+import numpy as np
+import pandas as pd
+from src.cache_utils import CacheCotizaciones
+
+
+MEMORIA = pd.DataFrame({"Edad": np.arange(40), "Fallecimiento": np.linspace(1.0, 2.0, 40)})
+
+
+def _cotizacion(prima):
+    return {"Contratante": ["Empresa"], "Inicio": [pd.Timestamp("2025-01-01")], "Ticket": [np.int64(7)],
+            "Prima": [np.float64(prima)], "Asegurados": [40], "Evento": ["na"]}
+
+
+def _indice(almacenamiento, prefijo="cache/"):
+    return json.loads(almacenamiento.leer(f"{prefijo}indice.json"))
+
+
+def _entradas(almacenamiento, prefijo="cache/"):
+    return {objeto["ruta"][len(prefijo):-len(".parquet")] for objeto in almacenamiento.iterar(prefijo, ".parquet")}
+
+
+def test_guardar_y_obtener_conserva_tipos(almacenamiento):
+    cache = CacheCotizaciones(nombre_bucket=almacenamiento, prefijo="cache/")
+    cache.guardar_cotizacion("llave", _cotizacion(123.5), MEMORIA)
+    cache.guardar()
+
+    cotizacion, memoria = CacheCotizaciones(nombre_bucket=almacenamiento, prefijo="cache/").obtener("llave")
+    assert cotizacion == _cotizacion(123.5)
+    assert type(cotizacion["Ticket"][0]) is np.int64
+    pd.testing.assert_frame_equal(memoria, MEMORIA)
+
+
+def test_ejecuciones_simultaneas_no_pierden_entradas(almacenamiento):
+    primera = CacheCotizaciones(nombre_bucket=almacenamiento, prefijo="cache/")
+    segunda = CacheCotizaciones(nombre_bucket=almacenamiento, prefijo="cache/")
+    primera.guardar_cotizacion("a", _cotizacion(1.0))
+    segunda.guardar_cotizacion("b", _cotizacion(2.0))
+    primera.guardar()
+    segunda.guardar()
+
+    assert set(_indice(almacenamiento)) == {"a", "b"}
+    assert CacheCotizaciones(nombre_bucket=almacenamiento, prefijo="cache/").obtener("a") is not None
+
+
+def test_desalojo_sobre_el_indice_combinado(almacenamiento):
+    medida = CacheCotizaciones(nombre_bucket=almacenamiento, prefijo="medida/")
+    medida.guardar_cotizacion("x", _cotizacion(1.0), MEMORIA)
+    max_bytes = 3*medida.estadisticas()["bytes"] + 10
+
+    primera = CacheCotizaciones(nombre_bucket=almacenamiento, prefijo="cache/", max_bytes=max_bytes)
+    segunda = CacheCotizaciones(nombre_bucket=almacenamiento, prefijo="cache/", max_bytes=max_bytes)
+    for i in range(3):
+        primera.guardar_cotizacion(f"a{i}", _cotizacion(i), MEMORIA)
+    for i in range(3):
+        segunda.guardar_cotizacion(f"b{i}", _cotizacion(i), MEMORIA)
+    primera.guardar()
+    segunda.guardar()
+
+    # Cada ejecución respeta el límite por sí sola; el índice combinado también
+    indice = _indice(almacenamiento)
+    assert set(indice) == {"b0", "b1", "b2"}
+    assert sum(entrada["bytes"] for entrada in indice.values()) <= max_bytes
+    assert _entradas(almacenamiento) == set(indice)
+
+
+def test_entrada_perdida_es_un_fallo(almacenamiento):
+    cache = CacheCotizaciones(nombre_bucket=almacenamiento, prefijo="cache/")
+    cache.guardar_cotizacion("llave", _cotizacion(1.0))
+    cache.guardar()
+    almacenamiento.borrar("cache/llave.parquet")
+
+    assert cache.obtener("llave") is None
+    cache.guardar()
+    assert _indice(almacenamiento) == {}
+    assert cache.estadisticas()["fallos"] == 1
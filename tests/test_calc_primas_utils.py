@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cache_utils import CacheCotizaciones
+from src.calc_primas_utils import (
+    CensoCompacto,
+    cotizar_contratante,
+    cotizar_escenarios,
+    cotizar_lote,
+    cotizar_lote_paralelo,
+    cotizar_por_bloques,
+    cotizaciones_a_dicts,
+    memorias_por_contratante
+)
+
+
+@pytest.fixture(scope="module")
+def esperadas(cartera, tabla_cuotas):
+    """Cotización y memoria de `cotizar_contratante` para cada contratante, con el ticket de su posición."""
+    df_parametros, df_calculo, df_emisiones = cartera["parametros"], cartera["calculo"], cartera["emisiones"]
+    cotizaciones, memorias = {}, {}
+    for i, contratante in enumerate(df_parametros["Contratante"].unique()):
+        cotizacion, memoria = cotizar_contratante(df_parametros, contratante, 1 + i,
+                                                  df_calculo[df_calculo["Contratante"] == contratante],
+                                                  df_emisiones, tabla_cuotas)
+        if cotizacion:
+            cotizaciones[contratante] = cotizacion
+            memorias[contratante] = memoria.reset_index(drop=True)
+    return cotizaciones, memorias
+
+
+def _comparar_cotizaciones(df_cotizaciones, esperadas):
+    cotizaciones = cotizaciones_a_dicts(df_cotizaciones)
+    assert set(cotizaciones) == set(esperadas)
+    for contratante, esperada in esperadas.items():
+        for columna, valores in esperada.items():
+            valor, esperado = cotizaciones[contratante][columna][0], valores[0]
+            if isinstance(esperado, (float, np.floating)):
+                assert np.isclose(valor, esperado, equal_nan=True), (contratante, columna, valor, esperado)
+            elif columna in ("Inicio", "Fin"):
+                assert pd.Timestamp(valor) == pd.Timestamp(esperado), (contratante, columna)
+            else:
+                assert valor == esperado, (contratante, columna, valor, esperado)
+
+
+def test_cartera_cubre_los_casos_especiales(esperadas):
+    cotizaciones, _ = esperadas
+    eventos = [cotizacion["Evento"][0] for cotizacion in cotizaciones.values()]
+    assert "Fuera de política" in eventos
+    # La renovación sin emisión no se cotiza y su ticket queda sin usar
+    assert len(cotizaciones) == 11
+
+
+@pytest.mark.parametrize("generar_memorias", [True, False])
+def test_cotizar_lote_igual_a_cotizar_contratante(cartera, tabla_cuotas, esperadas, generar_memorias):
+    df_cotizaciones, df_memorias = cotizar_lote(cartera["parametros"], cartera["calculo"], cartera["emisiones"],
+                                                tabla_cuotas, 1, generar_memorias)
+    _comparar_cotizaciones(df_cotizaciones, esperadas[0])
+    if generar_memorias:
+        memorias = memorias_por_contratante(df_cotizaciones, df_memorias)
+        for contratante, memoria in esperadas[1].items():
+            pd.testing.assert_frame_equal(memorias[contratante], memoria, check_dtype=False)
+
+
+def test_cotizar_contratante_por_histograma(cartera, tabla_cuotas, esperadas):
+    df_parametros, df_calculo = cartera["parametros"], cartera["calculo"]
+    for contratante, esperada in esperadas[0].items():
+        cotizacion, memoria = cotizar_contratante(df_parametros, contratante, esperada["Ticket"][0],
+                                                  df_calculo[df_calculo["Contratante"] == contratante],
+                                                  cartera["emisiones"], tabla_cuotas, por_histograma=True)
+        assert memoria is None
+        if esperada["Evento"][0] == "na":
+            assert np.isclose(cotizacion["Prima"][0], esperada["Prima"][0])
+        else:
+            assert cotizacion["Prima"] == esperada["Prima"]
+
+
+def test_cotizar_escenarios_incluye_la_prima_cotizada(cartera, tabla_cuotas, esperadas):
+    df_parametros, df_calculo = cartera["parametros"], cartera["calculo"]
+    for contratante, esperada in esperadas[0].items():
+        if esperada["Evento"][0] != "na":
+            continue
+        df_escenarios = cotizar_escenarios(df_parametros, contratante,
+                                           df_calculo[df_calculo["Contratante"] == contratante], tabla_cuotas)
+        fila = df_escenarios[(df_escenarios["Coberturas"] == esperada["Coberturas"][0])
+                             & np.isclose(df_escenarios["Comision"], esperada["Comision"][0])
+                             & (df_escenarios["FormaPago"] == esperada["FormaPago"][0].lower())]
+        assert len(fila) == 1
+        assert np.isclose(fila["Prima"].iloc[0], esperada["Prima"][0])
+
+
+def test_cotizar_por_bloques(cartera, tabla_cuotas, esperadas, tmp_path):
+    df_calculo = cartera["calculo"]
+    bloques = (df_calculo.iloc[inicio:inicio + 200] for inicio in range(0, len(df_calculo), 200))
+    df_cotizaciones, rutas_memorias = cotizar_por_bloques(cartera["parametros"], bloques, cartera["emisiones"],
+                                                          tabla_cuotas, 1, str(tmp_path))
+    _comparar_cotizaciones(df_cotizaciones, esperadas[0])
+    for contratante, memoria in esperadas[1].items():
+        assert len(pd.read_csv(rutas_memorias[contratante])) == len(memoria)
+
+
+@pytest.mark.parametrize("n_procesos", [1, 2])
+def test_cotizar_lote_paralelo(cartera, tabla_cuotas, esperadas, n_procesos):
+    df_cotizaciones, df_memorias = cotizar_lote_paralelo(cartera["parametros"], cartera["calculo"],
+                                                         cartera["emisiones"], tabla_cuotas, 1, n_procesos=n_procesos,
+                                                         contratantes_por_fragmento=3)
+    _comparar_cotizaciones(df_cotizaciones, esperadas[0])
+    memorias = memorias_por_contratante(df_cotizaciones, df_memorias)
+    for contratante, memoria in esperadas[1].items():
+        pd.testing.assert_frame_equal(memorias[contratante], memoria, check_dtype=False)
+
+
+def test_cotizar_lote_con_censo_compacto(cartera, tabla_cuotas, esperadas):
+    df_calculo = cartera["calculo"]
+    censo = CensoCompacto(df_calculo, cartera["parametros"], columnas_extra=list(df_calculo.columns))
+    df_cotizaciones, df_memorias = cotizar_lote(cartera["parametros"], censo, cartera["emisiones"], tabla_cuotas, 1)
+    _comparar_cotizaciones(df_cotizaciones, esperadas[0])
+    memorias = memorias_por_contratante(df_cotizaciones, df_memorias)
+    for contratante, memoria in esperadas[1].items():
+        pd.testing.assert_frame_equal(memorias[contratante], memoria, check_dtype=False)
+
+
+def test_cotizar_lote_con_cache(cartera, tabla_cuotas, esperadas, tmp_path):
+    cache = CacheCotizaciones(directorio=str(tmp_path))
+    for _ in range(2):
+        df_cotizaciones, df_memorias = cotizar_lote(cartera["parametros"], cartera["calculo"], cartera["emisiones"],
+                                                    tabla_cuotas, 1, cache=cache)
+        _comparar_cotizaciones(df_cotizaciones, esperadas[0])
+        memorias = memorias_por_contratante(df_cotizaciones, df_memorias)
+        for contratante, memoria in esperadas[1].items():
+            pd.testing.assert_frame_equal(memorias[contratante], memoria, check_dtype=False)
+    assert cache.estadisticas()["aciertos"] == len(esperadas[0])
+
+
+@pytest.mark.parametrize("n_procesos", [None, 1])
+def test_un_error_solo_afecta_a_su_contratante(cartera, tabla_cuotas, esperadas, n_procesos):
+    df_parametros = cartera["parametros"].copy()
+    contratante = next(iter(esperadas[0]))
+    df_parametros["Inicio"] = df_parametros["Inicio"].astype(object)
+    df_parametros.loc[df_parametros["Contratante"] == contratante, "Inicio"] = "no es fecha"
+
+    if n_procesos is None:
+        df_cotizaciones, _ = cotizar_lote(df_parametros, cartera["calculo"], cartera["emisiones"], tabla_cuotas, 1)
+    else:
+        df_cotizaciones, _ = cotizar_lote_paralelo(df_parametros, cartera["calculo"], cartera["emisiones"],
+                                                   tabla_cuotas, 1, n_procesos=n_procesos)
+    _comparar_cotizaciones(df_cotizaciones, {c: e for c, e in esperadas[0].items() if c != contratante})
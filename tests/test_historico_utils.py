@@ -0,0 +1,93 @@
+import json
+import posixpath
+import pandas as pd
+import pyarrow.parquet as pq
+from io import BytesIO
+from src.historico_utils import (
+    agregar_historico,
+    archivos_historico,
+    compactar_historico,
+    contar_historico,
+    leer_historico
+)
+
+
+PREFIJO = "historico/"
+
+
+def _cotizaciones(tickets, contratante="Empresa"):
+    return pd.DataFrame({"Ticket": tickets, "Contratante": [f"{contratante} {ticket}" for ticket in tickets],
+                         "Prima": [1000.0*ticket for ticket in tickets]})
+
+
+def test_agregar_leer_y_contar(almacenamiento):
+    assert agregar_historico(pd.DataFrame(), PREFIJO, almacenamiento) is None
+    agregar_historico(_cotizaciones([1, 2]), PREFIJO, almacenamiento, "2025-01-01")
+    agregar_historico(_cotizaciones([3]), PREFIJO, almacenamiento, "2025-01-01")
+    agregar_historico(_cotizaciones([4, 5]), PREFIJO, almacenamiento, "2025-01-02")
+
+    assert contar_historico(PREFIJO, almacenamiento) == 5
+    df = leer_historico(PREFIJO, almacenamiento)
+    assert df["Ticket"].tolist() == [1, 2, 3, 4, 5]
+    assert df["fecha"].tolist() == ["2025-01-01"]*3 + ["2025-01-02"]*2
+
+    df = leer_historico(PREFIJO, almacenamiento, columnas=["Ticket"], desde="2025-01-02")
+    assert df.columns.tolist() == ["Ticket", "fecha"]
+    assert df["Ticket"].tolist() == [4, 5]
+
+
+def test_historico_vacio(almacenamiento):
+    assert contar_historico(PREFIJO, almacenamiento) == 0
+    assert leer_historico(PREFIJO, almacenamiento).empty
+
+
+def test_tickets_repetidos_se_conservan(almacenamiento, capsys):
+    agregar_historico(_cotizaciones([1, 2], "Empresa A"), PREFIJO, almacenamiento, "2025-01-01")
+    agregar_historico(_cotizaciones([1, 2], "Empresa B"), PREFIJO, almacenamiento, "2025-01-01")
+
+    df = leer_historico(PREFIJO, almacenamiento)
+    assert len(df) == 4
+    assert "2 tickets aparecen más de una vez" in capsys.readouterr().out
+
+
+def test_compactar(almacenamiento):
+    for tickets in ([1, 2], [3], [4, 5, 6]):
+        agregar_historico(_cotizaciones(tickets), PREFIJO, almacenamiento, "2025-01-01")
+    agregar_historico(_cotizaciones([7]), PREFIJO, almacenamiento, "2025-01-02")
+    agregar_historico(_cotizaciones([8]), PREFIJO, almacenamiento, "2025-01-03")
+    antes = leer_historico(PREFIJO, almacenamiento)
+
+    assert compactar_historico(PREFIJO, almacenamiento, hasta="2025-01-02") == {"2025-01-01": 3}
+    archivos = archivos_historico(PREFIJO, almacenamiento)
+    assert len(archivos) == 3
+    compactado = archivos[0]["ruta"]
+    assert posixpath.basename(compactado).startswith("compactado-")
+
+    metadatos = pq.read_metadata(BytesIO(almacenamiento.leer(compactado))).metadata
+    assert len(json.loads(metadatos[b"reemplaza"])) == 3
+
+    pd.testing.assert_frame_equal(leer_historico(PREFIJO, almacenamiento), antes)
+    assert contar_historico(PREFIJO, almacenamiento) == 8
+    # Una partición con un solo archivo no se vuelve a compactar
+    assert compactar_historico(PREFIJO, almacenamiento, hasta="2025-01-02") == {}
+
+
+def test_compactacion_interrumpida(almacenamiento):
+    originales = [agregar_historico(_cotizaciones(tickets), PREFIJO, almacenamiento, "2025-01-01")
+                  for tickets in ([1, 2], [3])]
+    antes = leer_historico(PREFIJO, almacenamiento)
+
+    # La compactación escribió el compactado pero no alcanzó a borrar los originales
+    respaldo = {ruta: almacenamiento.leer(ruta) for ruta in originales}
+    compactar_historico(PREFIJO, almacenamiento, hasta="2025-01-01")
+    for ruta, contenido in respaldo.items():
+        almacenamiento.escribir(ruta, contenido)
+    assert len(archivos_historico(PREFIJO, almacenamiento)) == 3
+
+    pd.testing.assert_frame_equal(leer_historico(PREFIJO, almacenamiento), antes)
+    assert contar_historico(PREFIJO, almacenamiento) == 3
+
+    # La siguiente compactación sólo borra los restos
+    assert compactar_historico(PREFIJO, almacenamiento, hasta="2025-01-01") == {}
+    assert len(archivos_historico(PREFIJO, almacenamiento)) == 1
+    pd.testing.assert_frame_equal(leer_historico(PREFIJO, almacenamiento), antes)
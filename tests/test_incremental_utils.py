@@ -0,0 +1,100 @@
+import pandas as pd
+from src.incremental_utils import (
+    actualizar_manifiesto,
+    archivos_de_contratantes,
+    archivos_modificados,
+    cargar_manifiesto,
+    contratantes_pendientes,
+    guardar_manifiesto,
+    manifiesto_vacio,
+    siniestralidades_contratantes
+)
+
+
+ETAGS = {"bases/a.xlsx": "e1", "bases/b.xlsx": "e2"}
+ARCHIVOS = {"bases/a.xlsx": ["A", "B"], "bases/b.xlsx": ["C"]}
+HUELLAS = {"A": "h-a", "B": "h-b", "C": "h-c"}
+SINIESTRALIDADES = {"A": None, "B": "0.3", "C": None}
+
+
+def _manifiesto_inicial():
+    df_cotizaciones = pd.DataFrame({"Contratante": ["A", "B", "C"], "Ticket": [1, 2, 3]})
+    return actualizar_manifiesto(manifiesto_vacio(), ETAGS, ARCHIVOS, df_cotizaciones, set(HUELLAS), set(HUELLAS),
+                                 HUELLAS, "v1", SINIESTRALIDADES)
+
+
+def test_primera_ejecucion_cotiza_todo():
+    assert archivos_modificados(manifiesto_vacio(), ETAGS) == list(ETAGS)
+    assert contratantes_pendientes(manifiesto_vacio(), ETAGS, HUELLAS, "v1", {}, SINIESTRALIDADES) == set(HUELLAS)
+
+
+def test_sin_cambios_no_hay_pendientes():
+    manifiesto = _manifiesto_inicial()
+    assert manifiesto["contratantes"]["B"] == {"archivos": ["bases/a.xlsx"], "huella_parametros": "h-b",
+                                               "version_cuotas": "v1", "siniestralidad": "0.3", "ticket": 2}
+    assert archivos_modificados(manifiesto, ETAGS) == []
+    assert contratantes_pendientes(manifiesto, ETAGS, HUELLAS, "v1", {}, SINIESTRALIDADES) == set()
+
+
+def test_cambios_que_vuelven_a_cotizar():
+    manifiesto = _manifiesto_inicial()
+    # Parámetros
+    assert contratantes_pendientes(manifiesto, ETAGS, {**HUELLAS, "C": "otra"}, "v1", {}, SINIESTRALIDADES) == {"C"}
+    # Tabla de cuotas
+    assert contratantes_pendientes(manifiesto, ETAGS, HUELLAS, "v2", {}, SINIESTRALIDADES) == set(HUELLAS)
+    # Siniestralidad de una renovación
+    assert contratantes_pendientes(manifiesto, ETAGS, HUELLAS, "v1", {}, {**SINIESTRALIDADES, "B": "0.6"}) == {"B"}
+    # Contratante nuevo
+    assert contratantes_pendientes(manifiesto, ETAGS, {**HUELLAS, "D": "h-d"}, "v1", {}, SINIESTRALIDADES) == {"D"}
+    # Base modificada: se descarga y se recotizan sus contratantes
+    etags = {**ETAGS, "bases/a.xlsx": "e1-nuevo"}
+    assert archivos_modificados(manifiesto, etags) == ["bases/a.xlsx"]
+    pendientes = contratantes_pendientes(manifiesto, etags, HUELLAS, "v1", {"bases/a.xlsx": ["A", "B"]}, SINIESTRALIDADES)
+    assert pendientes == {"A", "B"}
+    # Base borrada
+    assert contratantes_pendientes(manifiesto, {"bases/a.xlsx": "e1"}, HUELLAS, "v1", {}, SINIESTRALIDADES) == {"C"}
+
+
+def test_pendiente_que_cambia_de_base():
+    manifiesto = _manifiesto_inicial()
+    etags = {**ETAGS, "bases/c.xlsx": "e3"}
+    assert archivos_modificados(manifiesto, etags) == ["bases/c.xlsx"]
+    pendientes = contratantes_pendientes(manifiesto, etags, HUELLAS, "v1", {"bases/c.xlsx": ["A"]}, SINIESTRALIDADES)
+    assert pendientes == {"A"}
+    # Sus bases anteriores también se descargan para cotizarlo completo
+    assert archivos_de_contratantes(manifiesto, pendientes, etags) == {"bases/a.xlsx"}
+
+
+def test_actualizar_conserva_no_pendientes_y_quita_fallidos():
+    manifiesto = _manifiesto_inicial()
+    huellas = {**HUELLAS, "A": "h-a2", "B": "h-b2"}
+    df_cotizaciones = pd.DataFrame({"Contratante": ["A"], "Ticket": [10]})
+    nuevo = actualizar_manifiesto(manifiesto, ETAGS, {}, df_cotizaciones, {"A", "B"}, {"A"}, huellas, "v1",
+                                  SINIESTRALIDADES)
+
+    assert nuevo["contratantes"]["A"]["huella_parametros"] == "h-a2"
+    assert nuevo["contratantes"]["A"]["ticket"] == 10
+    # B falló: se vuelve a cotizar en la siguiente ejecución
+    assert "B" not in nuevo["contratantes"]
+    assert nuevo["contratantes"]["C"] == manifiesto["contratantes"]["C"]
+    assert contratantes_pendientes(nuevo, ETAGS, huellas, "v1", {}, SINIESTRALIDADES) == {"B"}
+
+
+def test_actualizar_sin_cotizaciones():
+    manifiesto = actualizar_manifiesto(manifiesto_vacio(), ETAGS, ARCHIVOS, pd.DataFrame(), set(HUELLAS), set(),
+                                       HUELLAS, "v1", SINIESTRALIDADES)
+    assert manifiesto["contratantes"] == {}
+    assert set(manifiesto["archivos"]) == set(ETAGS)
+
+
+def test_siniestralidades_contratantes():
+    registros = {"A": {"Renovacion": "Si", "Poliza": "P1"}, "B": {"Renovacion": "Si", "Poliza": "P2"},
+                 "C": {"Renovacion": "No", "Poliza": "P1"}}
+    assert siniestralidades_contratantes(registros, {"P1": 0.25}) == {"A": "0.25", "B": None, "C": None}
+
+
+def test_guardar_y_cargar_manifiesto(almacenamiento):
+    assert cargar_manifiesto("manifiesto.json", almacenamiento) == manifiesto_vacio()
+    manifiesto = _manifiesto_inicial()
+    guardar_manifiesto(manifiesto, "manifiesto.json", almacenamiento)
+    assert cargar_manifiesto("manifiesto.json", almacenamiento) == manifiesto
@@ -0,0 +1,20 @@
+import pandas as pd
+from src.parquet_utils import convertir_a_parquet, leer_tabla
+
+
+def _escribir_csv(almacenamiento, ruta, valor):
+    almacenamiento.escribir(ruta, pd.DataFrame({"x": [valor]}).to_csv(index=False).encode('utf-8'), 'text/csv')
+
+
+def test_convertir_reemplaza_solo_las_copias_del_mismo_archivo(almacenamiento):
+    _escribir_csv(almacenamiento, "bases/base.csv", 1)
+    _escribir_csv(almacenamiento, "bases/base.csv.respaldo.csv", 2)
+    anterior = convertir_a_parquet("bases/base.csv", almacenamiento, "parquet/")
+    hermano = convertir_a_parquet("bases/base.csv.respaldo.csv", almacenamiento, "parquet/")
+    assert convertir_a_parquet("bases/base.csv", almacenamiento, "parquet/") == anterior
+
+    _escribir_csv(almacenamiento, "bases/base.csv", 3)
+    nueva = convertir_a_parquet("bases/base.csv", almacenamiento, "parquet/")
+
+    assert {objeto["ruta"] for objeto in almacenamiento.iterar("parquet/")} == {nueva, hermano}
+    assert leer_tabla(almacenamiento.leer(nueva), nueva)["x"].tolist() == [3]
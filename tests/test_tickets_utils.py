@@ -0,0 +1,45 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from src.tickets_utils import AsignadorTickets
+
+
+def test_rangos_contiguos(almacenamiento):
+    asignador = AsignadorTickets(almacenamiento, "tickets/contador.json", inicio=100)
+    assert asignador.siguiente() == 100
+    assert asignador.reservar(5) == 100
+    assert asignador.reservar(3) == 105
+    assert asignador.reservar(0) == 108
+    assert asignador.siguiente() == 108
+    assert json.loads(almacenamiento.leer("tickets/contador.json"))["siguiente"] == 108
+
+
+def test_inicio_solo_se_consulta_sin_contador(almacenamiento):
+    llamadas = []
+
+    def inicio():
+        llamadas.append(1)
+        return 41
+
+    assert AsignadorTickets(almacenamiento, "contador.json", inicio=inicio).reservar(2) == 41
+    assert AsignadorTickets(almacenamiento, "contador.json", inicio=inicio).reservar(2) == 43
+    assert len(llamadas) == 1
+
+
+def test_reservas_simultaneas_no_se_traslapan(almacenamiento):
+    def reservar(n):
+        return AsignadorTickets(almacenamiento, "contador.json", inicio=1, espera_base=0.001, reintentos=200).reservar(n)
+
+    tamanios = [1, 2, 3, 4, 5]*8
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        inicios = list(pool.map(reservar, tamanios))
+
+    tickets = sorted(ticket for inicio, n in zip(inicios, tamanios) for ticket in range(inicio, inicio + n))
+    assert tickets == list(range(1, 1 + sum(tamanios)))
+
+
+def test_escritura_condicional_rechaza_etag_viejo(almacenamiento):
+    etag = almacenamiento.escribir_condicional("contador.json", b'{"siguiente": 1}')
+    assert etag is not None
+    assert almacenamiento.escribir_condicional("contador.json", b'{"siguiente": 1}') is None
+    assert almacenamiento.escribir_condicional("contador.json", b'{"siguiente": 2}', etag) is not None
+    assert almacenamiento.escribir_condicional("contador.json", b'{"siguiente": 3}', etag) is None